@@ -1,11 +1,33 @@
+import re
 import json
-from dataclasses import dataclass
-from openai import AsyncOpenAI
+import time
+import asyncio
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Optional
 
-from config import OPENAI_API_KEY
+from config import OPENAI_API_KEY, OPENAI_BASE_URL
+from model_router import router
+from budget import budgets
 
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI, AsyncStream
 
-client = AsyncOpenAI(api_key=OPENAI_API_KEY)
+
+# Клієнт створюється при першому використанні - імпорт openai важкий
+# і не повинен затримувати старт бота
+_client: Optional["AsyncOpenAI"] = None
+
+
+def get_client() -> "AsyncOpenAI":
+    """Повертає клієнт OpenAI, створюючи його при першому виклику."""
+    global _client
+    if _client is None:
+        from openai import AsyncOpenAI
+        
+        if not OPENAI_API_KEY:
+            raise ValueError("OPENAI_API_KEY is not set")
+        _client = AsyncOpenAI(api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL)
+    return _client
 
 
 @dataclass
@@ -13,8 +35,13 @@ class GeneratedQuestion:
     question: str
     answer: str
     fact: str
+    model: str = ""  # модель, що згенерувала питання (порожньо для банку)
+    # При потоковій генерації факт ще дописується: fact порожній, а задача поверне його
+    fact_task: Optional["asyncio.Task[str]"] = field(default=None, repr=False, compare=False)
 
 
+# Змінюйте разом із SYSTEM_PROMPT - по версії рахується частка прийнятих питань (validation.py)
+PROMPT_VERSION = 1
 SYSTEM_PROMPT = """Ти генеруєш навчальні питання українською мовою.
 
 Створи ОДНЕ питання на основі наданого факту та правильну відповідь до нього. Запиши також факт українською.
@@ -27,25 +54,186 @@ SYSTEM_PROMPT = """Ти генеруєш навчальні питання ук
 - відповідь має бути конкретною (місто, ім'я, назва, дія, об'єкт тощо)
 - переводь всі метричні одиниці в українські.
 
-Формат відповіді — СТРОГО JSON з полями: question, answer, fact"""
+Формат відповіді — СТРОГО JSON з полями саме в такому порядку: question, answer, fact"""
 
+# Завершене рядкове поле JSON верхнього рівня: "key": "value"
+_FIELD_RE = re.compile(r'"(question|answer|fact)"\s*:\s*"((?:[^"\\]|\\.)*)"')
+CHARS_PER_TOKEN = 3  # оцінка токенів для потоку, обірваного до чанка з usage (з запасом для кирилиці)
 
-async def generate_question(fact_text: str) -> GeneratedQuestion:
-    """Генерує питання на основі факту через OpenAI."""
-    response = await client.chat.completions.create(
-        model="gpt-5-mini",
-        messages=[
-            {"role": "system", "content": SYSTEM_PROMPT},
-            {"role": "user", "content": f"--ФАКТ--\n{fact_text}"}
-        ],
-        response_format={"type": "json_object"}
-    )
+
+def _record_usage(model: str, prompt_tokens: int, completion_tokens: int, budget_key: Optional[str]) -> None:
+    """Облік токенів відповіді: по моделі та в бюджет чату (budget_key - chat_key)."""
+    cost = router.record_usage(model, prompt_tokens, completion_tokens)
+    budgets.record(budget_key, prompt_tokens, completion_tokens, cost)
+
+
+async def generate_question(
+    fact_text: str,
+    budget_key: Optional[str] = None,
+    feedback: Optional[str] = None
+) -> GeneratedQuestion:
+    """Генерує питання на основі факту через OpenAI.
+    
+    feedback - що було не так з попереднім питанням для цього факту.
+    """
+    user_content = f"--ФАКТ--\n{fact_text}"
+    if feedback:
+        user_content += f"\n\nПопереднє питання порушило вимоги: {feedback}. Дотримуйся всіх вимог."
+    model = router.choose()
+    started = time.monotonic()
+    try:
+        response = await get_client().chat.completions.create(
+            model=model,
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": user_content}
+            ],
+            response_format={"type": "json_object"}
+        )
+        
+        content = response.choices[0].message.content
+        data = json.loads(content)
+        # Відсутні поля лишаються порожніми - їх відхилить перевірка (validation.py)
+        question = GeneratedQuestion(
+            question=str(data.get("question") or ""),
+            answer=str(data.get("answer") or ""),
+            fact=str(data.get("fact") or ""),
+            model=model
+        )
+    except asyncio.CancelledError:
+        router.record_cancelled(model, time.monotonic() - started)
+        raise
+    except Exception:
+        router.record_latency(model, time.monotonic() - started, success=False)
+        raise
+    
+    router.record_latency(model, time.monotonic() - started, success=True)
+    if response.usage:
+        _record_usage(model, response.usage.prompt_tokens, response.usage.completion_tokens, budget_key)
+    return question
+
+
+class JsonFieldParser:
+    """Інкрементально витягує завершені поля question/answer/fact з потоку JSON."""
+    
+    def __init__(self) -> None:
+        self.buffer = ""
+        self.fields: dict[str, str] = {}
+        self.usage = None  # приходить останнім чанком потоку
+        self.charged = False  # токени потоку вже записано в облік
+    
+    def feed(self, chunk: str) -> None:
+        self.buffer += chunk
+        for match in _FIELD_RE.finditer(self.buffer):
+            key = match.group(1)
+            if key not in self.fields:
+                self.fields[key] = json.loads(f'"{match.group(2)}"')
+    
+    def has(self, *keys: str) -> bool:
+        return all(key in self.fields for key in keys)
+
+
+async def _read_chunks(stream: "AsyncStream", parser: JsonFieldParser, *keys: str) -> bool:
+    """Читає потік, поки не з'являться потрібні поля (без keys - до кінця).
+    
+    Повертає False якщо потік закінчився раніше.
+    """
+    while True:
+        try:
+            chunk = await stream.__anext__()
+        except StopAsyncIteration:
+            break
+        if chunk.usage:
+            parser.usage = chunk.usage
+        if chunk.choices and chunk.choices[0].delta.content:
+            parser.feed(chunk.choices[0].delta.content)
+            if keys and parser.has(*keys):
+                return True
+    return parser.has(*keys)
+
+
+def _charge_stream(model: str, parser: JsonFieldParser, prompt: str, budget_key: Optional[str]) -> None:
+    """Записує токени потоку в облік (один раз), як би він не закінчився.
+
+    Обірваний потік (скасований дублюючий запит, відхилене питання, скасована гра)
+    теж витратив токени; якщо usage не встиг прийти, вони оцінюються за довжиною
+    запиту та отриманої частини відповіді.
+    """
+    if parser.charged:
+        return
+    parser.charged = True
+    if parser.usage:
+        _record_usage(model, parser.usage.prompt_tokens, parser.usage.completion_tokens, budget_key)
+    else:
+        _record_usage(
+            model,
+            len(prompt) // CHARS_PER_TOKEN + 1,
+            len(parser.buffer) // CHARS_PER_TOKEN,
+            budget_key
+        )
+
+
+async def _finish_fact(stream: "AsyncStream", parser: JsonFieldParser) -> str:
+    """Дочитує потік до кінця: поле fact та usage."""
+    try:
+        await _read_chunks(stream, parser)
+    finally:
+        await stream.close()
+    return parser.fields.get("fact", "")
+
+
+async def stream_question(fact_text: str, budget_key: Optional[str] = None) -> GeneratedQuestion:
+    """Генерує питання потоком: повертається одразу, щойно готові question та answer.
+    
+    Факт дописується у фоні - його поверне fact_task. Токени записуються
+    в бюджет чату budget_key, коли потік дочитано або обірвано.
+    """
+    model = router.choose()
+    started = time.monotonic()
+    parser = JsonFieldParser()
+    user_content = f"--ФАКТ--\n{fact_text}"
+    stream = None
     
-    content = response.choices[0].message.content
-    data = json.loads(content)
+    try:
+        stream = await get_client().chat.completions.create(
+            model=model,
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": user_content}
+            ],
+            response_format={"type": "json_object"},
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+        try:
+            complete = await _read_chunks(stream, parser, "question", "answer")
+        except BaseException:
+            await stream.close()
+            raise
+        if not complete:
+            await stream.close()
+            raise ValueError(f"Incomplete question in model output: {parser.buffer!r}")
+    except asyncio.CancelledError:
+        # Скасований дублюючий запит чи вихід за GENERATION_BUDGET - не помилка моделі,
+        # але затримка щонайменше така
+        router.record_cancelled(model, time.monotonic() - started)
+        if stream is not None:
+            _charge_stream(model, parser, SYSTEM_PROMPT + user_content, budget_key)
+        raise
+    except Exception:
+        router.record_latency(model, time.monotonic() - started, success=False)
+        if stream is not None:
+            _charge_stream(model, parser, SYSTEM_PROMPT + user_content, budget_key)
+        raise
     
+    router.record_latency(model, time.monotonic() - started, success=True)
+    fact_task = asyncio.create_task(_finish_fact(stream, parser))
+    # Колбек спрацює і для задачі, скасованої ще до старту (тоді її finally не виконується)
+    fact_task.add_done_callback(lambda _: _charge_stream(model, parser, SYSTEM_PROMPT + user_content, budget_key))
     return GeneratedQuestion(
-        question=data["question"],
-        answer=data["answer"],
-        fact=data["fact"]
+        question=parser.fields["question"],
+        answer=parser.fields["answer"],
+        fact=parser.fields.get("fact", ""),
+        model=model,
+        fact_task=fact_task
     )
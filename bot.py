@@ -1,13 +1,40 @@
+import time
 import asyncio
 import logging
+from typing import Any
 
-from aiogram import Bot, Dispatcher
-from aiogram.client.default import DefaultBotProperties
-from aiogram.enums import ParseMode
+from startup import startup_report
 
-from config import TELEGRAM_BOT_TOKEN
-from database import init_db
-from handlers import setup_routers
+with startup_report.measure_import("aiogram"):
+    from aiogram import Bot, Dispatcher
+    from aiogram.client.default import DefaultBotProperties
+    from aiogram.enums import ParseMode
+
+with startup_report.measure_import("config"):
+    from config import TELEGRAM_BOT_TOKENS, RECORD_PATH, validate_config
+
+with startup_report.measure_import("database"):
+    from database import init_db, snapshot_scores
+
+with startup_report.measure_import("transport"):
+    from transport import TunedAiohttpSession, outbound_pressure
+
+with startup_report.measure_import("executor"):
+    from executor import executor, ChatSerialMiddleware
+
+with startup_report.measure_import("handlers"):
+    from handlers import setup_routers
+    from handlers.game import bot_usernames, resume_games, drain_games, countdown_stats
+    from chat_state import chat_states
+
+with startup_report.measure_import("loop_watchdog"):
+    from loop_watchdog import watchdog
+
+with startup_report.measure_import("questions"):
+    from questions import warm_up
+    from model_router import router
+    from budget import budgets
+    from validation import validator
 
 
 logging.basicConfig(
@@ -16,29 +43,145 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+SCORE_SNAPSHOT_INTERVAL = 300  # секунд між знімками рейтингів з журналу нарахувань
+SHUTDOWN_DRAIN_WINDOW = 15  # фази гри, що закінчуються за стільки секунд, дочекуються перед виходом
+SHUTDOWN_TIMEOUT = 20  # максимум очікування на кожному кроці завершення
+
+
+async def on_startup() -> None:
+    """Викликається перед початком polling."""
+    startup_report.mark("polling")
+    startup_report.log_startup()
+
+
+async def snapshot_scores_periodically() -> None:
+    """Періодично доганяє знімки рейтингів за журналом нарахувань."""
+    while True:
+        await asyncio.sleep(SCORE_SNAPSHOT_INTERVAL)
+        try:
+            applied = await snapshot_scores()
+        except Exception as e:
+            logger.warning("Score snapshot failed: %r", e)
+        else:
+            if applied:
+                logger.info("Score snapshot applied %d events", applied)
+
+
+async def shutdown(bots: list[Bot]) -> dict[str, Any]:
+    """Завершення роботи після зупинки polling, щоб перезапуск не губив раунди.
+    
+    Дочекується оброблення вже отриманих оновлень, фаз гри, що ось-ось
+    закінчаться, та записує бали. Решта ігор відновиться при запуску
+    за збереженим часом кінця фази.
+    """
+    started = time.monotonic()
+    report: dict[str, Any] = {"queued_tasks": await executor.drain(SHUTDOWN_TIMEOUT)}
+    report.update(await drain_games({bot.id: bot for bot in bots}, SHUTDOWN_DRAIN_WINDOW, SHUTDOWN_TIMEOUT))
+    # Дочекані переходи фаз теж ставлять задачі в черги чатів
+    report["queued_tasks"] += await executor.drain(SHUTDOWN_TIMEOUT)
+    try:
+        report["score_events_flushed"] = await snapshot_scores()
+    except Exception as e:
+        logger.warning("Final score snapshot failed: %r", e)
+    report["seconds"] = round(time.monotonic() - started, 2)
+    return report
+
+
+def create_dispatcher(*outer_middlewares: Any) -> Dispatcher:
+    """Створює диспетчер з middleware та роутерами.
+    
+    outer_middlewares бачать оновлення до постановки в чергу чату.
+    """
+    dp = Dispatcher()
+    for middleware in outer_middlewares:
+        dp.update.outer_middleware(middleware)
+    # Оновлення одного чату обробляються по черзі, різних чатів - паралельно
+    dp.update.outer_middleware(ChatSerialMiddleware(executor))
+    dp.include_router(setup_routers())
+    return dp
+
 
 async def main() -> None:
     """Головна функція запуску бота."""
-    # Ініціалізуємо базу даних
-    await init_db()
-    logger.info("Database initialized")
-    
-    # Створюємо бота
-    bot = Bot(
-        token=TELEGRAM_BOT_TOKEN,
-        default=DefaultBotProperties(parse_mode=ParseMode.HTML)
+    validate_config()
+    
+    # Бот на кожен токен; пул з'єднань до Bot API, база та клієнти OpenAI - спільні
+    session = TunedAiohttpSession()
+    # Частота запитів до Bot API - за нею другорядні редагування відкладаються
+    session.middleware(outbound_pressure)
+    bots = [
+        Bot(
+            token=token,
+            session=session,
+            default=DefaultBotProperties(parse_mode=ParseMode.HTML)
+        )
+        for token in TELEGRAM_BOT_TOKENS
+    ]
+    
+    # Ініціалізуємо базу даних та перевіряємо токени паралельно.
+    # Дані зі старої схеми (один бот на базу) належать першому токену
+    _, *identities = await asyncio.gather(
+        init_db(legacy_bot_id=bots[0].id),
+        *(bot.me() for bot in bots)
     )
+    for me in identities:
+        bot_usernames[me.id] = me.username
+    startup_report.mark("init")
+    logger.info("Database initialized, bots: %s", ", ".join(f"@{me.username}" for me in identities))
+    
+    # Клієнт OpenAI прогріваємо у фоні - polling не чекає на нього
+    warm_up_task = asyncio.create_task(warm_up())
+    snapshot_task = asyncio.create_task(snapshot_scores_periodically())
+    
+    # Затримка event loop, блокуючі виклики та спізнення таймерів гри
+    watchdog.add_summary_source("Chat state", chat_states.stats)
+    watchdog.start()
+    
+    # Ігри, перервані попереднім перезапуском, продовжуються з того ж місця
+    resumed = sum(await asyncio.gather(*(resume_games(bot) for bot in bots)))
+    if resumed:
+        logger.info("Resumed %d unfinished games", resumed)
+    
+    outer_middlewares = [startup_report.first_update_middleware]
+    
+    # Запис сесії для відтворення через replay.py
+    recorder = None
+    if RECORD_PATH:
+        from recorder import SessionRecorder
+        
+        recorder = SessionRecorder(RECORD_PATH)
+        outer_middlewares.append(recorder.update_middleware)
+        session.middleware(recorder)
+        session.on_download = recorder.record_download
+        logger.info("Recording session to %s", RECORD_PATH)
     
     # Створюємо диспетчер та підключаємо роутери
-    dp = Dispatcher()
-    dp.include_router(setup_routers())
+    dp = create_dispatcher(*outer_middlewares)
+    dp.startup.register(on_startup)
+    
+    # Отримуємо лише ті типи оновлень, які обробляють роутери
+    allowed_updates = dp.resolve_used_update_types()
     
     # Запускаємо polling
-    logger.info("Starting bot...")
+    logger.info("Starting bot (allowed updates: %s)...", ", ".join(allowed_updates))
     try:
-        await dp.start_polling(bot)
+        await dp.start_polling(*bots, allowed_updates=allowed_updates)
     finally:
-        await bot.session.close()
+        logger.info("Polling stopped, shutting down...")
+        logger.info("Shutdown report: %s", await shutdown(bots))
+        warm_up_task.cancel()
+        snapshot_task.cancel()
+        watchdog.stop()
+        logger.info("Event loop watchdog: %s", watchdog.stats.as_dict())
+        logger.info("Bot API transport stats: %s", session.stats.as_dict())
+        logger.info("Countdown edits: %s", countdown_stats.as_dict())
+        logger.info("Chat state: %s", chat_states.stats())
+        logger.info("Question model accounting: %s", router.accounting())
+        logger.info("Generation budgets: %s", budgets.status())
+        logger.info("Question validation: %s", validator.report())
+        if recorder:
+            recorder.close()
+        await session.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,118 @@
+from datetime import datetime
+from dataclasses import dataclass, asdict
+from typing import Any, Optional
+
+from clock import get_clock
+from config import (
+    CHAT_DAILY_BUDGET_USD,
+    CHAT_DAILY_BUDGET_TOKENS,
+    GLOBAL_DAILY_BUDGET_USD,
+    GLOBAL_DAILY_BUDGET_TOKENS
+)
+
+
+@dataclass(slots=True)
+class Usage:
+    tokens: int = 0
+    cost: float = 0.0
+    generated: int = 0  # відповідей OpenAI з обліком токенів
+    throttled: int = 0  # питань, виданих з банку через вичерпаний бюджет
+
+    def as_dict(self) -> dict[str, Any]:
+        return {**asdict(self), "cost": round(self.cost, 6)}
+
+
+@dataclass(frozen=True)
+class Limits:
+    cost: float  # $ на добу, 0 - без обмеження
+    tokens: int  # токенів на добу, 0 - без обмеження
+
+    def exceeded_by(self, usage: Usage) -> bool:
+        return (
+            (self.cost > 0 and usage.cost >= self.cost)
+            or (self.tokens > 0 and usage.tokens >= self.tokens)
+        )
+
+    def share(self, usage: Usage) -> Optional[float]:
+        """Використана частка бюджету (за більшою з двох), None - без обмежень."""
+        shares = []
+        if self.cost > 0:
+            shares.append(usage.cost / self.cost)
+        if self.tokens > 0:
+            shares.append(usage.tokens / self.tokens)
+        return round(max(shares), 3) if shares else None
+
+
+class BudgetTracker:
+    """Облік витрат на генерацію за поточну добу по чатах та загалом.
+
+    Запити без чату (наповнення банку тощо) йдуть лише в загальний облік.
+    Облік ведеться в пам'яті та скидається з початком нової доби.
+    """
+
+    def __init__(self, chat_limits: Limits, global_limits: Limits) -> None:
+        self.chat_limits = chat_limits
+        self.global_limits = global_limits
+        self.day = ""
+        self.total = Usage()
+        self.chats: dict[str, Usage] = {}
+
+    def _roll(self) -> None:
+        """Починає облік заново з новою добою (за локальною датою, як daily_scores)."""
+        today = datetime.fromtimestamp(get_clock().time()).strftime("%Y-%m-%d")
+        if today != self.day:
+            self.day = today
+            self.total = Usage()
+            self.chats = {}
+
+    def usage(self, key: str) -> Usage:
+        """Витрати чату (ключ chat_key) за сьогодні."""
+        self._roll()
+        return self.chats.get(key) or Usage()
+
+    def record(self, key: Optional[str], prompt_tokens: int, completion_tokens: int, cost: float) -> None:
+        """Записує токени та вартість відповіді моделі на чат та в загальний облік."""
+        self._roll()
+        targets = [self.total]
+        if key is not None:
+            targets.append(self.chats.setdefault(key, Usage()))
+        for usage in targets:
+            usage.tokens += prompt_tokens + completion_tokens
+            usage.cost += cost
+            usage.generated += 1
+
+    def global_exceeded(self) -> bool:
+        self._roll()
+        return self.global_limits.exceeded_by(self.total)
+
+    def allow(self, key: str) -> bool:
+        """Чи можна генерувати питання для чату (не вичерпано ні його, ні загальний бюджет)."""
+        return not self.global_exceeded() and not self.chat_limits.exceeded_by(self.usage(key))
+
+    def record_throttled(self, key: str) -> None:
+        self._roll()
+        self.chats.setdefault(key, Usage()).throttled += 1
+        self.total.throttled += 1
+
+    def status(self, key: Optional[str] = None) -> dict[str, Any]:
+        """Стан бюджетів для адмінів та логів."""
+        self._roll()
+        status = {
+            "day": self.day,
+            "chats": len(self.chats),
+            "total": self.total.as_dict(),
+            "total_share": self.global_limits.share(self.total),
+            "global_exceeded": self.global_exceeded()
+        }
+        if key is not None:
+            usage = self.usage(key)
+            status["chat"] = usage.as_dict()
+            status["chat_share"] = self.chat_limits.share(usage)
+            status["chat_exceeded"] = self.chat_limits.exceeded_by(usage)
+        return status
+
+
+budgets = BudgetTracker(
+    chat_limits=Limits(cost=CHAT_DAILY_BUDGET_USD, tokens=CHAT_DAILY_BUDGET_TOKENS),
+    global_limits=Limits(cost=GLOBAL_DAILY_BUDGET_USD, tokens=GLOBAL_DAILY_BUDGET_TOKENS)
+)
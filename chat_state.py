@@ -0,0 +1,136 @@
+import sys
+import asyncio
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Optional
+
+from clock import get_clock
+
+
+MAX_CHATS = 10000  # максимум чатів у пам'яті, далі витісняються найдавніші
+IDLE_TTL = 600  # секунд бездіяльності, після яких стан чату видаляється
+
+
+@dataclass(slots=True)
+class Tournament:
+    total_rounds: int
+    round: int = 0  # номер поточного раунду (з 1)
+    events: list = field(default_factory=list)  # ScoreEvent усіх раундів, записуються в кінці
+    next_question: Optional[asyncio.Task] = None  # питання наступного раунду, що вже генерується
+
+
+@dataclass(slots=True)
+class ChatState:
+    last_game_time: float = 0.0  # get_clock().time() останнього створення гри
+    timer: Optional[asyncio.Task] = None  # активний таймер фази гри
+    timer_deadline: Optional[float] = None  # get_clock().time() переходу фази, який чекає таймер
+    fact_task: Optional[asyncio.Task] = None  # факт поточної гри, що ще генерується
+    last_access: float = 0.0  # get_clock().monotonic() останнього звернення
+    tournament: Optional[Tournament] = None  # активний турнір чату
+
+    def has_active_timer(self) -> bool:
+        return self.timer is not None and not self.timer.done()
+
+
+class ChatStateStore:
+    """Стан чатів у пам'яті з витісненням неактивних (TTL + LRU).
+
+    Чати з активним таймером не витісняються. Таймер належить тому, хто
+    його зареєстрував: release_timer прибирає його лише якщо в стані
+    досі саме ця задача.
+    """
+
+    def __init__(self, max_chats: int = MAX_CHATS, idle_ttl: float = IDLE_TTL) -> None:
+        self.max_chats = max_chats
+        self.idle_ttl = idle_ttl
+        self._states: OrderedDict[str, ChatState] = OrderedDict()
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def get(self, chat_id: str) -> ChatState:
+        """Повертає стан чату, створюючи його за потреби."""
+        state = self._states.get(chat_id)
+        if state is None:
+            self._evict(reserve=1)
+            state = self._states[chat_id] = ChatState()
+        else:
+            self._states.move_to_end(chat_id)
+        state.last_access = get_clock().monotonic()
+        return state
+
+    def peek(self, chat_id: str) -> Optional[ChatState]:
+        """Повертає стан чату без створення та без оновлення часу звернення."""
+        return self._states.get(chat_id)
+
+    def items(self) -> list[tuple[str, ChatState]]:
+        """Знімок усіх станів (для завершення роботи)."""
+        return list(self._states.items())
+
+    def set_timer(self, chat_id: str, task: asyncio.Task, deadline: Optional[float] = None) -> None:
+        """Реєструє таймер чату, скасовуючи попередній.
+
+        deadline - час переходу фази гри, якщо таймер його чекає
+        (такі таймери дочекуються при завершенні роботи).
+        """
+        state = self.get(chat_id)
+        if state.timer is not None and state.timer is not task:
+            state.timer.cancel()
+        state.timer = task
+        state.timer_deadline = deadline
+
+    def cancel_timer(self, chat_id: str) -> None:
+        """Скасовує таймер чату (крім випадку, коли його викликає сам таймер)."""
+        state = self._states.get(chat_id)
+        if state is None or state.timer is None:
+            return
+        if state.timer is not asyncio.current_task():
+            state.timer.cancel()
+        state.timer = None
+        state.timer_deadline = None
+
+    def release_timer(self, chat_id: str, task: asyncio.Task) -> None:
+        """Прибирає таймер, якщо зареєстрований саме він (а не новіший)."""
+        state = self._states.get(chat_id)
+        if state is not None and state.timer is task:
+            state.timer = None
+            state.timer_deadline = None
+
+    def _evict(self, reserve: int = 0) -> None:
+        """Видаляє неактивні чати: прострочені за TTL та найдавніші понад MAX_CHATS.
+
+        Чати впорядковані від найдавнішого звернення, тому перевірка
+        зупиняється на першому свіжому чаті.
+        """
+        now = get_clock().monotonic()
+        for _ in range(len(self._states)):
+            chat_id, state = next(iter(self._states.items()))
+            expired = now - state.last_access >= self.idle_ttl
+            if not expired and len(self._states) + reserve <= self.max_chats:
+                break
+            if state.has_active_timer():
+                # Чат з грою не чіпаємо - переносимо в кінець черги
+                self._states.move_to_end(chat_id)
+                continue
+            del self._states[chat_id]
+            self.evicted += 1
+
+    def stats(self) -> dict[str, int]:
+        """Обсяг стану для моніторингу: кількість записів та приблизний розмір у байтах."""
+        size = sys.getsizeof(self._states)
+        timers = 0
+        for chat_id, state in self._states.items():
+            size += sys.getsizeof(chat_id) + sys.getsizeof(state)
+            if state.has_active_timer():
+                timers += 1
+        return {
+            "chats": len(self._states),
+            "active_timers": timers,
+            "bytes": size,
+            "evicted": self.evicted
+        }
+
+
+# Спільний стан чатів процесу
+chat_states = ChatStateStore()
@@ -0,0 +1,126 @@
+import time
+import heapq
+import asyncio
+import logging
+import itertools
+from typing import Callable, Iterable, Optional
+
+
+logger = logging.getLogger(__name__)
+
+SETTLE_TIMEOUT = 10.0  # реальних секунд: запобіжник, якщо задача чекає чогось поза годинником
+SETTLE_RECHECK = 0.01  # як часто перевіряти простій задач, що не дають сигналу
+
+
+class Clock:
+    """Реальний годинник. Всі таймери гри та кулдауни беруть час звідси."""
+
+    def time(self) -> float:
+        return time.time()
+
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+    async def sleep(self, seconds: float) -> None:
+        await asyncio.sleep(seconds)
+
+
+class VirtualClock(Clock):
+    """Віртуальний годинник для відтворення сесій.
+
+    sleep не чекає реального часу: задача прокидається, коли час просунуто
+    через advance_to. Після кожного пробудження годинник чекає, поки кожна
+    задача не засне на годиннику, не завершиться або не стане простоювати
+    (джерела простою - add_idle_source), тому таймери спрацьовують у
+    правильному порядку незалежно від швидкості машини.
+    """
+
+    def __init__(self, start: float = 0.0) -> None:
+        self.now = start
+        self._sleepers: list[tuple[float, int, asyncio.Future]] = []
+        self._counter = itertools.count()
+        self._parked: dict[asyncio.Task, asyncio.Future] = {}  # задачі, що сплять на годиннику
+        self._idle_sources: list[Callable[[], Iterable[asyncio.Task]]] = []
+        self._parked_signal: Optional[asyncio.Future] = None
+
+    def time(self) -> float:
+        return self.now
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def add_idle_source(self, source: Callable[[], Iterable[asyncio.Task]]) -> None:
+        """Джерело задач, що чекають на роботу, а не виконують її (наприклад, воркери черг)."""
+        self._idle_sources.append(source)
+
+    async def sleep(self, seconds: float) -> None:
+        if seconds <= 0:
+            await asyncio.sleep(0)
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._sleepers, (self.now + seconds, next(self._counter), future))
+        task = asyncio.current_task()
+        self._parked[task] = future
+        if self._parked_signal is not None and not self._parked_signal.done():
+            self._parked_signal.set_result(None)
+        try:
+            await future
+        finally:
+            self._parked.pop(task, None)
+
+    def _busy_tasks(self) -> list[asyncio.Task]:
+        # Розбуджена задача спить, лише поки її future не виконано
+        idle = {task for task, future in self._parked.items() if not future.done()}
+        for source in self._idle_sources:
+            idle.update(source())
+        current = asyncio.current_task()
+        return [task for task in asyncio.all_tasks() if task is not current and task not in idle]
+
+    async def settle(self) -> None:
+        """Чекає, поки всі задачі не заснуть на годиннику, не завершаться або не стануть простоювати."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + SETTLE_TIMEOUT
+        while busy := self._busy_tasks():
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                logger.warning("Virtual clock settle timed out, still busy: %s", busy)
+                return
+            # Прокидаємось, коли задача завершилась або заснула на годиннику;
+            # простій воркерів сигналу не дає - його бачить повторна перевірка
+            self._parked_signal = loop.create_future()
+            await asyncio.wait(
+                [*busy, self._parked_signal],
+                timeout=min(remaining, SETTLE_RECHECK),
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            self._parked_signal = None
+
+    async def advance_to(self, target: float) -> None:
+        """Просуває час до target, по черзі будячи всі таймери до нього."""
+        await self.settle()
+        while self._sleepers and self._sleepers[0][0] <= target:
+            deadline, _, future = heapq.heappop(self._sleepers)
+            self.now = max(self.now, deadline)
+            if not future.done():
+                future.set_result(None)
+                await self.settle()
+        self.now = max(self.now, target)
+
+    def next_deadline(self) -> float | None:
+        """Час найближчого таймера (скасовані ігноруються)."""
+        while self._sleepers and self._sleepers[0][2].done():
+            heapq.heappop(self._sleepers)
+        return self._sleepers[0][0] if self._sleepers else None
+
+
+_clock: Clock = Clock()
+
+
+def get_clock() -> Clock:
+    return _clock
+
+
+def set_clock(clock: Clock) -> None:
+    """Підміняє годинник (наприклад, на VirtualClock для відтворення)."""
+    global _clock
+    _clock = clock
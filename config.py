@@ -4,13 +4,34 @@ from dotenv import load_dotenv
 load_dotenv()
 
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
+# Кілька ботів в одному процесі: токени через кому (інакше - лише TELEGRAM_BOT_TOKEN)
+TELEGRAM_BOT_TOKENS = [
+    token.strip()
+    for token in os.getenv("TELEGRAM_BOT_TOKENS", TELEGRAM_BOT_TOKEN or "").split(",")
+    if token.strip()
+]
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+# Інший сервер chat completions (наприклад, локальна заглушка для перевірок)
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")
+# Запасний username для посилань, якщо getMe бота ще не відомий
 BOT_USERNAME = os.getenv("BOT_USERNAME", "variantsgg_bot")
 
 DATABASE_PATH = "variants.db"
+# Список заборонених слів для відповідей гравців (див. moderation.py)
+MODERATION_WORDS_PATH = os.getenv("MODERATION_WORDS_PATH", "banned_words.txt")
+# Денні бюджети генерації питань (див. budget.py), 0 - без обмеження
+CHAT_DAILY_BUDGET_USD = float(os.getenv("CHAT_DAILY_BUDGET_USD", "0.05"))
+CHAT_DAILY_BUDGET_TOKENS = int(os.getenv("CHAT_DAILY_BUDGET_TOKENS", "0"))
+GLOBAL_DAILY_BUDGET_USD = float(os.getenv("GLOBAL_DAILY_BUDGET_USD", "5"))
+GLOBAL_DAILY_BUDGET_TOKENS = int(os.getenv("GLOBAL_DAILY_BUDGET_TOKENS", "0"))
+# Якщо задано - вхідні оновлення та запити до Bot API записуються сюди (див. replay.py)
+RECORD_PATH = os.getenv("RECORD_PATH")
 
-if not TELEGRAM_BOT_TOKEN:
-    raise ValueError("TELEGRAM_BOT_TOKEN is not set")
 
-if not OPENAI_API_KEY:
-    raise ValueError("OPENAI_API_KEY is not set")
+def validate_config() -> None:
+    """Перевіряє обов'язкові змінні середовища для запуску бота."""
+    if not TELEGRAM_BOT_TOKENS:
+        raise ValueError("TELEGRAM_BOT_TOKEN or TELEGRAM_BOT_TOKENS is not set")
+
+    if not OPENAI_API_KEY:
+        raise ValueError("OPENAI_API_KEY is not set")
@@ -1,14 +1,20 @@
+import asyncio
+import sqlite3
+import argparse
 import aiosqlite
 from datetime import datetime
-from typing import Optional
-from dataclasses import dataclass
+from enum import Enum
+from operator import itemgetter
+from typing import Any, Callable, Optional
+from dataclasses import dataclass, fields
 
 from config import DATABASE_PATH
 
 
-@dataclass
+@dataclass(slots=True)
 class Game:
     id: int
+    bot_id: int
     chat_id: str
     question: str
     correct_answer: str
@@ -18,19 +24,36 @@ class Game:
     message_id: Optional[int] = None
     poll_message_id: Optional[int] = None
     poll_id: Optional[str] = None
+    deadline: Optional[float] = None  # час переходу до наступної фази (get_clock().time())
 
 
-@dataclass
+@dataclass(slots=True)
 class Participant:
     id: int
+    bot_id: int
     game_chat_id: str
     user_id: int
     answer: Optional[str]
 
 
-@dataclass
+class JoinStatus(Enum):
+    JOINED = "joined"
+    ALREADY_JOINED = "already_joined"  # вже в грі, але ще не відповів
+    ALREADY_ANSWERED = "already_answered"
+    NO_GAME = "no_game"  # гри немає або збір відповідей завершено
+    FULL = "full"
+
+
+@dataclass(slots=True)
+class JoinResult:
+    status: JoinStatus
+    question: Optional[str] = None
+
+
+@dataclass(slots=True)
 class GameOption:
     id: int
+    bot_id: int
     game_chat_id: str
     option_index: int
     option_text: str
@@ -38,120 +61,428 @@ class GameOption:
     is_correct: bool
 
 
-@dataclass
+@dataclass(slots=True)
 class PollVote:
     id: int
+    bot_id: int
     game_chat_id: str
     user_id: int
     option_index: int
 
 
-@dataclass
+@dataclass(slots=True)
+class ScoreEvent:
+    user_id: int
+    reason: str  # correct | fooled | manual | baseline
+    units: int  # за що нараховано: 1 вгадування, N обдурених гравців
+    points: int
+    message_id: Optional[int] = None  # повідомлення раунду, в якому нараховано
+
+
+@dataclass(slots=True)
+class PlayerStats:
+    bot_id: int
+    chat_id: str
+    user_id: int
+    rounds_played: int  # раундів з відповіддю гравця
+    options_shown: int  # скільки разів його варіант був у Poll
+    rounds_fooling: int  # скільки разів варіант обдурив хоча б одного
+    players_fooled: int
+    votes_cast: int
+    correct_guesses: int
+
+    @property
+    def accuracy(self) -> float:
+        return self.correct_guesses / self.votes_cast if self.votes_cast else 0.0
+
+    @property
+    def fooling_rate(self) -> float:
+        return self.rounds_fooling / self.options_shown if self.options_shown else 0.0
+
+
+@dataclass(slots=True)
 class UserScore:
     id: int
+    bot_id: int
     chat_id: str
     user_id: int
     score: int
 
 
-@dataclass
+@dataclass(slots=True)
 class DailyScore:
     id: int
+    bot_id: int
     chat_id: str
     user_id: int
     score: int
     date: str
 
 
-async def init_db() -> None:
-    """Ініціалізує базу даних та створює таблиці."""
+class RowMapper:
+    """row_factory, що будує об'єкт рядка напряму з кортежу sqlite3.
+    
+    Для кожного набору колонок запиту один раз будується itemgetter у порядку
+    полів класу, тож рядок - це один виклик itemgetter та конструктора, без
+    проміжного sqlite3.Row. Колонки, яких у класі немає, ігноруються.
+    """
+    
+    def __init__(self, cls: type, **converters: Callable[[Any], Any]) -> None:
+        self.cls = cls
+        self.field_names = [field.name for field in fields(cls)]
+        self.converters = [
+            (self.field_names.index(name), converter) for name, converter in converters.items()
+        ]
+        self._getters: dict[tuple[str, ...], itemgetter] = {}
+        # (cursor.description, itemgetter) останнього запиту; присвоюється одним кроком,
+        # бо aiosqlite викликає row_factory з потоків різних з'єднань
+        self._last: tuple[Any, Optional[itemgetter]] = (None, None)
+    
+    def _compile(self, description: tuple) -> itemgetter:
+        columns = tuple(column[0] for column in description)
+        getter = self._getters.get(columns)
+        if getter is None:
+            index = {name: i for i, name in enumerate(columns)}
+            getter = self._getters[columns] = itemgetter(*(index[name] for name in self.field_names))
+        return getter
+    
+    def __call__(self, cursor: sqlite3.Cursor, row: tuple) -> Any:
+        description, getter = self._last
+        if description is not cursor.description:
+            description = cursor.description
+            getter = self._compile(description)
+            self._last = (description, getter)
+        values = getter(row)
+        if self.converters:
+            values = list(values)
+            for i, converter in self.converters:
+                values[i] = converter(values[i])
+        return self.cls(*values)
+
+
+_GAME_ROWS = RowMapper(Game)
+_PARTICIPANT_ROWS = RowMapper(Participant)
+_GAME_OPTION_ROWS = RowMapper(GameOption, is_correct=bool)
+_POLL_VOTE_ROWS = RowMapper(PollVote)
+_PLAYER_STATS_ROWS = RowMapper(PlayerStats)
+_USER_SCORE_ROWS = RowMapper(UserScore)
+_DAILY_SCORE_ROWS = RowMapper(DailyScore)
+
+
+# Дані кожного бота (токена) зберігаються окремо - bot_id у всіх таблицях
+TABLES = {
+    "games": """
+        CREATE TABLE IF NOT EXISTS games (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            bot_id INTEGER NOT NULL,
+            chat_id TEXT NOT NULL,
+            question TEXT NOT NULL,
+            correct_answer TEXT NOT NULL,
+            fact TEXT NOT NULL,
+            phase TEXT DEFAULT 'collecting',
+            message_id INTEGER,
+            poll_message_id INTEGER,
+            poll_id TEXT,
+            deadline REAL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(bot_id, chat_id)
+        )
+    """,
+    "participants": """
+        CREATE TABLE IF NOT EXISTS participants (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            bot_id INTEGER NOT NULL,
+            game_chat_id TEXT NOT NULL,
+            user_id INTEGER NOT NULL,
+            answer TEXT,
+            UNIQUE(bot_id, game_chat_id, user_id),
+            FOREIGN KEY (bot_id, game_chat_id) REFERENCES games(bot_id, chat_id)
+        )
+    """,
+    "game_options": """
+        CREATE TABLE IF NOT EXISTS game_options (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            bot_id INTEGER NOT NULL,
+            game_chat_id TEXT NOT NULL,
+            option_index INTEGER NOT NULL,
+            option_text TEXT NOT NULL,
+            author_user_id INTEGER,
+            is_correct BOOLEAN DEFAULT 0,
+            UNIQUE(bot_id, game_chat_id, option_index),
+            FOREIGN KEY (bot_id, game_chat_id) REFERENCES games(bot_id, chat_id)
+        )
+    """,
+    # Усі автори варіанту, коли однакові відповіді об'єднано в один (див. dedup.py)
+    "option_authors": """
+        CREATE TABLE IF NOT EXISTS option_authors (
+            bot_id INTEGER NOT NULL,
+            game_chat_id TEXT NOT NULL,
+            option_index INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            PRIMARY KEY (bot_id, game_chat_id, option_index, user_id)
+        )
+    """,
+    "poll_votes": """
+        CREATE TABLE IF NOT EXISTS poll_votes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            bot_id INTEGER NOT NULL,
+            game_chat_id TEXT NOT NULL,
+            user_id INTEGER NOT NULL,
+            option_index INTEGER NOT NULL,
+            UNIQUE(bot_id, game_chat_id, user_id),
+            FOREIGN KEY (bot_id, game_chat_id) REFERENCES games(bot_id, chat_id)
+        )
+    """,
+    "user_scores": """
+        CREATE TABLE IF NOT EXISTS user_scores (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            bot_id INTEGER NOT NULL,
+            chat_id TEXT NOT NULL,
+            user_id INTEGER NOT NULL,
+            score INTEGER DEFAULT 0,
+            UNIQUE(bot_id, chat_id, user_id)
+        )
+    """,
+    "daily_scores": """
+        CREATE TABLE IF NOT EXISTS daily_scores (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            bot_id INTEGER NOT NULL,
+            chat_id TEXT NOT NULL,
+            user_id INTEGER NOT NULL,
+            score INTEGER DEFAULT 0,
+            date TEXT NOT NULL,
+            UNIQUE(bot_id, chat_id, user_id, date)
+        )
+    """,
+    "bank_seen": """
+        CREATE TABLE IF NOT EXISTS bank_seen (
+            bot_id INTEGER NOT NULL,
+            chat_id TEXT NOT NULL,
+            bitmap BLOB NOT NULL,
+            PRIMARY KEY (bot_id, chat_id)
+        )
+    """,
+    # Журнал нарахувань (лише дописується); user_scores та daily_scores - його знімки
+    "score_events": """
+        CREATE TABLE IF NOT EXISTS score_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            bot_id INTEGER NOT NULL,
+            chat_id TEXT NOT NULL,
+            user_id INTEGER NOT NULL,
+            message_id INTEGER,
+            reason TEXT NOT NULL,
+            units INTEGER NOT NULL DEFAULT 1,
+            points INTEGER NOT NULL,
+            date TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """,
+    # До якої події журналу враховано знімок чату
+    "score_snapshots": """
+        CREATE TABLE IF NOT EXISTS score_snapshots (
+            bot_id INTEGER NOT NULL,
+            chat_id TEXT NOT NULL,
+            last_event_id INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (bot_id, chat_id)
+        )
+    """,
+    "answer_skips": """
+        CREATE TABLE IF NOT EXISTS answer_skips (
+            bot_id INTEGER NOT NULL,
+            chat_id TEXT NOT NULL,
+            user_id INTEGER NOT NULL,
+            skipped INTEGER DEFAULT 0,
+            PRIMARY KEY (bot_id, chat_id, user_id)
+        )
+    """,
+    # Архів завершених раундів для аналітики (games зберігає лише поточну гру чату)
+    "rounds": """
+        CREATE TABLE IF NOT EXISTS rounds (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            bot_id INTEGER NOT NULL,
+            chat_id TEXT NOT NULL,
+            message_id INTEGER,
+            question TEXT NOT NULL,
+            correct_answer TEXT NOT NULL,
+            players INTEGER NOT NULL,
+            voters INTEGER NOT NULL,
+            started_at TIMESTAMP,
+            finished_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """,
+    "round_answers": """
+        CREATE TABLE IF NOT EXISTS round_answers (
+            round_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            answer TEXT NOT NULL,
+            option_index INTEGER,  -- NULL = варіант не потрапив у Poll
+            PRIMARY KEY (round_id, user_id),
+            FOREIGN KEY (round_id) REFERENCES rounds(id)
+        )
+    """,
+    "round_votes": """
+        CREATE TABLE IF NOT EXISTS round_votes (
+            round_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            option_index INTEGER NOT NULL,
+            is_correct BOOLEAN NOT NULL,
+            PRIMARY KEY (round_id, user_id),
+            FOREIGN KEY (round_id) REFERENCES rounds(id)
+        )
+    """,
+    # Статистика гравців, що доповнюється при архівуванні кожного раунду
+    "player_stats": """
+        CREATE TABLE IF NOT EXISTS player_stats (
+            bot_id INTEGER NOT NULL,
+            chat_id TEXT NOT NULL,
+            user_id INTEGER NOT NULL,
+            rounds_played INTEGER NOT NULL DEFAULT 0,
+            options_shown INTEGER NOT NULL DEFAULT 0,
+            rounds_fooling INTEGER NOT NULL DEFAULT 0,
+            players_fooled INTEGER NOT NULL DEFAULT 0,
+            votes_cast INTEGER NOT NULL DEFAULT 0,
+            correct_guesses INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (bot_id, chat_id, user_id)
+        )
+    """
+}
+
+
+# Таблиці, що існували до появи bot_id; лише їх init_db перебудовує зі старої схеми
+LEGACY_TABLES = (
+    "games", "participants", "game_options", "poll_votes",
+    "user_scores", "daily_scores", "bank_seen", "answer_skips"
+)
+
+# Колонки, додані до вже існуючих таблиць
+ADDED_COLUMNS = {
+    "games": {"deadline": "REAL"}
+}
+
+
+async def init_db(legacy_bot_id: int = 0) -> None:
+    """Ініціалізує базу даних та створює таблиці.
+    
+    Таблиці зі старої схеми (без bot_id) перебудовуються, а їхні дані
+    приписуються боту legacy_bot_id.
+    """
     async with aiosqlite.connect(DATABASE_PATH) as db:
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS games (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                chat_id TEXT UNIQUE NOT NULL,
-                question TEXT NOT NULL,
-                correct_answer TEXT NOT NULL,
-                fact TEXT NOT NULL,
-                phase TEXT DEFAULT 'collecting',
-                message_id INTEGER,
-                poll_message_id INTEGER,
-                poll_id TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS participants (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                game_chat_id TEXT NOT NULL,
-                user_id INTEGER NOT NULL,
-                answer TEXT,
-                UNIQUE(game_chat_id, user_id),
-                FOREIGN KEY (game_chat_id) REFERENCES games(chat_id)
-            )
-        """)
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS game_options (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                game_chat_id TEXT NOT NULL,
-                option_index INTEGER NOT NULL,
-                option_text TEXT NOT NULL,
-                author_user_id INTEGER,
-                is_correct BOOLEAN DEFAULT 0,
-                UNIQUE(game_chat_id, option_index),
-                FOREIGN KEY (game_chat_id) REFERENCES games(chat_id)
-            )
-        """)
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS poll_votes (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                game_chat_id TEXT NOT NULL,
-                user_id INTEGER NOT NULL,
-                option_index INTEGER NOT NULL,
-                UNIQUE(game_chat_id, user_id),
-                FOREIGN KEY (game_chat_id) REFERENCES games(chat_id)
-            )
-        """)
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS user_scores (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                chat_id TEXT NOT NULL,
-                user_id INTEGER NOT NULL,
-                score INTEGER DEFAULT 0,
-                UNIQUE(chat_id, user_id)
-            )
-        """)
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS daily_scores (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                chat_id TEXT NOT NULL,
-                user_id INTEGER NOT NULL,
-                score INTEGER DEFAULT 0,
-                date TEXT NOT NULL,
-                UNIQUE(chat_id, user_id, date)
-            )
-        """)
+        # WAL: читачі (рейтинги, export.py) не блокують запис і навпаки
+        await db.execute("PRAGMA journal_mode=WAL")
+        new_ledger = not await db.execute_fetchall("PRAGMA table_info(score_events)")
+        for table, schema in TABLES.items():
+            await _restore_legacy(db, table)
+            columns = [row[1] for row in await db.execute_fetchall(f"PRAGMA table_info({table})")]
+            if not columns or "bot_id" in columns or table not in LEGACY_TABLES:
+                await db.execute(schema)
+                continue
+            
+            # Обмеження унікальності змінились, тому таблицю треба створити заново.
+            # Перебудова - одна транзакція: при помилці таблиця лишається як була
+            column_list = ", ".join(columns)
+            await db.execute("BEGIN")
+            try:
+                await db.execute(f"ALTER TABLE {table} RENAME TO {table}_legacy")
+                await db.execute(schema)
+                await db.execute(
+                    f"INSERT INTO {table} (bot_id, {column_list}) SELECT ?, {column_list} FROM {table}_legacy",
+                    (legacy_bot_id,)
+                )
+                await db.execute(f"DROP TABLE {table}_legacy")
+            except BaseException:
+                await db.rollback()
+                raise
+            await db.commit()
+        for table, added in ADDED_COLUMNS.items():
+            columns = [row[1] for row in await db.execute_fetchall(f"PRAGMA table_info({table})")]
+            for column, column_type in added.items():
+                if column not in columns:
+                    await db.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+        await db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_score_events_chat ON score_events (bot_id, chat_id, id)"
+        )
+        await db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_rounds_chat ON rounds (bot_id, chat_id, id)"
+        )
+        if new_ledger:
+            await _seed_score_events(db)
         await db.commit()
 
 
+async def _restore_legacy(db: aiosqlite.Connection, table: str) -> None:
+    """Прибирає {table}_legacy, що лишився від перебудови, перерваної до появи транзакцій.
+    
+    Якщо дані вже скопійовано в нову таблицю - копія просто видаляється,
+    інакше порожня нова таблиця замінюється старою і перебудова повториться.
+    """
+    legacy = f"{table}_legacy"
+    if not await db.execute_fetchall("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (legacy,)):
+        return
+    
+    await db.execute("BEGIN")
+    try:
+        exists = await db.execute_fetchall(f"PRAGMA table_info({table})")
+        copied = exists and await db.execute_fetchall(f"SELECT 1 FROM {table} LIMIT 1")
+        if copied:
+            await db.execute(f"DROP TABLE {legacy}")
+        else:
+            if exists:
+                await db.execute(f"DROP TABLE {table}")
+            await db.execute(f"ALTER TABLE {legacy} RENAME TO {table}")
+    except BaseException:
+        await db.rollback()
+        raise
+    await db.commit()
+
+
+async def _seed_score_events(db: aiosqlite.Connection) -> None:
+    """Переносить бали, нараховані до появи журналу, у журнал як baseline.
+    
+    Денні бали стають подіями своєї дати, а решта загального рахунку - подією
+    без дати. Знімки вже містять ці бали, тому позначаються як актуальні.
+    """
+    await db.execute("""
+        INSERT INTO score_events (bot_id, chat_id, user_id, reason, units, points, date)
+        SELECT bot_id, chat_id, user_id, 'baseline', 1, score, date
+        FROM daily_scores WHERE score != 0
+    """)
+    await db.execute("""
+        INSERT INTO score_events (bot_id, chat_id, user_id, reason, units, points, date)
+        SELECT u.bot_id, u.chat_id, u.user_id, 'baseline', 1, u.score - COALESCE(SUM(d.score), 0), NULL
+        FROM user_scores u
+        LEFT JOIN daily_scores d
+            ON d.bot_id = u.bot_id AND d.chat_id = u.chat_id AND d.user_id = u.user_id
+        GROUP BY u.id
+        HAVING u.score - COALESCE(SUM(d.score), 0) != 0
+    """)
+    await db.execute("""
+        INSERT INTO score_snapshots (bot_id, chat_id, last_event_id)
+        SELECT bot_id, chat_id, MAX(id) FROM score_events GROUP BY bot_id, chat_id
+    """)
+
+
 async def upsert_game(
+    bot_id: int,
     chat_id: str,
     question: str,
     correct_answer: str,
     fact: str,
-    message_id: Optional[int] = None
+    message_id: Optional[int] = None,
+    deadline: Optional[float] = None
 ) -> None:
     """Створює нову гру або оновлює існуючу."""
     async with aiosqlite.connect(DATABASE_PATH) as db:
         # Видаляємо старі дані якщо гра вже існувала
-        await db.execute("DELETE FROM participants WHERE game_chat_id = ?", (chat_id,))
-        await db.execute("DELETE FROM game_options WHERE game_chat_id = ?", (chat_id,))
-        await db.execute("DELETE FROM poll_votes WHERE game_chat_id = ?", (chat_id,))
+        for table in ("participants", "game_options", "option_authors", "poll_votes"):
+            await db.execute(
+                f"DELETE FROM {table} WHERE bot_id = ? AND game_chat_id = ?",
+                (bot_id, chat_id)
+            )
         
         await db.execute("""
-            INSERT INTO games (chat_id, question, correct_answer, fact, phase, message_id)
-            VALUES (?, ?, ?, ?, 'collecting', ?)
-            ON CONFLICT(chat_id) DO UPDATE SET
+            INSERT INTO games (bot_id, chat_id, question, correct_answer, fact, phase, message_id, deadline)
+            VALUES (?, ?, ?, ?, ?, 'collecting', ?, ?)
+            ON CONFLICT(bot_id, chat_id) DO UPDATE SET
                 question = excluded.question,
                 correct_answer = excluded.correct_answer,
                 fact = excluded.fact,
@@ -159,161 +490,144 @@ async def upsert_game(
                 message_id = excluded.message_id,
                 poll_message_id = NULL,
                 poll_id = NULL,
+                deadline = excluded.deadline,
                 created_at = CURRENT_TIMESTAMP
-        """, (chat_id, question, correct_answer, fact, message_id))
+        """, (bot_id, chat_id, question, correct_answer, fact, message_id, deadline))
         await db.commit()
 
 
-async def get_game_by_chat_id(chat_id: str) -> Optional[Game]:
+async def get_game_by_chat_id(bot_id: int, chat_id: str) -> Optional[Game]:
     """Отримує гру за chat_id."""
     async with aiosqlite.connect(DATABASE_PATH) as db:
-        db.row_factory = aiosqlite.Row
+        db.row_factory = _GAME_ROWS
         async with db.execute(
-            "SELECT * FROM games WHERE chat_id = ?",
-            (chat_id,)
+            "SELECT * FROM games WHERE bot_id = ? AND chat_id = ?",
+            (bot_id, chat_id)
         ) as cursor:
-            row = await cursor.fetchone()
-            if row:
-                return Game(
-                    id=row["id"],
-                    chat_id=row["chat_id"],
-                    question=row["question"],
-                    correct_answer=row["correct_answer"],
-                    fact=row["fact"],
-                    phase=row["phase"],
-                    created_at=row["created_at"],
-                    message_id=row["message_id"],
-                    poll_message_id=row["poll_message_id"],
-                    poll_id=row["poll_id"]
-                )
-    return None
+            return await cursor.fetchone()
 
 
-async def get_game_by_poll_id(poll_id: str) -> Optional[Game]:
+async def get_game_by_poll_id(bot_id: int, poll_id: str) -> Optional[Game]:
     """Отримує гру за poll_id."""
     async with aiosqlite.connect(DATABASE_PATH) as db:
-        db.row_factory = aiosqlite.Row
+        db.row_factory = _GAME_ROWS
         async with db.execute(
-            "SELECT * FROM games WHERE poll_id = ?",
-            (poll_id,)
+            "SELECT * FROM games WHERE bot_id = ? AND poll_id = ?",
+            (bot_id, poll_id)
         ) as cursor:
-            row = await cursor.fetchone()
-            if row:
-                return Game(
-                    id=row["id"],
-                    chat_id=row["chat_id"],
-                    question=row["question"],
-                    correct_answer=row["correct_answer"],
-                    fact=row["fact"],
-                    phase=row["phase"],
-                    created_at=row["created_at"],
-                    message_id=row["message_id"],
-                    poll_message_id=row["poll_message_id"],
-                    poll_id=row["poll_id"]
-                )
-    return None
+            return await cursor.fetchone()
+
+
+async def get_active_games(bot_id: int) -> list[Game]:
+    """Отримує ігри, що не завершились (для відновлення таймерів після перезапуску)."""
+    async with aiosqlite.connect(DATABASE_PATH) as db:
+        db.row_factory = _GAME_ROWS
+        async with db.execute(
+            "SELECT * FROM games WHERE bot_id = ? AND phase IN ('collecting', 'voting')",
+            (bot_id,)
+        ) as cursor:
+            return await cursor.fetchall()
 
 
 async def update_game_phase(
+    bot_id: int,
     chat_id: str,
     phase: str,
     poll_id: Optional[str] = None,
-    poll_message_id: Optional[int] = None
+    poll_message_id: Optional[int] = None,
+    deadline: Optional[float] = None
 ) -> None:
-    """Оновлює фазу гри та опціонально poll_id і poll_message_id."""
+    """Оновлює фазу гри та опціонально poll_id, poll_message_id і час кінця фази."""
     async with aiosqlite.connect(DATABASE_PATH) as db:
         if poll_id is not None and poll_message_id is not None:
             await db.execute(
-                "UPDATE games SET phase = ?, poll_id = ?, poll_message_id = ? WHERE chat_id = ?",
-                (phase, poll_id, poll_message_id, chat_id)
+                "UPDATE games SET phase = ?, poll_id = ?, poll_message_id = ?, deadline = ? "
+                "WHERE bot_id = ? AND chat_id = ?",
+                (phase, poll_id, poll_message_id, deadline, bot_id, chat_id)
             )
         else:
             await db.execute(
-                "UPDATE games SET phase = ? WHERE chat_id = ?",
-                (phase, chat_id)
+                "UPDATE games SET phase = ? WHERE bot_id = ? AND chat_id = ?",
+                (phase, bot_id, chat_id)
             )
         await db.commit()
 
 
+async def update_game_fact(bot_id: int, chat_id: str, message_id: int, fact: str) -> None:
+    """Оновлює факт гри (лише якщо це досі та сама гра)."""
+    async with aiosqlite.connect(DATABASE_PATH) as db:
+        await db.execute(
+            "UPDATE games SET fact = ? WHERE bot_id = ? AND chat_id = ? AND message_id = ?",
+            (fact, bot_id, chat_id, message_id)
+        )
+        await db.commit()
+
+
+async def transition_game_phase(bot_id: int, chat_id: str, from_phase: str, to_phase: str) -> bool:
+    """Атомарно змінює фазу гри, якщо вона зараз from_phase. Повертає True якщо змінено."""
+    async with aiosqlite.connect(DATABASE_PATH) as db:
+        cursor = await db.execute(
+            "UPDATE games SET phase = ? WHERE bot_id = ? AND chat_id = ? AND phase = ?",
+            (to_phase, bot_id, chat_id, from_phase)
+        )
+        await db.commit()
+        return cursor.rowcount > 0
+
+
 # ============ Participants ============
 
-async def get_participant(game_chat_id: str, user_id: int) -> Optional[Participant]:
+async def get_participant(bot_id: int, game_chat_id: str, user_id: int) -> Optional[Participant]:
     """Отримує учасника гри."""
     async with aiosqlite.connect(DATABASE_PATH) as db:
-        db.row_factory = aiosqlite.Row
+        db.row_factory = _PARTICIPANT_ROWS
         async with db.execute(
-            "SELECT * FROM participants WHERE game_chat_id = ? AND user_id = ?",
-            (game_chat_id, user_id)
+            "SELECT * FROM participants WHERE bot_id = ? AND game_chat_id = ? AND user_id = ?",
+            (bot_id, game_chat_id, user_id)
         ) as cursor:
-            row = await cursor.fetchone()
-            if row:
-                return Participant(
-                    id=row["id"],
-                    game_chat_id=row["game_chat_id"],
-                    user_id=row["user_id"],
-                    answer=row["answer"]
-                )
-    return None
+            return await cursor.fetchone()
 
 
-async def get_participant_by_user(user_id: int) -> Optional[Participant]:
+async def get_participant_by_user(bot_id: int, user_id: int) -> Optional[Participant]:
     """Отримує учасника за user_id (для активної гри у фазі collecting)."""
     async with aiosqlite.connect(DATABASE_PATH) as db:
-        db.row_factory = aiosqlite.Row
+        db.row_factory = _PARTICIPANT_ROWS
         async with db.execute("""
             SELECT p.* FROM participants p
-            JOIN games g ON p.game_chat_id = g.chat_id
-            WHERE p.user_id = ? AND g.phase = 'collecting'
-        """, (user_id,)) as cursor:
-            row = await cursor.fetchone()
-            if row:
-                return Participant(
-                    id=row["id"],
-                    game_chat_id=row["game_chat_id"],
-                    user_id=row["user_id"],
-                    answer=row["answer"]
-                )
-    return None
+            JOIN games g ON p.bot_id = g.bot_id AND p.game_chat_id = g.chat_id
+            WHERE p.bot_id = ? AND p.user_id = ? AND g.phase = 'collecting'
+        """, (bot_id, user_id)) as cursor:
+            return await cursor.fetchone()
 
 
-async def get_participants_count(chat_id: str) -> int:
+async def get_participants_count(bot_id: int, chat_id: str) -> int:
     """Отримує кількість учасників гри."""
     async with aiosqlite.connect(DATABASE_PATH) as db:
         async with db.execute(
-            "SELECT COUNT(*) FROM participants WHERE game_chat_id = ?",
-            (chat_id,)
+            "SELECT COUNT(*) FROM participants WHERE bot_id = ? AND game_chat_id = ?",
+            (bot_id, chat_id)
         ) as cursor:
             row = await cursor.fetchone()
             return row[0] if row else 0
 
 
-async def get_participants_with_answers(chat_id: str) -> list[Participant]:
+async def get_participants_with_answers(bot_id: int, chat_id: str) -> list[Participant]:
     """Отримує всіх учасників гри з їхніми відповідями."""
     async with aiosqlite.connect(DATABASE_PATH) as db:
-        db.row_factory = aiosqlite.Row
+        db.row_factory = _PARTICIPANT_ROWS
         async with db.execute(
-            "SELECT * FROM participants WHERE game_chat_id = ? AND answer IS NOT NULL",
-            (chat_id,)
+            "SELECT * FROM participants WHERE bot_id = ? AND game_chat_id = ? AND answer IS NOT NULL",
+            (bot_id, chat_id)
         ) as cursor:
-            rows = await cursor.fetchall()
-            return [
-                Participant(
-                    id=row["id"],
-                    game_chat_id=row["game_chat_id"],
-                    user_id=row["user_id"],
-                    answer=row["answer"]
-                )
-                for row in rows
-            ]
+            return await cursor.fetchall()
 
 
-async def add_participant(game_chat_id: str, user_id: int) -> bool:
+async def add_participant(bot_id: int, game_chat_id: str, user_id: int) -> bool:
     """Додає учасника до гри. Повертає True якщо успішно."""
     async with aiosqlite.connect(DATABASE_PATH) as db:
         try:
             await db.execute(
-                "INSERT INTO participants (game_chat_id, user_id) VALUES (?, ?)",
-                (game_chat_id, user_id)
+                "INSERT INTO participants (bot_id, game_chat_id, user_id) VALUES (?, ?, ?)",
+                (bot_id, game_chat_id, user_id)
             )
             await db.commit()
             return True
@@ -321,160 +635,562 @@ async def add_participant(game_chat_id: str, user_id: int) -> bool:
             return False
 
 
-async def update_participant_answer(user_id: int, answer: str) -> bool:
+async def join_game(bot_id: int, chat_id: str, user_id: int, max_participants: int) -> JoinResult:
+    """Атомарно приєднує користувача до гри.
+    
+    Фаза, ліміт учасників та участь перевіряються і запис додається
+    в одній транзакції, тому паралельні приєднання не перевищать ліміт.
+    """
+    async with aiosqlite.connect(DATABASE_PATH) as db:
+        await db.execute("BEGIN IMMEDIATE")
+        async with db.execute("""
+            SELECT g.phase, g.question, p.id, p.answer,
+                   (SELECT COUNT(*) FROM participants WHERE bot_id = g.bot_id AND game_chat_id = g.chat_id)
+            FROM games g
+            LEFT JOIN participants p
+                ON p.bot_id = g.bot_id AND p.game_chat_id = g.chat_id AND p.user_id = ?
+            WHERE g.bot_id = ? AND g.chat_id = ?
+        """, (user_id, bot_id, chat_id)) as cursor:
+            row = await cursor.fetchone()
+        
+        if not row or row[0] != "collecting":
+            await db.rollback()
+            return JoinResult(JoinStatus.NO_GAME)
+        
+        phase, question, participant_id, answer, count = row
+        if participant_id is not None:
+            await db.rollback()
+            status = JoinStatus.ALREADY_ANSWERED if answer else JoinStatus.ALREADY_JOINED
+            return JoinResult(status, question)
+        
+        if count >= max_participants:
+            await db.rollback()
+            return JoinResult(JoinStatus.FULL, question)
+        
+        await db.execute(
+            "INSERT INTO participants (bot_id, game_chat_id, user_id) VALUES (?, ?, ?)",
+            (bot_id, chat_id, user_id)
+        )
+        await db.commit()
+        return JoinResult(JoinStatus.JOINED, question)
+
+
+async def update_participant_answer(bot_id: int, user_id: int, answer: str) -> bool:
     """Оновлює відповідь учасника. Повертає True якщо успішно."""
     async with aiosqlite.connect(DATABASE_PATH) as db:
         cursor = await db.execute("""
             UPDATE participants 
             SET answer = ?
-            WHERE user_id = ? AND answer IS NULL
-            AND game_chat_id IN (SELECT chat_id FROM games WHERE phase = 'collecting')
-        """, (answer, user_id))
+            WHERE bot_id = ? AND user_id = ? AND answer IS NULL
+            AND game_chat_id IN (SELECT chat_id FROM games WHERE bot_id = ? AND phase = 'collecting')
+        """, (answer, bot_id, user_id, bot_id))
         await db.commit()
         return cursor.rowcount > 0
 
 
 # ============ Game Options ============
 
-async def save_game_options(chat_id: str, options: list[tuple[int, str, Optional[int], bool]]) -> None:
+async def save_game_options(
+    bot_id: int,
+    chat_id: str,
+    options: list[tuple[int, str, Optional[int], bool]],
+    option_authors: Optional[dict[int, list[int]]] = None
+) -> None:
     """Зберігає варіанти відповідей для Poll.
     
     options: list of (option_index, option_text, author_user_id, is_correct)
+    option_authors: option_index -> всі автори варіанту, якщо їх кілька
     """
     async with aiosqlite.connect(DATABASE_PATH) as db:
-        await db.execute("DELETE FROM game_options WHERE game_chat_id = ?", (chat_id,))
+        for table in ("game_options", "option_authors"):
+            await db.execute(
+                f"DELETE FROM {table} WHERE bot_id = ? AND game_chat_id = ?",
+                (bot_id, chat_id)
+            )
         await db.executemany("""
-            INSERT INTO game_options (game_chat_id, option_index, option_text, author_user_id, is_correct)
-            VALUES (?, ?, ?, ?, ?)
-        """, [(chat_id, idx, text, author, correct) for idx, text, author, correct in options])
+            INSERT INTO game_options (bot_id, game_chat_id, option_index, option_text, author_user_id, is_correct)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, [(bot_id, chat_id, idx, text, author, correct) for idx, text, author, correct in options])
+        if option_authors:
+            await db.executemany("""
+                INSERT OR IGNORE INTO option_authors (bot_id, game_chat_id, option_index, user_id)
+                VALUES (?, ?, ?, ?)
+            """, [
+                (bot_id, chat_id, idx, user_id)
+                for idx, user_ids in option_authors.items()
+                for user_id in user_ids
+            ])
         await db.commit()
 
 
-async def get_game_options(chat_id: str) -> list[GameOption]:
+async def get_option_authors(bot_id: int, chat_id: str) -> dict[int, list[int]]:
+    """Отримує авторів об'єднаних варіантів: option_index -> user_ids."""
+    async with aiosqlite.connect(DATABASE_PATH) as db:
+        async with db.execute(
+            "SELECT option_index, user_id FROM option_authors WHERE bot_id = ? AND game_chat_id = ?",
+            (bot_id, chat_id)
+        ) as cursor:
+            authors: dict[int, list[int]] = {}
+            for option_index, user_id in await cursor.fetchall():
+                authors.setdefault(option_index, []).append(user_id)
+            return authors
+
+
+async def get_game_options(bot_id: int, chat_id: str) -> list[GameOption]:
     """Отримує варіанти відповідей для гри."""
     async with aiosqlite.connect(DATABASE_PATH) as db:
-        db.row_factory = aiosqlite.Row
+        db.row_factory = _GAME_OPTION_ROWS
         async with db.execute(
-            "SELECT * FROM game_options WHERE game_chat_id = ? ORDER BY option_index",
-            (chat_id,)
+            "SELECT * FROM game_options WHERE bot_id = ? AND game_chat_id = ? ORDER BY option_index",
+            (bot_id, chat_id)
         ) as cursor:
-            rows = await cursor.fetchall()
-            return [
-                GameOption(
-                    id=row["id"],
-                    game_chat_id=row["game_chat_id"],
-                    option_index=row["option_index"],
-                    option_text=row["option_text"],
-                    author_user_id=row["author_user_id"],
-                    is_correct=bool(row["is_correct"])
-                )
-                for row in rows
-            ]
+            return await cursor.fetchall()
+
+
+# ============ Answer Skips ============
+
+async def get_answer_skips(bot_id: int, chat_id: str) -> dict[int, int]:
+    """Отримує скільки раундів поспіль варіант кожного гравця не потрапляв у Poll."""
+    async with aiosqlite.connect(DATABASE_PATH) as db:
+        async with db.execute(
+            "SELECT user_id, skipped FROM answer_skips WHERE bot_id = ? AND chat_id = ?",
+            (bot_id, chat_id)
+        ) as cursor:
+            return {user_id: skipped for user_id, skipped in await cursor.fetchall()}
+
+
+async def update_answer_skips(bot_id: int, chat_id: str, shown: list[int], skipped: list[int]) -> None:
+    """Скидає лічильник для показаних гравців та збільшує для пропущених."""
+    async with aiosqlite.connect(DATABASE_PATH) as db:
+        await db.executemany(
+            "DELETE FROM answer_skips WHERE bot_id = ? AND chat_id = ? AND user_id = ?",
+            [(bot_id, chat_id, user_id) for user_id in shown]
+        )
+        await db.executemany("""
+            INSERT INTO answer_skips (bot_id, chat_id, user_id, skipped)
+            VALUES (?, ?, ?, 1)
+            ON CONFLICT(bot_id, chat_id, user_id) DO UPDATE SET
+                skipped = skipped + 1
+        """, [(bot_id, chat_id, user_id) for user_id in skipped])
+        await db.commit()
+
+
+# ============ Question Bank ============
+
+async def get_bank_seen(bot_id: int, chat_id: str) -> bytes:
+    """Отримує бітмапу питань з банку, які чат вже бачив."""
+    async with aiosqlite.connect(DATABASE_PATH) as db:
+        async with db.execute(
+            "SELECT bitmap FROM bank_seen WHERE bot_id = ? AND chat_id = ?",
+            (bot_id, chat_id)
+        ) as cursor:
+            row = await cursor.fetchone()
+            return row[0] if row else b""
+
+
+async def save_bank_seen(bot_id: int, chat_id: str, bitmap: bytes) -> None:
+    """Зберігає бітмапу побачених чатом питань."""
+    async with aiosqlite.connect(DATABASE_PATH) as db:
+        await db.execute("""
+            INSERT INTO bank_seen (bot_id, chat_id, bitmap) VALUES (?, ?, ?)
+            ON CONFLICT(bot_id, chat_id) DO UPDATE SET bitmap = excluded.bitmap
+        """, (bot_id, chat_id, bitmap))
+        await db.commit()
 
 
 # ============ Poll Votes ============
 
-async def save_poll_vote(chat_id: str, user_id: int, option_index: int) -> None:
+async def save_poll_vote(bot_id: int, chat_id: str, user_id: int, option_index: int) -> None:
     """Зберігає голос користувача (тільки перший, зміни ігноруються)."""
     async with aiosqlite.connect(DATABASE_PATH) as db:
         await db.execute("""
-            INSERT OR IGNORE INTO poll_votes (game_chat_id, user_id, option_index)
-            VALUES (?, ?, ?)
-        """, (chat_id, user_id, option_index))
+            INSERT OR IGNORE INTO poll_votes (bot_id, game_chat_id, user_id, option_index)
+            VALUES (?, ?, ?, ?)
+        """, (bot_id, chat_id, user_id, option_index))
         await db.commit()
 
 
-async def get_poll_votes(chat_id: str) -> list[PollVote]:
+async def get_poll_votes(bot_id: int, chat_id: str) -> list[PollVote]:
     """Отримує всі голоси для гри."""
     async with aiosqlite.connect(DATABASE_PATH) as db:
-        db.row_factory = aiosqlite.Row
+        db.row_factory = _POLL_VOTE_ROWS
         async with db.execute(
-            "SELECT * FROM poll_votes WHERE game_chat_id = ?",
-            (chat_id,)
+            "SELECT * FROM poll_votes WHERE bot_id = ? AND game_chat_id = ?",
+            (bot_id, chat_id)
         ) as cursor:
-            rows = await cursor.fetchall()
-            return [
-                PollVote(
-                    id=row["id"],
-                    game_chat_id=row["game_chat_id"],
-                    user_id=row["user_id"],
-                    option_index=row["option_index"]
-                )
-                for row in rows
-            ]
+            return await cursor.fetchall()
 
 
-# ============ User Scores ============
+# ============ Round Archive ============
 
-async def add_user_score(chat_id: str, user_id: int, points: int) -> None:
-    """Додає бали користувачу (загальні та денні)."""
-    today = datetime.now().strftime("%Y-%m-%d")
+async def archive_round(bot_id: int, chat_id: str) -> int:
+    """Копіює завершений раунд (гру, відповіді та голоси) в архів. Повертає id раунду.
+    
+    Викликається при підбитті підсумків, поки дані раунду ще не перезаписані новою грою.
+    У тій самій транзакції раунд додається до статистики гравців.
+    """
     async with aiosqlite.connect(DATABASE_PATH) as db:
-        # Загальний рейтинг
+        cursor = await db.execute("""
+            INSERT INTO rounds (bot_id, chat_id, message_id, question, correct_answer, players, voters, started_at)
+            SELECT bot_id, chat_id, message_id, question, correct_answer,
+                (SELECT COUNT(*) FROM participants p
+                 WHERE p.bot_id = g.bot_id AND p.game_chat_id = g.chat_id AND p.answer IS NOT NULL),
+                (SELECT COUNT(*) FROM poll_votes v
+                 WHERE v.bot_id = g.bot_id AND v.game_chat_id = g.chat_id),
+                created_at
+            FROM games g
+            WHERE bot_id = ? AND chat_id = ?
+        """, (bot_id, chat_id))
+        round_id = cursor.lastrowid
+        
+        # Номер варіанту автора: серед об'єднаних варіантів або власний
         await db.execute("""
-            INSERT INTO user_scores (chat_id, user_id, score)
-            VALUES (?, ?, ?)
-            ON CONFLICT(chat_id, user_id) DO UPDATE SET
-                score = score + excluded.score
-        """, (chat_id, user_id, points))
-        # Денний рейтинг
+            INSERT INTO round_answers (round_id, user_id, answer, option_index)
+            SELECT ?, p.user_id, p.answer, COALESCE(
+                (SELECT oa.option_index FROM option_authors oa
+                 WHERE oa.bot_id = p.bot_id AND oa.game_chat_id = p.game_chat_id AND oa.user_id = p.user_id),
+                (SELECT o.option_index FROM game_options o
+                 WHERE o.bot_id = p.bot_id AND o.game_chat_id = p.game_chat_id AND o.author_user_id = p.user_id)
+            )
+            FROM participants p
+            WHERE p.bot_id = ? AND p.game_chat_id = ? AND p.answer IS NOT NULL
+        """, (round_id, bot_id, chat_id))
         await db.execute("""
-            INSERT INTO daily_scores (chat_id, user_id, score, date)
-            VALUES (?, ?, ?, ?)
-            ON CONFLICT(chat_id, user_id, date) DO UPDATE SET
-                score = score + excluded.score
-        """, (chat_id, user_id, points, today))
+            INSERT INTO round_votes (round_id, user_id, option_index, is_correct)
+            SELECT ?, v.user_id, v.option_index, COALESCE(o.is_correct, 0)
+            FROM poll_votes v
+            LEFT JOIN game_options o
+                ON o.bot_id = v.bot_id AND o.game_chat_id = v.game_chat_id AND o.option_index = v.option_index
+            WHERE v.bot_id = ? AND v.game_chat_id = ?
+        """, (round_id, bot_id, chat_id))
+        await _add_round_stats(db, bot_id, chat_id, round_id)
         await db.commit()
+        return round_id
 
 
-async def get_user_score(chat_id: str, user_id: int) -> int:
-    """Отримує бали користувача в чаті."""
+async def _add_round_stats(db: aiosqlite.Connection, bot_id: int, chat_id: str, round_id: int) -> None:
+    """Додає архівований раунд до статистики гравців чату."""
+    # Обдурені - голоси за варіант автора, крім його власного голосу
+    await db.execute("""
+        INSERT INTO player_stats (
+            bot_id, chat_id, user_id, rounds_played, options_shown, rounds_fooling,
+            players_fooled, votes_cast, correct_guesses
+        )
+        SELECT ?, ?, user_id, SUM(answered), SUM(shown), SUM(fooled > 0), SUM(fooled), SUM(voted), SUM(correct)
+        FROM (
+            SELECT a.user_id, 1 AS answered, a.option_index IS NOT NULL AS shown,
+                (SELECT COUNT(*) FROM round_votes v
+                 WHERE v.round_id = a.round_id AND v.option_index = a.option_index
+                 AND v.user_id != a.user_id) AS fooled,
+                0 AS voted, 0 AS correct
+            FROM round_answers a WHERE a.round_id = ?
+            UNION ALL
+            SELECT user_id, 0, 0, 0, 1, is_correct FROM round_votes WHERE round_id = ?
+        )
+        GROUP BY user_id
+        ON CONFLICT(bot_id, chat_id, user_id) DO UPDATE SET
+            rounds_played = rounds_played + excluded.rounds_played,
+            options_shown = options_shown + excluded.options_shown,
+            rounds_fooling = rounds_fooling + excluded.rounds_fooling,
+            players_fooled = players_fooled + excluded.players_fooled,
+            votes_cast = votes_cast + excluded.votes_cast,
+            correct_guesses = correct_guesses + excluded.correct_guesses
+    """, (bot_id, chat_id, round_id, round_id))
+
+
+async def rebuild_player_stats() -> int:
+    """Перераховує статистику всіх гравців з архіву раундів. Повертає кількість гравців.
+    
+    Для бекфілу: архів читається двома запитами, а агрегати рахуються
+    векторно в NumPy замість запиту на кожен раунд.
+    """
+    import numpy as np
+    
     async with aiosqlite.connect(DATABASE_PATH) as db:
+        answers = await db.execute_fetchall("""
+            SELECT r.bot_id, r.chat_id, a.user_id, a.option_index IS NOT NULL,
+                (SELECT COUNT(*) FROM round_votes v
+                 WHERE v.round_id = a.round_id AND v.option_index = a.option_index
+                 AND v.user_id != a.user_id)
+            FROM round_answers a JOIN rounds r ON r.id = a.round_id
+        """)
+        votes = await db.execute_fetchall("""
+            SELECT r.bot_id, r.chat_id, v.user_id, v.is_correct
+            FROM round_votes v JOIN rounds r ON r.id = v.round_id
+        """)
+        
+        # Номер гравця (bot_id, chat_id, user_id) для bincount
+        players: dict[tuple, int] = {}
+        answer_player = np.array([players.setdefault(row[:3], len(players)) for row in answers], dtype=np.intp)
+        vote_player = np.array([players.setdefault(row[:3], len(players)) for row in votes], dtype=np.intp)
+        shown = np.array([row[3] for row in answers], dtype=np.int64)
+        fooled = np.array([row[4] for row in answers], dtype=np.int64)
+        correct = np.array([row[3] for row in votes], dtype=np.int64)
+        
+        size = len(players)
+        columns = [
+            np.bincount(answer_player, minlength=size),
+            np.bincount(answer_player, weights=shown, minlength=size),
+            np.bincount(answer_player, weights=fooled > 0, minlength=size),
+            np.bincount(answer_player, weights=fooled, minlength=size),
+            np.bincount(vote_player, minlength=size),
+            np.bincount(vote_player, weights=correct, minlength=size),
+        ]
+        stats = np.stack(columns, axis=1).astype(np.int64).tolist()
+        
+        await db.execute("DELETE FROM player_stats")
+        await db.executemany("""
+            INSERT INTO player_stats (
+                bot_id, chat_id, user_id, rounds_played, options_shown, rounds_fooling,
+                players_fooled, votes_cast, correct_guesses
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, [(*player, *stats[index]) for player, index in players.items()])
+        await db.commit()
+        return size
+
+
+async def get_player_stats(bot_id: int, chat_id: str, user_id: int) -> Optional[PlayerStats]:
+    """Отримує статистику гравця в чаті."""
+    async with aiosqlite.connect(DATABASE_PATH) as db:
+        db.row_factory = _PLAYER_STATS_ROWS
         async with db.execute(
-            "SELECT score FROM user_scores WHERE chat_id = ? AND user_id = ?",
-            (chat_id, user_id)
+            "SELECT * FROM player_stats WHERE bot_id = ? AND chat_id = ? AND user_id = ?",
+            (bot_id, chat_id, user_id)
         ) as cursor:
+            return await cursor.fetchone()
+
+
+# ============ User Scores ============
+
+async def add_user_score(bot_id: int, chat_id: str, user_id: int, points: int) -> None:
+    """Додає бали користувачу (ручне нарахування)."""
+    await add_score_events(bot_id, chat_id, [ScoreEvent(user_id, "manual", points, points)])
+
+
+async def add_score_events(bot_id: int, chat_id: str, events: list[ScoreEvent]) -> None:
+    """Дописує нарахування (раунду або цілого турніру) в журнал однією вставкою.
+    
+    Рейтинги не змінюються на місці - їх знімки доганяють журнал
+    у snapshot_scores, а читання додають ще не враховані події.
+    """
+    if not events:
+        return
+    today = datetime.now().strftime("%Y-%m-%d")
+    async with aiosqlite.connect(DATABASE_PATH) as db:
+        await db.executemany("""
+            INSERT INTO score_events (bot_id, chat_id, user_id, message_id, reason, units, points, date)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, [
+            (bot_id, chat_id, event.user_id, event.message_id, event.reason, event.units, event.points, today)
+            for event in events
+        ])
+        await db.commit()
+
+
+def _points_sql(points_per_unit: Optional[dict[str, int]]) -> tuple[str, list]:
+    """SQL-вираз балів події: записані бали або перераховані за новими вагами."""
+    if not points_per_unit:
+        return "points", []
+    cases = " ".join("WHEN ? THEN units * ?" for _ in points_per_unit)
+    params = [value for item in points_per_unit.items() for value in item]
+    return f"CASE reason {cases} ELSE points END", params
+
+
+async def _apply_score_events(
+    db: aiosqlite.Connection,
+    bot_id: int,
+    chat_id: str,
+    points_per_unit: Optional[dict[str, int]] = None
+) -> int:
+    """Доганяє знімки чату за журналом (інкрементально). Повертає кількість подій.
+
+    Виконується в транзакції, яку відкриває і завершує викликач.
+    """
+    async with db.execute(
+        "SELECT last_event_id FROM score_snapshots WHERE bot_id = ? AND chat_id = ?",
+        (bot_id, chat_id)
+    ) as cursor:
+        row = await cursor.fetchone()
+    last_event_id = row[0] if row else 0
+    
+    async with db.execute(
+        "SELECT MAX(id), COUNT(*) FROM score_events WHERE bot_id = ? AND chat_id = ? AND id > ?",
+        (bot_id, chat_id, last_event_id)
+    ) as cursor:
+        max_event_id, count = await cursor.fetchone()
+    if not count:
+        return 0
+    
+    points, points_params = _points_sql(points_per_unit)
+    window = (bot_id, chat_id, last_event_id, max_event_id)
+    await db.execute(f"""
+        INSERT INTO user_scores (bot_id, chat_id, user_id, score)
+        SELECT bot_id, chat_id, user_id, SUM({points}) FROM score_events
+        WHERE bot_id = ? AND chat_id = ? AND id > ? AND id <= ?
+        GROUP BY user_id
+        ON CONFLICT(bot_id, chat_id, user_id) DO UPDATE SET
+            score = score + excluded.score
+    """, (*points_params, *window))
+    await db.execute(f"""
+        INSERT INTO daily_scores (bot_id, chat_id, user_id, score, date)
+        SELECT bot_id, chat_id, user_id, SUM({points}), date FROM score_events
+        WHERE bot_id = ? AND chat_id = ? AND id > ? AND id <= ? AND date IS NOT NULL
+        GROUP BY user_id, date
+        ON CONFLICT(bot_id, chat_id, user_id, date) DO UPDATE SET
+            score = score + excluded.score
+    """, (*points_params, *window))
+    await db.execute("""
+        INSERT INTO score_snapshots (bot_id, chat_id, last_event_id) VALUES (?, ?, ?)
+        ON CONFLICT(bot_id, chat_id) DO UPDATE SET last_event_id = excluded.last_event_id
+    """, (bot_id, chat_id, max_event_id))
+    return count
+
+
+async def _pending_score_chats(db: aiosqlite.Connection) -> list[tuple[int, str]]:
+    """Чати, в журналі яких є події після останнього знімка."""
+    return [tuple(row) for row in await db.execute_fetchall("""
+        SELECT e.bot_id, e.chat_id FROM score_events e
+        LEFT JOIN score_snapshots s ON s.bot_id = e.bot_id AND s.chat_id = e.chat_id
+        WHERE e.id > COALESCE(s.last_event_id, 0)
+        GROUP BY e.bot_id, e.chat_id
+    """)]
+
+
+async def snapshot_scores() -> int:
+    """Доганяє знімки всіх чатів за журналом. Повертає кількість застосованих подій.
+
+    Кожен чат - окрема коротка транзакція, щоб не тримати блокування записів гри.
+    """
+    applied = 0
+    async with aiosqlite.connect(DATABASE_PATH) as db:
+        for bot_id, chat_id in await _pending_score_chats(db):
+            await db.execute("BEGIN IMMEDIATE")
+            try:
+                applied += await _apply_score_events(db, bot_id, chat_id)
+            except BaseException:
+                await db.rollback()
+                raise
+            await db.commit()
+    return applied
+
+
+async def rebuild_scores(points_per_unit: Optional[dict[str, int]] = None) -> int:
+    """Перебудовує рейтинги з нуля за журналом.
+    
+    points_per_unit перераховує бали подій за новими вагами
+    (наприклад {"correct": 3}), не змінюючи сам журнал. Уся перебудова -
+    одна транзакція: читачі до її кінця бачать старі рейтинги.
+    """
+    async with aiosqlite.connect(DATABASE_PATH) as db:
+        await db.execute("BEGIN IMMEDIATE")
+        try:
+            await db.execute("DELETE FROM user_scores")
+            await db.execute("DELETE FROM daily_scores")
+            await db.execute("DELETE FROM score_snapshots")
+            applied = 0
+            for bot_id, chat_id in await _pending_score_chats(db):
+                applied += await _apply_score_events(db, bot_id, chat_id, points_per_unit)
+        except BaseException:
+            await db.rollback()
+            raise
+        await db.commit()
+    return applied
+
+
+# Події журналу чату, ще не враховані в його знімку. Читання рейтингів додають їх
+# до знімка одним запитом (узгоджено) і нічого не пишуть - знімки доганяє snapshot_scores
+_PENDING_SCORE_EVENTS = """
+    FROM score_events
+    WHERE bot_id = :bot_id AND chat_id = :chat_id AND id > COALESCE(
+        (SELECT last_event_id FROM score_snapshots WHERE bot_id = :bot_id AND chat_id = :chat_id), 0
+    )
+"""
+
+
+async def get_user_score(bot_id: int, chat_id: str, user_id: int) -> int:
+    """Отримує бали користувача в чаті."""
+    async with aiosqlite.connect(DATABASE_PATH) as db:
+        async with db.execute(f"""
+            SELECT
+                COALESCE((
+                    SELECT score FROM user_scores
+                    WHERE bot_id = :bot_id AND chat_id = :chat_id AND user_id = :user_id
+                ), 0)
+                + COALESCE((SELECT SUM(points) {_PENDING_SCORE_EVENTS} AND user_id = :user_id), 0)
+        """, {"bot_id": bot_id, "chat_id": chat_id, "user_id": user_id}) as cursor:
             row = await cursor.fetchone()
-            return row[0] if row else 0
+            return row[0]
 
 
-async def get_leaderboard(chat_id: str, limit: int = 10) -> list[UserScore]:
+async def get_leaderboard(bot_id: int, chat_id: str, limit: int = 10) -> list[UserScore]:
     """Отримує топ гравців в чаті."""
     async with aiosqlite.connect(DATABASE_PATH) as db:
-        db.row_factory = aiosqlite.Row
-        async with db.execute(
-            "SELECT * FROM user_scores WHERE chat_id = ? ORDER BY score DESC LIMIT ?",
-            (chat_id, limit)
-        ) as cursor:
-            rows = await cursor.fetchall()
-            return [
-                UserScore(
-                    id=row["id"],
-                    chat_id=row["chat_id"],
-                    user_id=row["user_id"],
-                    score=row["score"]
-                )
-                for row in rows
-            ]
+        db.row_factory = _USER_SCORE_ROWS
+        async with db.execute(f"""
+            SELECT MIN(id) AS id, :bot_id AS bot_id, :chat_id AS chat_id, user_id, SUM(score) AS score
+            FROM (
+                SELECT id, user_id, score FROM user_scores WHERE bot_id = :bot_id AND chat_id = :chat_id
+                UNION ALL
+                SELECT NULL, user_id, SUM(points) {_PENDING_SCORE_EVENTS} GROUP BY user_id
+            )
+            GROUP BY user_id
+            ORDER BY score DESC
+            LIMIT :limit
+        """, {"bot_id": bot_id, "chat_id": chat_id, "limit": limit}) as cursor:
+            return await cursor.fetchall()
 
 
-async def get_daily_top_players(chat_id: str, limit: int = 3) -> list[DailyScore]:
+async def get_daily_top_players(bot_id: int, chat_id: str, limit: int = 3) -> list[DailyScore]:
     """Отримує топ гравців за сьогодні."""
     today = datetime.now().strftime("%Y-%m-%d")
     async with aiosqlite.connect(DATABASE_PATH) as db:
-        db.row_factory = aiosqlite.Row
-        async with db.execute(
-            "SELECT * FROM daily_scores WHERE chat_id = ? AND date = ? ORDER BY score DESC LIMIT ?",
-            (chat_id, today, limit)
-        ) as cursor:
-            rows = await cursor.fetchall()
-            return [
-                DailyScore(
-                    id=row["id"],
-                    chat_id=row["chat_id"],
-                    user_id=row["user_id"],
-                    score=row["score"],
-                    date=row["date"]
-                )
-                for row in rows
-            ]
+        db.row_factory = _DAILY_SCORE_ROWS
+        async with db.execute(f"""
+            SELECT MIN(id) AS id, :bot_id AS bot_id, :chat_id AS chat_id, user_id, SUM(score) AS score,
+                :today AS date
+            FROM (
+                SELECT id, user_id, score FROM daily_scores
+                WHERE bot_id = :bot_id AND chat_id = :chat_id AND date = :today
+                UNION ALL
+                SELECT NULL, user_id, SUM(points) {_PENDING_SCORE_EVENTS} AND date = :today GROUP BY user_id
+            )
+            GROUP BY user_id
+            ORDER BY score DESC
+            LIMIT :limit
+        """, {"bot_id": bot_id, "chat_id": chat_id, "today": today, "limit": limit}) as cursor:
+            return await cursor.fetchall()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Перебудова рейтингів з журналу нарахувань")
+    parser.add_argument(
+        "--points",
+        action="append",
+        default=[],
+        metavar="REASON=N",
+        help="перерахувати бали за одиницю події, напр. --points correct=3"
+    )
+    parser.add_argument(
+        "--player-stats",
+        action="store_true",
+        help="замість рейтингів перерахувати статистику гравців (/stats) з архіву раундів"
+    )
+    args = parser.parse_args()
+
+    if args.player_stats:
+        players = asyncio.run(rebuild_player_stats())
+        print(f"Rebuilt stats for {players} players")
+        return
+
+    points_per_unit = {}
+    for item in args.points:
+        reason, _, value = item.partition("=")
+        points_per_unit[reason] = int(value)
+
+    applied = asyncio.run(rebuild_scores(points_per_unit or None))
+    print(f"Rebuilt scores from {applied} events")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Пошук майже однакових відповідей гравців перед створенням Poll.
+
+Відповіді нормалізуються, у словах відкидаються відмінкові закінчення
+("Парижа" -> "париж"), далі текст розкладається на символьні триграми, що
+хешуються у вектор фіксованої довжини, і порівнюються всі з усіма одним
+матричним множенням (косинусна схожість). Сотні відповідей обробляються за
+мілісекунди.
+"""
+import re
+import zlib
+import unicodedata
+from dataclasses import dataclass
+
+
+NGRAM_SIZE = 3
+HASH_DIM = 1024  # розмір вектора триграм
+DUPLICATE_THRESHOLD = 0.85  # схожість, з якої відповіді вважаються однаковими
+
+_APOSTROPHES_RE = re.compile(r"[’ʼ'`‘]")
+_NON_WORD_RE = re.compile(r"[^\w\s]")
+_SPACES_RE = re.compile(r"\s+")
+# Закінчення іменників та прикметників, найдовші першими; основа лишається щонайменше MIN_STEM_LENGTH
+_ENDINGS_RE = re.compile(
+    r"(?:ами|ями|ові|еві|єві|ого|ому|ими|ій|ою|ею|єю|ом|ем|ам|ям|ах|ях|их|ів|ей|и|і|а|я|у|ю|е|о|ь|й)$"
+)
+MIN_STEM_LENGTH = 3
+
+
+@dataclass
+class AnswerClusters:
+    clusters: list[list[int]]  # індекси відповідей; перший - представник (найраніша)
+    correct: list[int]  # індекси відповідей, що збігаються з правильною
+
+
+def normalize_answer(text: str) -> str:
+    """Нормалізує відповідь: регістр, апострофи, пунктуація, пробіли."""
+    text = unicodedata.normalize("NFKC", text).lower().replace("ё", "е")
+    text = _APOSTROPHES_RE.sub("", text)
+    text = _NON_WORD_RE.sub(" ", text)
+    return _SPACES_RE.sub(" ", text).strip()
+
+
+def stem_answer(text: str) -> str:
+    """Відкидає відмінкові закінчення слів нормалізованої відповіді: "столиці франції" -> "столиц франц"."""
+    words = []
+    for word in text.split():
+        match = _ENDINGS_RE.search(word)
+        if match and match.start() >= MIN_STEM_LENGTH and not word.isdigit():
+            word = word[:match.start()]
+        words.append(word)
+    return " ".join(words)
+
+
+def _ngram_buckets(text: str) -> list[int]:
+    padded = f" {text} "
+    if len(padded) < NGRAM_SIZE:
+        return [zlib.crc32(padded.encode()) % HASH_DIM]
+    return [
+        zlib.crc32(padded[i:i + NGRAM_SIZE].encode()) % HASH_DIM
+        for i in range(len(padded) - NGRAM_SIZE + 1)
+    ]
+
+
+def _vectorize(texts: list[str]):
+    """Матриця (len(texts), HASH_DIM) нормованих частот триграм."""
+    import numpy as np
+
+    rows: list[int] = []
+    cols: list[int] = []
+    for row, text in enumerate(texts):
+        buckets = _ngram_buckets(text)
+        rows.extend([row] * len(buckets))
+        cols.extend(buckets)
+
+    matrix = np.zeros((len(texts), HASH_DIM), dtype=np.float32)
+    np.add.at(matrix, (np.array(rows, dtype=np.intp), np.array(cols, dtype=np.intp)), 1.0)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-9)
+
+
+def cluster_answers(
+    answers: list[str],
+    correct_answer: str,
+    threshold: float = DUPLICATE_THRESHOLD
+) -> AnswerClusters:
+    """Групує майже однакові відповіді та знаходить ті, що збігаються з правильною.
+
+    Правильною вважається відповідь з тими самими словами, що й правильна (після
+    нормалізації та відкидання закінчень), - в кластери вона не потрапляє.
+    Схожість триграм лише об'єднує відповіді гравців між собою: обманка на зразок
+    "золота рибка" при відповіді "золото" лишається в Poll. Відповіді, від яких
+    після нормалізації нічого не лишилось (лише емодзі чи пунктуація), не
+    порівнюються ні з чим і лишаються окремими кластерами.
+    """
+    import numpy as np
+
+    if not answers:
+        return AnswerClusters(clusters=[], correct=[])
+
+    normalized = [stem_answer(normalize_answer(answer)) for answer in answers]
+    normalized_correct = stem_answer(normalize_answer(correct_answer))
+    answer_vectors = _vectorize(normalized)
+    comparable = np.array([bool(text) for text in normalized])
+
+    correct_tokens = set(normalized_correct.split())
+    is_correct = [
+        bool(text) and (text == normalized_correct or set(text.split()) == correct_tokens)
+        for text in normalized
+    ]
+    correct = [i for i, matched in enumerate(is_correct) if matched]
+
+    similarity = answer_vectors @ answer_vectors.T
+    similar = (similarity >= threshold) & comparable[:, None] & comparable[None, :]
+    pairs = np.argwhere(np.triu(similar, k=1))
+
+    # Об'єднання пар у кластери (union-find); коренем лишається менший індекс
+    parent = list(range(len(answers)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, j in pairs.tolist():
+        root_i, root_j = find(i), find(j)
+        if root_i != root_j:
+            parent[max(root_i, root_j)] = min(root_i, root_j)
+
+    first_seen: dict[str, int] = {}
+    for i, text in enumerate(normalized):
+        if not text:
+            continue
+        if text in first_seen:
+            root_i, root_j = find(i), find(first_seen[text])
+            parent[max(root_i, root_j)] = min(root_i, root_j)
+        else:
+            first_seen[text] = i
+
+    clusters: dict[int, list[int]] = {}
+    for i in range(len(answers)):
+        if not is_correct[i]:
+            clusters.setdefault(find(i), []).append(i)
+
+    return AnswerClusters(clusters=list(clusters.values()), correct=correct)
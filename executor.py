@@ -0,0 +1,171 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Optional, TypeVar
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+MAX_QUEUE_DEPTH = 50  # максимум задач, що очікують у черзі одного чату
+IDLE_TIMEOUT = 60  # секунд простою, після яких черга чату видаляється
+
+
+def chat_key(bot_id: int, chat_id: str | int) -> str:
+    """Ключ черги та стану чату - один чат можуть обслуговувати кілька ботів."""
+    return f"{bot_id}:{chat_id}"
+
+
+def split_chat_key(key: str) -> tuple[int, str]:
+    """Зворотне до chat_key: (bot_id, chat_id)."""
+    bot_id, _, chat_id = key.partition(":")
+    return int(bot_id), chat_id
+
+
+class ChatQueueFull(Exception):
+    """Черга чату переповнена."""
+
+
+class _KeyQueue:
+    def __init__(self, maxsize: int) -> None:
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.worker: Optional[asyncio.Task] = None
+        self.getter: Optional[asyncio.Task] = None  # очікування наступної задачі черги
+        self.busy = False  # воркер зараз виконує задачу
+
+
+class KeyedExecutor:
+    """Виконує задачі по черзі в межах одного ключа (чату) і паралельно між ключами.
+
+    Для кожного ключа є своя обмежена черга та воркер, який видаляється
+    після IDLE_TIMEOUT секунд простою.
+    """
+
+    def __init__(self, max_queue_depth: int = MAX_QUEUE_DEPTH, idle_timeout: float = IDLE_TIMEOUT) -> None:
+        self._max_queue_depth = max_queue_depth
+        self._idle_timeout = idle_timeout
+        self._queues: dict[str, _KeyQueue] = {}
+
+    def __len__(self) -> int:
+        return len(self._queues)
+
+    async def run(self, key: str, func: Callable[[], Awaitable[T]]) -> T:
+        """Ставить задачу в чергу ключа та чекає її результат."""
+        key_queue = self._queues.get(key)
+
+        # Виклик з задачі, яку вже виконує воркер цього ключа - виконуємо одразу,
+        # інакше воркер чекав би сам на себе
+        if key_queue and key_queue.worker is asyncio.current_task():
+            return await func()
+
+        if key_queue is None or key_queue.worker is None or key_queue.worker.done():
+            key_queue = _KeyQueue(self._max_queue_depth)
+            key_queue.worker = asyncio.create_task(self._worker(key, key_queue))
+            self._queues[key] = key_queue
+
+        future = asyncio.get_running_loop().create_future()
+        try:
+            key_queue.queue.put_nowait((func, future))
+        except asyncio.QueueFull:
+            raise ChatQueueFull(key) from None
+
+        return await future
+
+    async def _worker(self, key: str, key_queue: _KeyQueue) -> None:
+        """Послідовно виконує задачі черги одного ключа."""
+        while True:
+            # Очікування - окрема задача, щоб простій воркера було видно ззовні (idle_tasks)
+            getter = key_queue.getter = asyncio.ensure_future(key_queue.queue.get())
+            try:
+                await asyncio.wait((getter,), timeout=self._idle_timeout)
+                if not getter.done():
+                    getter.cancel()
+                    await asyncio.wait((getter,))
+            except asyncio.CancelledError:
+                getter.cancel()
+                raise
+            if getter.cancelled():
+                if key_queue.queue.empty():
+                    # Черга простоює - звільняємо її
+                    if self._queues.get(key) is key_queue:
+                        del self._queues[key]
+                    return
+                continue
+            func, future = getter.result()
+
+            # Викликач вже не чекає (наприклад, таймер скасовано) - пропускаємо
+            if future.done():
+                key_queue.queue.task_done()
+                continue
+
+            key_queue.busy = True
+            try:
+                result = await func()
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(result)
+            finally:
+                key_queue.busy = False
+                key_queue.queue.task_done()
+
+    def idle_tasks(self) -> set[asyncio.Task]:
+        """Задачі воркерів, що чекають на нову задачу в порожній черзі."""
+        idle = set()
+        for key_queue in self._queues.values():
+            getter = key_queue.getter
+            if getter is not None and not getter.done() and key_queue.queue.empty():
+                idle.update((key_queue.worker, getter))
+        return idle
+
+    async def drain(self, timeout: float) -> int:
+        """Чекає, поки черги всіх ключів спорожніють. Повертає кількість задач на момент виклику.
+
+        Задачі, поставлені в ці черги під час очікування, теж дочекуються (у межах timeout).
+        """
+        pending = sum(
+            key_queue.queue.qsize() + key_queue.busy
+            for key_queue in self._queues.values()
+        )
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(key_queue.queue.join() for key_queue in list(self._queues.values()))),
+                timeout
+            )
+        except asyncio.TimeoutError:
+            logger.warning("Executor drain timed out after %.1fs", timeout)
+        return pending
+
+
+class ChatSerialMiddleware(BaseMiddleware):
+    """Пропускає оновлення одного чату по черзі через KeyedExecutor."""
+
+    def __init__(self, keyed_executor: KeyedExecutor) -> None:
+        self.executor = keyed_executor
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any]
+    ) -> Any:
+        chat = data.get("event_chat")
+
+        # Оновлення без чату (poll_answer, poll) хендлери самі ставлять у чергу чату гри
+        if chat is None:
+            return await handler(event, data)
+
+        try:
+            return await self.executor.run(chat_key(data["bot"].id, chat.id), lambda: handler(event, data))
+        except ChatQueueFull:
+            logger.warning("Update queue for chat %s is full, dropping update", chat.id)
+            return None
+
+
+# Спільний виконавець для оновлень та таймерів
+executor = KeyedExecutor()
@@ -0,0 +1,156 @@
+"""Потокове вивантаження ігор, рейтингів та архіву раундів для аналітики.
+
+    python export.py exports/ --format csv
+    python export.py exports/ --format parquet --tables rounds round_votes
+
+Кожна таблиця пишеться у власний файл (<таблиця>.<формат>) частинами по
+--chunk-size рядків, тож пам'ять не залежить від розміру бази. Усі таблиці
+читаються в одній транзакції тільки для читання - з одного знімка бази.
+У режимі WAL (вмикається в init_db) вивантаження не блокує запис бота.
+Parquet потребує pyarrow (pip install pyarrow).
+"""
+import os
+import csv
+import json
+import time
+import sqlite3
+import logging
+import argparse
+from typing import Any, Iterator
+
+from config import DATABASE_PATH
+
+
+logger = logging.getLogger(__name__)
+
+EXPORT_TABLES = ["games", "user_scores", "daily_scores", "rounds", "round_answers", "round_votes"]
+FORMATS = ["csv", "jsonl", "parquet"]
+CHUNK_SIZE = 5000
+
+# Тип колонки SQLite -> тип pyarrow (назва фабрики в модулі pyarrow)
+_PARQUET_TYPES = {
+    "INTEGER": "int64",
+    "BOOLEAN": "bool_",
+    "REAL": "float64",
+    "BLOB": "binary",
+}
+
+
+def open_snapshot(db_path: str) -> sqlite3.Connection:
+    """Відкриває базу тільки для читання та починає транзакцію.
+
+    Знімок фіксується першим SELECT і тримається до кінця вивантаження.
+    """
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, isolation_level=None)
+    conn.execute("BEGIN")
+    return conn
+
+
+def iter_chunks(cursor: sqlite3.Cursor, chunk_size: int) -> Iterator[list[tuple]]:
+    while rows := cursor.fetchmany(chunk_size):
+        yield rows
+
+
+def write_csv(path: str, columns: list[str], chunks: Iterator[list[tuple]]) -> int:
+    count = 0
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for rows in chunks:
+            writer.writerows(rows)
+            count += len(rows)
+    return count
+
+
+def write_jsonl(path: str, columns: list[str], chunks: Iterator[list[tuple]]) -> int:
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for rows in chunks:
+            f.writelines(
+                json.dumps(dict(zip(columns, row)), ensure_ascii=False) + "\n"
+                for row in rows
+            )
+            count += len(rows)
+    return count
+
+
+def write_parquet(path: str, columns: list[str], types: list[str], chunks: Iterator[list[tuple]]) -> int:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    # Схема з оголошених типів колонок, а не з даних: порожні колонки теж типізовані
+    arrow_types = [getattr(pa, _PARQUET_TYPES.get(sql_type, "string"))() for sql_type in types]
+    schema = pa.schema(list(zip(columns, arrow_types)))
+    bool_columns = [i for i, sql_type in enumerate(types) if sql_type == "BOOLEAN"]
+
+    count = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        for rows in chunks:
+            values = [list(column) for column in zip(*rows)]
+            for i in bool_columns:
+                values[i] = [None if value is None else bool(value) for value in values[i]]
+            writer.write_batch(pa.record_batch(
+                [pa.array(column, type=arrow_type) for column, arrow_type in zip(values, arrow_types)],
+                schema=schema
+            ))
+            count += len(rows)
+    return count
+
+
+def export_table(conn: sqlite3.Connection, table: str, out_dir: str, fmt: str, chunk_size: int) -> int:
+    """Вивантажує таблицю у файл. Повертає кількість рядків."""
+    info = conn.execute(f"PRAGMA table_info({table})").fetchall()
+    columns = [row[1] for row in info]
+    types = [row[2].upper() for row in info]
+    cursor = conn.execute(f"SELECT {', '.join(columns)} FROM {table}")
+    chunks = iter_chunks(cursor, chunk_size)
+
+    path = os.path.join(out_dir, f"{table}.{fmt}")
+    if fmt == "csv":
+        return write_csv(path, columns, chunks)
+    if fmt == "jsonl":
+        return write_jsonl(path, columns, chunks)
+    return write_parquet(path, columns, types, chunks)
+
+
+def export(db_path: str, out_dir: str, fmt: str, tables: list[str], chunk_size: int = CHUNK_SIZE) -> dict[str, Any]:
+    """Вивантажує таблиці з одного знімка бази. Повертає кількість рядків по таблицях."""
+    os.makedirs(out_dir, exist_ok=True)
+    conn = open_snapshot(db_path)
+    report = {}
+    try:
+        for table in tables:
+            started = time.perf_counter()
+            report[table] = export_table(conn, table, out_dir, fmt, chunk_size)
+            logger.info(
+                "Exported %s: %d rows in %.2fs",
+                table, report[table], time.perf_counter() - started
+            )
+    finally:
+        conn.execute("COMMIT")
+        conn.close()
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Вивантаження даних бота для аналітики")
+    parser.add_argument("out_dir", help="тека для файлів вивантаження")
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    parser.add_argument("--tables", nargs="+", choices=EXPORT_TABLES, default=EXPORT_TABLES)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--db", default=DATABASE_PATH)
+    args = parser.parse_args()
+
+    if args.format == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            parser.error("parquet export requires pyarrow: pip install pyarrow")
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    report = export(args.db, args.out_dir, args.format, args.tables, args.chunk_size)
+    logger.info("Export finished: %s", json.dumps(report))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,47 +1,107 @@
-import time
+import math
 import asyncio
 import random
-import httpx
+import logging
+from collections import Counter, defaultdict
+from dataclasses import dataclass, asdict
+from typing import Awaitable, Callable, Optional
 from aiogram import Router, F, Bot
 from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
-from aiogram.filters import Command
+from aiogram.filters import Command, CommandObject
 from aiogram.enums import ChatType
 
 from config import BOT_USERNAME
 from database import (
+    Game,
+    Participant,
+    ScoreEvent,
     upsert_game,
     get_game_by_chat_id,
+    get_active_games,
     get_participants_with_answers,
     update_game_phase,
+    update_game_fact,
+    transition_game_phase,
     save_game_options,
     get_game_options,
+    get_option_authors,
     get_poll_votes,
-    add_user_score
+    get_answer_skips,
+    update_answer_skips,
+    add_score_events,
+    archive_round
 )
-from ai import generate_question
+from questions import get_question
+from dedup import cluster_answers
+from executor import ChatQueueFull, executor, chat_key, split_chat_key
+from chat_state import ChatState, Tournament, chat_states
+from clock import get_clock
+from loop_watchdog import watchdog
+from transport import outbound_pressure
 
 
+logger = logging.getLogger(__name__)
+
 router = Router()
 
-FACTS_API_URL = "https://uselessfacts.jsph.pl/api/v2/facts/random"
 GAME_COOLDOWN = 60  # секунд між іграми
 COLLECTING_DURATION = 70  # тривалість збору відповідей (1.5 хвилини)
 VOTING_DURATION = 30  # тривалість голосування (1 хвилина)
-UPDATE_INTERVAL = 10  # інтервал оновлення повідомлення
+VOTING_CLOSE_GRACE = 5  # запас після закриття Poll, якщо оновлення від Telegram не прийшло
+COUNTDOWN_MILESTONES = (60, 30, 10)  # за скільки секунд до кінця збору оновлюється відлік
+UPDATE_INTERVAL = 10  # колишній фіксований інтервал оновлення - база для обліку зекономлених редагувань
+POLL_PLAYER_SLOTS = 9  # 10 варіантів в poll - 1 правильна відповідь
+MAX_MENTIONS = 10  # скільки гравців згадувати в одному рядку результатів
+CORRECT_ANSWER_POINTS = 2
+FACT_WAIT_TIMEOUT = 15  # скільки чекати факт, що ще генерується, перед показом результатів
+TOURNAMENT_DEFAULT_ROUNDS = 5
+TOURNAMENT_MAX_ROUNDS = 20
+TOURNAMENT_ROUND_PAUSE = 10  # секунд між результатами раунду та наступним питанням
+QUEUE_RETRY_DELAY = 0.5  # перша пауза перед повтором задачі таймера чи голосу, якщо черга чату переповнена
+QUEUE_RETRY_MAX_DELAY = 10
+GAME_TITLE = "🎮 **Гра у Варіанти!**"
+
+# bot.id -> username для посилань на відповідь, заповнюється при запуску
+bot_usernames: dict[int, str] = {}
+
+
+@dataclass
+class CountdownStats:
+    edits_sent: int = 0
+    skipped_unchanged: int = 0  # текст відліку не змінився
+    skipped_pressure: int = 0  # пропущено через навантаження на Bot API
+    edits_saved: int = 0  # порівняно з оновленням кожні UPDATE_INTERVAL секунд
+
+    def as_dict(self) -> dict[str, int]:
+        return asdict(self)
+
+
+countdown_stats = CountdownStats()
+
+
+async def timer_sleep(name: str, seconds: float) -> None:
+    """Сон таймера гри з обліком спізнення (заблокований event loop) у watchdog."""
+    clock = get_clock()
+    started = clock.monotonic()
+    await clock.sleep(seconds)
+    watchdog.record_timer(name, clock.monotonic() - started - seconds)
 
-# Зберігаємо час останнього створення гри для кожного чату
-_last_game_time: dict[str, float] = {}
-# Зберігаємо активні таймери для кожного чату
-_active_timers: dict[str, asyncio.Task] = {}
 
+async def run_chat_job(key: str, name: str, func: Callable[[], Awaitable[None]]) -> None:
+    """Ставить задачу в чергу чату, повторюючи з паузою, поки черга переповнена.
 
-async def get_random_fact() -> str:
-    """Отримує випадковий факт з API."""
-    async with httpx.AsyncClient() as client:
-        response = await client.get(FACTS_API_URL)
-        response.raise_for_status()
-        data = response.json()
-        return data["text"]
+    Переходи фаз таймерів та голоси не можна відкинути, як звичайне оновлення, -
+    інакше гра зависне чи загубить голос.
+    """
+    delay = QUEUE_RETRY_DELAY
+    while True:
+        try:
+            await executor.run(key, func)
+            return
+        except ChatQueueFull:
+            logger.warning("Update queue for chat %s is full, retrying %s in %.1fs", key, name, delay)
+        await get_clock().sleep(delay)
+        delay = min(delay * 2, QUEUE_RETRY_MAX_DELAY)
 
 
 def format_time_remaining(seconds: int) -> str:
@@ -55,72 +115,119 @@ def format_time_remaining(seconds: int) -> str:
     return f"{seconds} сек"
 
 
-def build_collecting_message(question: str, time_remaining: int) -> str:
+def build_answer_keyboard(bot: Bot, chat_id: str) -> InlineKeyboardMarkup:
+    """Кнопка переходу в особисті саме до того бота, що веде гру."""
+    username = bot_usernames.get(bot.id, BOT_USERNAME)
+    return InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(
+            text="🎯 Дати відповідь",
+            url=f"https://t.me/{username}?start={chat_id}"
+        )]
+    ])
+
+
+def build_collecting_message(question: str, time_remaining: int, title: str = GAME_TITLE) -> str:
     """Створює текст повідомлення для фази збору відповідей."""
     time_text = format_time_remaining(time_remaining)
     return (
-        f"🎮 **Гра у Варіанти!**\n\n"
+        f"{title}\n\n"
         f"{question}\n\n"
         f"⏱ Залишилось для відповідей: {time_text}"
     )
 
 
-async def collecting_timer(bot: Bot, chat_id: str, question: str, message_id: int) -> None:
-    """Таймер фази збору відповідей."""
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(
-            text="🎯 Дати відповідь",
-            url=f"https://t.me/{BOT_USERNAME}?start={chat_id}"
-        )]
-    ])
-    
-    time_remaining = COLLECTING_DURATION
+async def collecting_timer(
+    bot: Bot,
+    chat_id: str,
+    question: str,
+    message_id: int,
+    title: str = GAME_TITLE,
+    duration: int = COLLECTING_DURATION
+) -> None:
+    """Таймер фази збору відповідей.
+    
+    Відлік у повідомленні оновлюється лише на COUNTDOWN_MILESTONES; при високому
+    навантаженні на Bot API лишається тільки остання віха.
+    duration - скільки лишилось до кінця збору (менше за COLLECTING_DURATION після перезапуску).
+    """
+    keyboard = build_answer_keyboard(bot, chat_id)
+    key = chat_key(bot.id, chat_id)
+    
+    last_text = build_collecting_message(question, duration, title)
+    milestones = [milestone for milestone in COUNTDOWN_MILESTONES if milestone < duration]
+    time_remaining = duration
+    edits = 0
     
     try:
-        while time_remaining > 0:
-            await asyncio.sleep(UPDATE_INTERVAL)
-            time_remaining -= UPDATE_INTERVAL
+        for milestone in milestones + [0]:
+            await timer_sleep("collecting", time_remaining - milestone)
+            time_remaining = milestone
             
             # Перевіряємо чи гра ще у фазі збору
-            game = await get_game_by_chat_id(chat_id)
+            game = await get_game_by_chat_id(bot.id, chat_id)
             if not game or game.phase != "collecting":
                 return
             
-            if time_remaining > 0:
-                # Оновлюємо повідомлення з новим часом
-                try:
-                    await bot.edit_message_text(
-                        chat_id=int(chat_id),
-                        message_id=message_id,
-                        text=build_collecting_message(question, time_remaining),
-                        reply_markup=keyboard,
-                        parse_mode="Markdown"
-                    )
-                except Exception:
-                    pass
+            if time_remaining == 0:
+                break
+            
+            if milestone != milestones[-1] and outbound_pressure.is_high():
+                countdown_stats.skipped_pressure += 1
+                continue
+            
+            text = build_collecting_message(question, time_remaining, title)
+            if text == last_text:
+                countdown_stats.skipped_unchanged += 1
+                continue
+            
+            # Оновлюємо повідомлення з новим часом
+            try:
+                await bot.edit_message_text(
+                    chat_id=int(chat_id),
+                    message_id=message_id,
+                    text=text,
+                    reply_markup=keyboard,
+                    parse_mode="Markdown"
+                )
+                last_text = text
+                edits += 1
+                countdown_stats.edits_sent += 1
+            except Exception:
+                pass
+        
+        countdown_stats.edits_saved += max(0, (duration - 1) // UPDATE_INTERVAL - edits)
         
         # Час збору вийшов - переходимо до голосування або завершуємо
-        await finish_collecting_phase(bot, chat_id, message_id)
+        # (через чергу чату, щоб не перетнутися з /game чи кнопкою)
+        await run_chat_job(key, "collecting timer", lambda: finish_collecting_phase(bot, chat_id, message_id))
         
     except asyncio.CancelledError:
         pass
     finally:
-        _active_timers.pop(chat_id, None)
+        chat_states.release_timer(key, asyncio.current_task())
 
 
 async def finish_collecting_phase(bot: Bot, chat_id: str, message_id: int) -> None:
     """Завершує фазу збору та переходить до голосування."""
-    game = await get_game_by_chat_id(chat_id)
+    game = await get_game_by_chat_id(bot.id, chat_id)
     if not game:
         return
     
     # Отримуємо учасників з відповідями
-    participants = await get_participants_with_answers(chat_id)
+    participants = await get_participants_with_answers(bot.id, chat_id)
+    
+    # Однакові відповіді стають одним варіантом, а ті, що збігаються з правильною, відкидаються
+    groups = group_answers(participants, game.correct_answer)
     
     # Перевіряємо чи достатньо відповідей
-    if len(participants) < 2:
+    if len(participants) < 2 or not groups:
         # Недостатньо учасників - завершуємо гру
-        await update_game_phase(chat_id, "finished")
+        if len(participants) < 2:
+            reason = "Недостатньо учасників (потрібно мінімум 2)."
+        else:
+            reason = "Усі варіанти збіглися з правильною відповіддю."
+        await update_game_phase(bot.id, chat_id, "finished")
+        fact = await get_game_fact(chat_id, game)
         
         try:
             await bot.edit_message_text(
@@ -128,19 +235,24 @@ async def finish_collecting_phase(bot: Bot, chat_id: str, message_id: int) -> No
                 message_id=message_id,
                 text=(
                     f"😔 **Гра скасована**\n\n"
-                    f"Недостатньо учасників (потрібно мінімум 2).\n\n"
+                    f"{reason}\n\n"
                     f"📝 Питання було: {game.question}\n"
                     f"✅ Правильна відповідь: **{game.correct_answer}**\n\n"
-                    f"💡 Факт: {game.fact}"
+                    f"💡 Факт: {fact}"
                 ),
                 parse_mode="Markdown"
             )
         except Exception:
             await bot.send_message(
                 chat_id=int(chat_id),
-                text="😔 Гра скасована - недостатньо учасників.",
+                text=f"😔 Гра скасована. {reason}",
                 parse_mode="Markdown"
             )
+        
+        # Без гравців турнір далі не продовжуємо, але зароблені бали зберігаємо
+        state = chat_states.peek(chat_key(bot.id, chat_id))
+        if state and state.tournament:
+            await finish_tournament(bot, chat_id, state)
         return
     
     # Видаляємо повідомлення з питанням
@@ -149,25 +261,41 @@ async def finish_collecting_phase(bot: Bot, chat_id: str, message_id: int) -> No
     except Exception:
         pass
     
+    # У великих групах відповідей більше ніж місць у Poll - відбираємо справедливо
+    skips = await get_answer_skips(bot.id, chat_id)
+    shown, left_out = select_poll_answers(groups, skips, POLL_PLAYER_SLOTS)
+    if left_out or skips:
+        await update_answer_skips(
+            bot.id,
+            chat_id,
+            shown=[p.user_id for group in shown for p in group],
+            skipped=[p.user_id for group in left_out for p in group]
+        )
+    
     # Створюємо перемішаний список варіантів
     options = []
     
-    # Додаємо варіанти учасників
-    for p in participants:
-        options.append((p.answer, p.user_id, False))
+    # Додаємо варіанти учасників (текст та автор - найранішої з однакових відповідей)
+    for group in shown:
+        options.append((group[0].answer, group, False))
     
     # Додаємо правильну відповідь
-    options.append((game.correct_answer, None, True))
+    options.append((game.correct_answer, [], True))
     
     # Перемішуємо
     random.shuffle(options)
     
     # Зберігаємо варіанти в БД
     options_to_save = [
-        (idx, text, author_id, is_correct)
-        for idx, (text, author_id, is_correct) in enumerate(options)
+        (idx, text, group[0].user_id if group else None, is_correct)
+        for idx, (text, group, is_correct) in enumerate(options)
     ]
-    await save_game_options(chat_id, options_to_save)
+    merged_authors = {
+        idx: [p.user_id for p in group]
+        for idx, (_, group, _) in enumerate(options)
+        if len(group) > 1
+    }
+    await save_game_options(bot.id, chat_id, options_to_save, merged_authors)
     
     # Створюємо Poll
     poll_options = [text for text, _, _ in options]
@@ -177,41 +305,80 @@ async def finish_collecting_phase(bot: Bot, chat_id: str, message_id: int) -> No
         question=f"🎯 {game.question}",
         options=poll_options,
         is_anonymous=False,  # Важливо! Щоб отримувати PollAnswer
-        allows_multiple_answers=False
+        allows_multiple_answers=False,
+        open_period=VOTING_DURATION  # Telegram сам закриє Poll і надішле оновлення
     )
     
-    # Оновлюємо гру з poll_id
+    # Оновлюємо гру з poll_id та часом кінця голосування (для відновлення після перезапуску)
+    deadline = get_clock().time() + VOTING_DURATION + VOTING_CLOSE_GRACE
     await update_game_phase(
+        bot.id,
         chat_id,
         "voting",
         poll_id=poll_msg.poll.id,
-        poll_message_id=poll_msg.message_id
+        poll_message_id=poll_msg.message_id,
+        deadline=deadline
     )
     
-    # Запускаємо таймер голосування
-    timer_task = asyncio.create_task(
-        voting_timer(bot, chat_id, poll_msg.message_id)
-    )
-    _active_timers[chat_id] = timer_task
+    # Резервний таймер на випадок, якщо оновлення про закриття Poll не прийде
+    timer_task = asyncio.create_task(voting_timer(bot, chat_id))
+    chat_states.set_timer(chat_key(bot.id, chat_id), timer_task, deadline)
+    
+    # У турнірі питання наступного раунду генерується, поки йде голосування
+    state = chat_states.peek(chat_key(bot.id, chat_id))
+    tournament = state.tournament if state else None
+    if tournament and tournament.round < tournament.total_rounds and tournament.next_question is None:
+        tournament.next_question = asyncio.create_task(get_question(bot.id, chat_id))
 
 
-async def voting_timer(bot: Bot, chat_id: str, poll_message_id: int) -> None:
-    """Таймер фази голосування."""
+async def voting_timer(bot: Bot, chat_id: str, delay: float = VOTING_DURATION + VOTING_CLOSE_GRACE) -> None:
+    """Резервний таймер фази голосування.
+    
+    Зазвичай результати підраховуються по оновленню Poll (is_closed),
+    цей таймер спрацьовує лише якщо оновлення не надійшло вчасно.
+    """
+    key = chat_key(bot.id, chat_id)
     try:
-        await asyncio.sleep(VOTING_DURATION)
+        await timer_sleep("voting", delay)
         
         # Перевіряємо чи гра ще у фазі голосування
-        game = await get_game_by_chat_id(chat_id)
+        game = await get_game_by_chat_id(bot.id, chat_id)
         if not game or game.phase != "voting":
             return
         
         # Завершуємо голосування
-        await finish_voting_phase(bot, chat_id, poll_message_id)
+        await run_chat_job(key, "voting timer", lambda: finish_voting_phase(bot, chat_id))
         
     except asyncio.CancelledError:
         pass
     finally:
-        _active_timers.pop(chat_id, None)
+        chat_states.release_timer(key, asyncio.current_task())
+
+
+def group_answers(participants: list[Participant], correct_answer: str) -> list[list[Participant]]:
+    """Групує однакові відповіді гравців, відкидаючи ті, що збігаються з правильною."""
+    result = cluster_answers([p.answer for p in participants], correct_answer)
+    return [[participants[i] for i in cluster] for cluster in result.clusters]
+
+
+def select_poll_answers(
+    groups: list[list[Participant]],
+    skips: dict[int, int],
+    slots: int
+) -> tuple[list[list[Participant]], list[list[Participant]]]:
+    """Відбирає варіанти (групи однакових відповідей) для Poll. Повертає (показані, пропущені).
+    
+    Першими йдуть варіанти гравців, чия відповідь найдовше не потрапляла в опитування,
+    серед рівних - випадково, тож кожен рано чи пізно буде у Poll.
+    """
+    if len(groups) <= slots:
+        return list(groups), []
+    
+    ordered = sorted(
+        groups,
+        key=lambda group: (-max(skips.get(p.user_id, 0) for p in group), random.random())
+    )
+    return ordered[:slots], ordered[slots:]
 
 
 async def get_user_mention(bot: Bot, user_id: int) -> str:
@@ -224,6 +391,21 @@ async def get_user_mention(bot: Bot, user_id: int) -> str:
         return f"[User{user_id}](tg://user?id={user_id})"
 
 
+async def get_user_mentions(bot: Bot, user_ids: set[int]) -> dict[int, str]:
+    """Отримує mention для кількох користувачів паралельно."""
+    ids = list(user_ids)
+    mentions = await asyncio.gather(*(get_user_mention(bot, user_id) for user_id in ids))
+    return dict(zip(ids, mentions))
+
+
+def format_mentions(user_ids: list[int], mentions: dict[int, str]) -> str:
+    """Форматує список згадок, обрізаючи його до MAX_MENTIONS."""
+    text = ", ".join(mentions[user_id] for user_id in user_ids[:MAX_MENTIONS])
+    if len(user_ids) > MAX_MENTIONS:
+        text += f" та ще {len(user_ids) - MAX_MENTIONS}"
+    return text
+
+
 def format_points(points: int) -> str:
     """Форматує бали з правильним відмінюванням."""
     if points == 1:
@@ -234,32 +416,41 @@ def format_points(points: int) -> str:
         return f"+{points} балів"
 
 
-async def finish_voting_phase(bot: Bot, chat_id: str, poll_message_id: int) -> None:
-    """Завершує голосування та показує результати."""
-    game = await get_game_by_chat_id(chat_id)
+async def finish_voting_phase(bot: Bot, chat_id: str) -> None:
+    """Завершує голосування та показує результати.
+    
+    Poll закривається самим Telegram через open_period, тому stop_poll не потрібен.
+    Може викликатись і з оновлення Poll, і з резервного таймера — підсумки
+    рахуються лише один раз.
+    """
+    game = await get_game_by_chat_id(bot.id, chat_id)
     if not game:
         return
     
-    # Закриваємо Poll
-    try:
-        await bot.stop_poll(chat_id=int(chat_id), message_id=poll_message_id)
-    except Exception:
-        pass
+    # Атомарно переводимо гру у finished, щоб не порахувати бали двічі
+    if not await transition_game_phase(bot.id, chat_id, "voting", "finished"):
+        return
     
-    # Оновлюємо фазу гри
-    await update_game_phase(chat_id, "finished")
+    # Резервний таймер більше не потрібен
+    chat_states.cancel_timer(chat_key(bot.id, chat_id))
     
     # Отримуємо варіанти та голоси
-    options = await get_game_options(chat_id)
-    votes = await get_poll_votes(chat_id)
+    options = await get_game_options(bot.id, chat_id)
+    votes = await get_poll_votes(bot.id, chat_id)
     
-    # Створюємо мапу option_index -> option
+    # Створюємо мапу option_index -> option та авторів кожного варіанту
     options_map = {opt.option_index: opt for opt in options}
+    merged_authors = await get_option_authors(bot.id, chat_id)
+    option_authors = {
+        opt.option_index: merged_authors.get(opt.option_index, [opt.author_user_id])
+        for opt in options
+        if not opt.is_correct and opt.author_user_id
+    }
     
     # Збираємо інформацію для результатів
     correct_voters: list[int] = []  # user_ids хто вгадав
-    # option_index -> list of voter_ids (для варіантів гравців)
-    option_voters: dict[int, list[int]] = {}
+    # option_index -> list of voter_ids (для варіантів гравців, без голосу автора за себе)
+    option_voters: dict[int, list[int]] = defaultdict(list)
     
     for vote in votes:
         option = options_map.get(vote.option_index)
@@ -268,67 +459,89 @@ async def finish_voting_phase(bot: Bot, chat_id: str, poll_message_id: int) -> N
         
         if option.is_correct:
             correct_voters.append(vote.user_id)
-        else:
-            if vote.option_index not in option_voters:
-                option_voters[vote.option_index] = []
+        elif vote.user_id not in option_authors.get(vote.option_index, []):  # Не враховуємо голос за себе
             option_voters[vote.option_index].append(vote.user_id)
     
-    # Підраховуємо бали
-    score_changes: dict[int, int] = {}  # user_id -> points
+    # Підраховуємо бали: +2 за правильну відповідь, +1 автору за кожного обдуреного
+    score_events = [
+        ScoreEvent(user_id, "correct", 1, CORRECT_ANSWER_POINTS, game.message_id)
+        for user_id in correct_voters
+    ]
+    for option_idx, voter_ids in option_voters.items():
+        # Кожен автор однакової відповіді отримує бали за всіх обдурених
+        for author_id in option_authors.get(option_idx, []):
+            score_events.append(
+                ScoreEvent(author_id, "fooled", len(voter_ids), len(voter_ids), game.message_id)
+            )
     
-    # +2 бали за правильну відповідь
-    for user_id in correct_voters:
-        score_changes[user_id] = score_changes.get(user_id, 0) + 2
+    # Дописуємо нарахування раунду в журнал однією вставкою (у турнірі - в кінці турніру)
+    state = chat_states.peek(chat_key(bot.id, chat_id))
+    tournament = state.tournament if state else None
+    if tournament:
+        tournament.events.extend(score_events)
+    else:
+        await add_score_events(bot.id, chat_id, score_events)
     
-    # +1 бал автору за кожен голос (крім голосу за себе)
-    for option_idx, voter_ids in option_voters.items():
-        option = options_map.get(option_idx)
-        if option and option.author_user_id:
-            author_id = option.author_user_id
-            for voter_id in voter_ids:
-                if voter_id != author_id:  # Не враховуємо голос за себе
-                    score_changes[author_id] = score_changes.get(author_id, 0) + 1
+    # Раунд в архів для аналітики - наступна гра чату перезапише його дані
+    await archive_round(bot.id, chat_id)
     
-    # Зберігаємо бали в БД
-    for user_id, points in score_changes.items():
-        await add_user_score(chat_id, user_id, points)
+    # Варіанти гравців та скільки відповідей не потрапило в опитування
+    player_options = [opt for opt in options if opt.option_index in option_authors]
+    shown_authors = {user_id for authors in option_authors.values() for user_id in authors}
+    not_shown = [
+        p for p in await get_participants_with_answers(bot.id, chat_id)
+        if p.user_id not in shown_authors
+    ]
+    # Відповіді, що збіглися з правильною, не пропущені - їх просто не показуємо
+    matched_correct_count = len(cluster_answers([p.answer for p in not_shown], game.correct_answer).correct)
+    left_out_count = len(not_shown) - matched_correct_count
+    
+    # Отримуємо імена лише тих, кого покажемо (списки обрізаються до MAX_MENTIONS)
+    mention_ids = set(correct_voters[:MAX_MENTIONS])
+    for option in player_options:
+        mention_ids.update(option_authors[option.option_index][:MAX_MENTIONS])
+        mention_ids.update(option_voters.get(option.option_index, [])[:MAX_MENTIONS])
+    mentions = await get_user_mentions(bot, mention_ids)
     
     # Формуємо повідомлення з результатами
-    result_text = "🏆 Результати гри!\n"
+    if tournament:
+        result_text = f"🏆 Результати раунду {tournament.round}/{tournament.total_rounds}!\n"
+    else:
+        result_text = "🏆 Результати гри!\n"
     result_text += f"Питання: {game.question}\n\n"
     result_text += f"✅ Правильно: {game.correct_answer}\n"
     
     # Хто вгадав правильно
     if correct_voters:
-        mentions = []
-        for user_id in correct_voters:
-            mention = await get_user_mention(bot, user_id)
-            mentions.append(mention)
-        result_text += f"({', '.join(mentions)}) {format_points(2)}\n\n"
+        result_text += f"({format_mentions(correct_voters, mentions)}) {format_points(CORRECT_ANSWER_POINTS)}\n\n"
     else:
         result_text += "(ніхто не вгадав)\n\n"
     
     # Інші відповіді гравців
-    player_options = [opt for opt in options if not opt.is_correct and opt.author_user_id]
     for option in player_options:
-        author_mention = await get_user_mention(bot, option.author_user_id)
-        all_voters = option_voters.get(option.option_index, [])
-        
-        # Фільтруємо: не показуємо автора якщо він проголосував за себе
-        voters = [v for v in all_voters if v != option.author_user_id]
-        points_earned = len(voters)  # +1 бал за кожен голос від інших
+        author_mention = format_mentions(option_authors[option.option_index], mentions)
+        voters = option_voters.get(option.option_index, [])
         
         if voters:
-            result_text += f"— {author_mention}: \"{option.option_text}\" {format_points(points_earned)}\n"
-            voter_mentions = []
-            for voter_id in voters:
-                voter_mention = await get_user_mention(bot, voter_id)
-                voter_mentions.append(voter_mention)
-            result_text += f"({', '.join(voter_mentions)})\n\n"
+            result_text += f"— {author_mention}: \"{option.option_text}\" {format_points(len(voters))}\n"
+            result_text += f"({format_mentions(voters, mentions)})\n\n"
         else:
             result_text += f"— {author_mention}: \"{option.option_text}\"\n\n"
     
-    result_text += f"💡 Факт: {game.fact}"
+    if left_out_count > 0:
+        result_text += (
+            f"📭 Ще {left_out_count} варіантів не вмістились в опитування — "
+            f"наступного разу вони будуть першими\n\n"
+        )
+    
+    if matched_correct_count > 0:
+        result_text += f"🎯 Ще {matched_correct_count} варіантів збіглися з правильною відповіддю\n\n"
+    
+    result_text += f"💡 Факт: {await get_game_fact(chat_id, game)}"
+    
+    if tournament:
+        await send_tournament_round_results(bot, chat_id, state, result_text)
+        return
     
     # Кнопка для нової гри
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
@@ -343,68 +556,304 @@ async def finish_voting_phase(bot: Bot, chat_id: str, poll_message_id: int) -> N
     )
 
 
-def check_cooldown(chat_id: str) -> int | None:
+async def build_standings(bot: Bot, tournament: Tournament) -> str:
+    """Таблиця турніру за балами всіх зіграних раундів."""
+    totals: Counter[int] = Counter()
+    for event in tournament.events:
+        totals[event.user_id] += event.points
+    if not totals:
+        return "Поки ніхто не набрав балів"
+    
+    leaders = totals.most_common(MAX_MENTIONS)
+    mentions = await get_user_mentions(bot, {user_id for user_id, _ in leaders})
+    medals = ["🥇", "🥈", "🥉"]
+    lines = [
+        f"{medals[i] if i < 3 else f'{i + 1}.'} {mentions[user_id]} — {points}"
+        for i, (user_id, points) in enumerate(leaders)
+    ]
+    if len(totals) > MAX_MENTIONS:
+        lines.append(f"та ще {len(totals) - MAX_MENTIONS}")
+    return "\n".join(lines)
+
+
+async def send_tournament_round_results(bot: Bot, chat_id: str, state: ChatState, result_text: str) -> None:
+    """Показує результати раунду турніру та запускає наступний або завершує турнір."""
+    tournament = state.tournament
+    if tournament.round >= tournament.total_rounds:
+        await bot.send_message(chat_id=int(chat_id), text=result_text, parse_mode="Markdown")
+        await finish_tournament(bot, chat_id, state)
+        return
+    
+    result_text += (
+        f"\n\n📊 **Турнір після {tournament.round}/{tournament.total_rounds}:**\n"
+        f"{await build_standings(bot, tournament)}\n\n"
+        f"⏭ Наступний раунд за {TOURNAMENT_ROUND_PAUSE} сек"
+    )
+    await bot.send_message(chat_id=int(chat_id), text=result_text, parse_mode="Markdown")
+    
+    timer_task = asyncio.create_task(tournament_next_round(bot, chat_id))
+    chat_states.set_timer(chat_key(bot.id, chat_id), timer_task)
+
+
+async def tournament_next_round(bot: Bot, chat_id: str) -> None:
+    """Пауза між раундами турніру, після якої стартує наступний."""
+    key = chat_key(bot.id, chat_id)
+    try:
+        await timer_sleep("tournament", TOURNAMENT_ROUND_PAUSE)
+        await run_chat_job(key, "tournament timer", lambda: start_tournament_round(bot, chat_id))
+    except asyncio.CancelledError:
+        pass
+    finally:
+        chat_states.release_timer(key, asyncio.current_task())
+
+
+async def start_tournament_round(bot: Bot, chat_id: str) -> None:
+    """Стартує наступний раунд турніру з уже згенерованим питанням."""
+    state = chat_states.get(chat_key(bot.id, chat_id))
+    tournament = state.tournament
+    if tournament is None:
+        return
+    
+    tournament.round += 1
+    question_task, tournament.next_question = tournament.next_question, None
+    status_msg = await bot.send_message(
+        chat_id=int(chat_id),
+        text=f"⏳ Раунд {tournament.round}/{tournament.total_rounds}..."
+    )
+    await start_new_game(bot, chat_id, status_msg, question_task)
+
+
+async def finish_tournament(bot: Bot, chat_id: str, state: ChatState) -> None:
+    """Завершує турнір: записує бали всіх раундів однією вставкою та показує підсумок."""
+    tournament, state.tournament = state.tournament, None
+    if tournament.next_question:
+        cancel_question_task(tournament.next_question)
+    
+    await add_score_events(bot.id, chat_id, tournament.events)
+    
+    keyboard = InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text="🎮 Го ще одну", callback_data="new_game")]
+    ])
+    await bot.send_message(
+        chat_id=int(chat_id),
+        text=(
+            f"🏁 **Турнір завершено!** Зіграно раундів: {tournament.round}/{tournament.total_rounds}\n\n"
+            f"{await build_standings(bot, tournament)}"
+        ),
+        reply_markup=keyboard,
+        parse_mode="Markdown"
+    )
+
+
+def cancel_question_task(question_task: asyncio.Task) -> None:
+    """Скасовує генерацію питання, зокрема факт, що ще дописується."""
+    if not question_task.done():
+        question_task.cancel()
+    elif not question_task.cancelled() and not question_task.exception():
+        fact_task = question_task.result().fact_task
+        if fact_task:
+            fact_task.cancel()
+
+
+async def store_fact(bot_id: int, chat_id: str, message_id: int, fact_task: asyncio.Task) -> str:
+    """Дочекується факту з потокової генерації та зберігає його в гру."""
+    try:
+        fact = await fact_task
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        logger.warning("Failed to stream fact for chat %s: %r", chat_id, e)
+        return ""
+    await update_game_fact(bot_id, chat_id, message_id, fact)
+    return fact
+
+
+async def get_game_fact(chat_id: str, game: Game) -> str:
+    """Повертає факт гри, за потреби дочекавшись завершення його генерації."""
+    if game.fact:
+        return game.fact
+    
+    state = chat_states.peek(chat_key(game.bot_id, chat_id))
+    if state is None or state.fact_task is None:
+        return game.fact
+    
+    try:
+        fact = await asyncio.wait_for(asyncio.shield(state.fact_task), FACT_WAIT_TIMEOUT)
+    except Exception:
+        return game.fact
+    return fact or game.fact
+
+
+def check_cooldown(bot_id: int, chat_id: str) -> int | None:
     """Перевіряє cooldown. Повертає залишок секунд або None якщо можна грати."""
-    current_time = time.time()
-    last_time = _last_game_time.get(chat_id, 0)
-    time_passed = current_time - last_time
+    state = chat_states.peek(chat_key(bot_id, chat_id))
+    if state is None:
+        return None
+    
+    time_passed = get_clock().time() - state.last_game_time
     
     if time_passed < GAME_COOLDOWN:
         return int(GAME_COOLDOWN - time_passed)
     return None
 
 
-async def start_new_game(bot: Bot, chat_id: str, status_msg: Message) -> None:
-    """Створює нову гру."""
-    # Скасовуємо попередній таймер якщо він існує
-    if chat_id in _active_timers:
-        _active_timers[chat_id].cancel()
+async def start_new_game(
+    bot: Bot,
+    chat_id: str,
+    status_msg: Message,
+    question_task: Optional[asyncio.Task] = None
+) -> None:
+    """Створює нову гру.
+    
+    question_task - питання, яке вже генерується заздалегідь (наступний раунд турніру).
+    """
+    # Скасовуємо попередній таймер та генерацію факту якщо вони існують
+    key = chat_key(bot.id, chat_id)
+    chat_states.cancel_timer(key)
+    state = chat_states.get(key)
+    if state.fact_task:
+        state.fact_task.cancel()
+        state.fact_task = None
     
     # Оновлюємо час останньої гри
-    _last_game_time[chat_id] = time.time()
+    state.last_game_time = get_clock().time()
+    question_data = None
+    title = GAME_TITLE
+    if state.tournament:
+        title = f"🏁 **Турнір: раунд {state.tournament.round}/{state.tournament.total_rounds}**"
     
     try:
-        # Отримуємо факт
-        fact_text = await get_random_fact()
+        if question_task:
+            try:
+                question_data = await question_task
+            except Exception as e:
+                logger.warning("Prefetched question failed for chat %s: %r", chat_id, e)
         
-        # Генеруємо питання через AI
-        question_data = await generate_question(fact_text)
+        # Генеруємо питання (з обмеженням часу та резервним банком питань)
+        if question_data is None:
+            question_data = await get_question(bot.id, chat_id)
         
         # Видаляємо статусне повідомлення
         await status_msg.delete()
         
         # Відправляємо повідомлення про гру
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(
-                text="🎯 Дати відповідь",
-                url=f"https://t.me/{BOT_USERNAME}?start={chat_id}"
-            )]
-        ])
-        
         game_msg = await bot.send_message(
             chat_id=int(chat_id),
-            text=build_collecting_message(question_data.question, COLLECTING_DURATION),
-            reply_markup=keyboard,
+            text=build_collecting_message(question_data.question, COLLECTING_DURATION, title),
+            reply_markup=build_answer_keyboard(bot, chat_id),
             parse_mode="Markdown"
         )
         
-        # Зберігаємо в базу з message_id
+        # Зберігаємо в базу з message_id та часом кінця збору (для відновлення після перезапуску)
+        deadline = get_clock().time() + COLLECTING_DURATION
         await upsert_game(
+            bot_id=bot.id,
             chat_id=chat_id,
             question=question_data.question,
             correct_answer=question_data.answer,
             fact=question_data.fact,
-            message_id=game_msg.message_id
+            message_id=game_msg.message_id,
+            deadline=deadline
         )
         
+        # Факт ще генерується - дописуємо його у фоні, він потрібен лише в кінці раунду
+        if question_data.fact_task:
+            state.fact_task = asyncio.create_task(
+                store_fact(bot.id, chat_id, game_msg.message_id, question_data.fact_task)
+            )
+        
         # Запускаємо таймер збору відповідей
         timer_task = asyncio.create_task(
-            collecting_timer(bot, chat_id, question_data.question, game_msg.message_id)
+            collecting_timer(bot, chat_id, question_data.question, game_msg.message_id, title)
         )
-        _active_timers[chat_id] = timer_task
+        chat_states.set_timer(key, timer_task, deadline)
         
     except Exception as e:
+        if question_data and question_data.fact_task and not state.fact_task:
+            question_data.fact_task.cancel()
         await status_msg.edit_text(f"❌ Помилка при створенні гри: {e}")
+        if state.tournament:
+            await finish_tournament(bot, chat_id, state)
+
+
+async def resume_games(bot: Bot) -> int:
+    """Відновлює таймери незавершених ігор після перезапуску. Повертає кількість ігор.
+    
+    Фаза, час якої вийшов, поки бот не працював, завершується одразу.
+    """
+    now = get_clock().time()
+    games = await get_active_games(bot.id)
+    for game in games:
+        remaining = max(0.0, (game.deadline or now) - now)
+        if game.phase == "collecting":
+            timer = collecting_timer(bot, game.chat_id, game.question, game.message_id, duration=math.ceil(remaining))
+        else:
+            timer = voting_timer(bot, game.chat_id, remaining)
+        chat_states.set_timer(chat_key(bot.id, game.chat_id), asyncio.create_task(timer), now + remaining)
+        logger.info("Resumed %s phase in chat %s (%.0fs left)", game.phase, game.chat_id, remaining)
+    return len(games)
+
+
+async def drain_games(bots: dict[int, Bot], window: float, timeout: float) -> dict[str, int]:
+    """Завершення роботи: дочекується фаз, що ось-ось закінчаться, решту лишає на відновлення.
+    
+    Таймери з кінцем фази в межах window секунд відпрацьовують (у межах timeout),
+    інші скасовуються - їхній час уже збережено в games.deadline. Турніри не
+    переживають перезапуск, тому завершуються із записом балів усіх зіграних раундів.
+    """
+    now = get_clock().time()
+    drained: list[asyncio.Task] = []
+    pending_facts: list[asyncio.Task] = []
+    persisted = 0
+    for key, state in chat_states.items():
+        if state.fact_task and not state.fact_task.done():
+            pending_facts.append(state.fact_task)
+        if not state.has_active_timer():
+            continue
+        if state.timer_deadline is not None and state.timer_deadline - now <= window:
+            drained.append(state.timer)
+        else:
+            persisted += state.timer_deadline is not None
+            chat_states.cancel_timer(key)
+    
+    # Факти теж дописуються в базу - вони потрібні відновленим іграм
+    if drained or pending_facts:
+        await asyncio.wait(drained + pending_facts, timeout=timeout)
+    
+    timed_out = 0
+    for task in drained:
+        if not task.done():
+            task.cancel()
+            timed_out += 1
+    
+    # Таймери наступних фаз, запущені дочеканими переходами, теж лишаються на відновлення,
+    # а пауза між раундами турніру просто скасовується
+    tournaments = 0
+    for key, state in chat_states.items():
+        if state.has_active_timer():
+            persisted += state.timer_deadline is not None
+            chat_states.cancel_timer(key)
+        if state.tournament:
+            bot_id, chat_id = split_chat_key(key)
+            try:
+                await finish_tournament(bots[bot_id], chat_id, state)
+            except Exception as e:
+                logger.warning("Failed to finish tournament in chat %s: %r", chat_id, e)
+            tournaments += 1
+    
+    return {
+        "timers_drained": len(drained) - timed_out,
+        "timers_timed_out": timed_out,
+        "timers_persisted": persisted,
+        "facts_pending": len(pending_facts),
+        "tournaments_finished": tournaments
+    }
+
+
+def tournament_running(bot_id: int, chat_id: str) -> bool:
+    """Чи триває в чаті турнір (тоді окремі ігри не створюються)."""
+    state = chat_states.peek(chat_key(bot_id, chat_id))
+    return state is not None and state.tournament is not None
 
 
 @router.message(Command("game"), F.chat.type.in_({ChatType.GROUP, ChatType.SUPERGROUP}))
@@ -413,8 +862,12 @@ async def cmd_game(message: Message) -> None:
     chat_id = str(message.chat.id)
     bot = message.bot
     
+    if tournament_running(bot.id, chat_id):
+        await message.answer("🏁 Зараз триває турнір, нова гра - після його завершення.")
+        return
+    
     # Перевіряємо кулдаун
-    remaining = check_cooldown(chat_id)
+    remaining = check_cooldown(bot.id, chat_id)
     if remaining:
         await message.answer(f"⏱ Зачекайте ще {remaining} сек. перед створенням нової гри.")
         return
@@ -424,20 +877,52 @@ async def cmd_game(message: Message) -> None:
     await start_new_game(bot, chat_id, status_msg)
 
 
+@router.message(Command("tournament"), F.chat.type.in_({ChatType.GROUP, ChatType.SUPERGROUP}))
+async def cmd_tournament(message: Message, command: CommandObject) -> None:
+    """Обробник команди /tournament [N] - турнір з N раундів поспіль."""
+    chat_id = str(message.chat.id)
+    bot = message.bot
+    
+    if tournament_running(bot.id, chat_id):
+        await message.answer("🏁 Турнір вже триває.")
+        return
+    
+    rounds = TOURNAMENT_DEFAULT_ROUNDS
+    if command.args:
+        if not command.args.strip().isdigit() or not 2 <= int(command.args) <= TOURNAMENT_MAX_ROUNDS:
+            await message.answer(f"Вкажіть кількість раундів від 2 до {TOURNAMENT_MAX_ROUNDS}, наприклад /tournament 5")
+            return
+        rounds = int(command.args)
+    
+    remaining = check_cooldown(bot.id, chat_id)
+    if remaining:
+        await message.answer(f"⏱ Зачекайте ще {remaining} сек. перед створенням нової гри.")
+        return
+    
+    state = chat_states.get(chat_key(bot.id, chat_id))
+    state.tournament = Tournament(total_rounds=rounds, round=1)
+    status_msg = await message.answer(f"🏁 Турнір з {rounds} раундів! ⏳ Раунд 1/{rounds}...")
+    await start_new_game(bot, chat_id, status_msg)
+
+
 @router.callback_query(F.data == "new_game")
 async def callback_new_game(callback: CallbackQuery) -> None:
     """Обробник кнопки 'Нова гра'."""
     chat_id = str(callback.message.chat.id)
     bot = callback.bot
     
+    if tournament_running(bot.id, chat_id):
+        await callback.answer("🏁 Зараз триває турнір", show_alert=True)
+        return
+    
     # Перевіряємо кулдаун
-    remaining = check_cooldown(chat_id)
+    remaining = check_cooldown(bot.id, chat_id)
     if remaining:
         await callback.answer(f"⏱ Зачекайте ще {remaining} сек.", show_alert=True)
         return
     
     # Одразу ресетимо таймер щоб запобігти подвійному натисканню
-    _last_game_time[chat_id] = time.time()
+    chat_states.get(chat_key(bot.id, chat_id)).last_game_time = get_clock().time()
     
     await callback.answer()
     
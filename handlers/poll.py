@@ -1,20 +1,22 @@
-from aiogram import Router
-from aiogram.types import PollAnswer
+from aiogram import Router, F, Bot
+from aiogram.types import PollAnswer, Poll
 
 from database import get_game_by_poll_id, save_poll_vote
+from executor import executor, chat_key
+from .game import finish_voting_phase, run_chat_job
 
 
 router = Router()
 
 
 @router.poll_answer()
-async def on_poll_answer(poll_answer: PollAnswer) -> None:
+async def on_poll_answer(poll_answer: PollAnswer, bot: Bot) -> None:
     """Обробник голосів у Poll."""
     poll_id = poll_answer.poll_id
     user_id = poll_answer.user.id
     
     # Знаходимо гру за poll_id
-    game = await get_game_by_poll_id(poll_id)
+    game = await get_game_by_poll_id(bot.id, poll_id)
     
     if not game:
         return
@@ -29,5 +31,24 @@ async def on_poll_answer(poll_answer: PollAnswer) -> None:
     
     option_index = poll_answer.option_ids[0]
     
-    # Зберігаємо голос
-    await save_poll_vote(game.chat_id, user_id, option_index)
+    async def save_vote() -> None:
+        # Підсумок могли підбити, поки голос чекав у черзі
+        current = await get_game_by_poll_id(bot.id, poll_id)
+        if current and current.phase == "voting":
+            await save_poll_vote(bot.id, current.chat_id, user_id, option_index)
+    
+    # PollAnswer не містить чату - зберігаємо голос через чергу чату гри, щоб він
+    # записався до підсумку, який ставить у ту саму чергу закриття Poll
+    await run_chat_job(chat_key(bot.id, game.chat_id), "poll answer", save_vote)
+
+
+@router.poll(F.is_closed)
+async def on_poll_closed(poll: Poll, bot: Bot) -> None:
+    """Обробник закриття Poll (open_period вийшов) - підраховує результати."""
+    game = await get_game_by_poll_id(bot.id, poll.id)
+    
+    if not game or game.phase != "voting":
+        return
+    
+    # Poll update не містить чату, тому ставимо підсумок у чергу чату гри
+    await executor.run(chat_key(bot.id, game.chat_id), lambda: finish_voting_phase(bot, game.chat_id))
@@ -2,15 +2,16 @@ import re
 from aiogram import Router, F, Bot
 from aiogram.types import Message
 from aiogram.filters import CommandStart, CommandObject, Command
-from aiogram.enums import ChatType
+from aiogram.enums import ChatType, ChatMemberStatus
 
+from budget import budgets
+from executor import chat_key
 from database import (
-    get_game_by_chat_id,
-    get_participant,
-    add_participant,
-    get_participants_count,
+    JoinStatus,
+    join_game,
     get_leaderboard,
-    get_daily_top_players
+    get_daily_top_players,
+    get_player_stats
 )
 
 RULES_TEXT = """🎮 <b>Правила гри "Варіанти"</b>
@@ -35,11 +36,11 @@ RULES_TEXT = """🎮 <b>Правила гри "Варіанти"</b>
 
 router = Router()
 
-MAX_PARTICIPANTS = 9  # 10 варіантів в poll - 1 правильна відповідь
+MAX_PARTICIPANTS = 500  # у Poll потрапляють не всі варіанти, див. select_poll_answers
 
 
 @router.message(CommandStart(deep_link=True), F.chat.type == ChatType.PRIVATE)
-async def cmd_start_with_game(message: Message, command: CommandObject) -> None:
+async def cmd_start_with_game(message: Message, command: CommandObject, bot: Bot) -> None:
     """Обробник команди /start {chat_id} - приєднання до гри."""
     user_id = message.from_user.id
     args = command.args
@@ -54,45 +55,25 @@ async def cmd_start_with_game(message: Message, command: CommandObject) -> None:
     
     game_chat_id = args
     
-    # Перевіряємо чи гра існує та активна (фаза збору відповідей)
-    game = await get_game_by_chat_id(game_chat_id)
+    # Перевірка фази, ліміту та участі + додавання — однією транзакцією
+    result = await join_game(bot.id, game_chat_id, user_id, MAX_PARTICIPANTS)
     
-    if not game or game.phase != "collecting":
+    if result.status == JoinStatus.NO_GAME:
         await message.answer("Активну гру не знайдено або час на відповіді вийшов :(")
         return
     
-    # Перевіряємо чи користувач вже брав участь
-    participant = await get_participant(game_chat_id, user_id)
-    
-    if participant:
-        if participant.answer:
-            await message.answer("Здається ти вже дав свій варіант...")
-        else:
-            # Вже зареєстрований, але ще не відповів - нагадуємо питання
-            await message.answer(
-                f"Дай свій правдоподібний але неправильний варіант відповіді на запитання:\n\n"
-                f"_{game.question}_",
-                parse_mode="Markdown"
-            )
+    if result.status == JoinStatus.ALREADY_ANSWERED:
+        await message.answer("Здається ти вже дав свій варіант...")
         return
     
-    # Перевіряємо ліміт учасників
-    participants_count = await get_participants_count(game_chat_id)
-    if participants_count >= MAX_PARTICIPANTS:
-        await message.answer("Вибачте, всі місця зайняті (максимум 9 учасників)")
+    if result.status == JoinStatus.FULL:
+        await message.answer(f"Вибачте, всі місця зайняті (максимум {MAX_PARTICIPANTS} учасників)")
         return
     
-    # Додаємо учасника
-    added = await add_participant(game_chat_id, user_id)
-    
-    if not added:
-        await message.answer("Здається ти вже дав свій варіант...")
-        return
-    
-    # Відправляємо питання
+    # JOINED або ALREADY_JOINED (ще не відповів) - відправляємо/нагадуємо питання
     await message.answer(
         f"Дай свій правдоподібний але неправильний варіант відповіді на запитання:\n\n"
-        f"_{game.question}_",
+        f"_{result.question}_",
         parse_mode="Markdown"
     )
 
@@ -130,10 +111,10 @@ async def cmd_scores(message: Message) -> None:
     bot = message.bot
     
     # Отримуємо топ 3 гравців за день
-    daily_top = await get_daily_top_players(chat_id, limit=3)
+    daily_top = await get_daily_top_players(bot.id, chat_id, limit=3)
     
     # Отримуємо загальний топ 10
-    leaderboard = await get_leaderboard(chat_id, limit=10)
+    leaderboard = await get_leaderboard(bot.id, chat_id, limit=10)
     
     if not leaderboard:
         await message.answer("📊 Ще немає результатів. Почніть гру командою /game")
@@ -160,3 +141,64 @@ async def cmd_scores(message: Message) -> None:
         result_text += f"{prefix} {mention} — {player.score}\n"
     
     await message.answer(result_text, parse_mode="Markdown")
+
+
+@router.message(Command("stats"), F.chat.type.in_({ChatType.GROUP, ChatType.SUPERGROUP}))
+async def cmd_stats(message: Message) -> None:
+    """Обробник команди /stats - статистика гравця (свого або того, на чиє повідомлення відповідь)."""
+    chat_id = str(message.chat.id)
+    bot = message.bot
+    user = message.from_user
+    if message.reply_to_message and message.reply_to_message.from_user:
+        user = message.reply_to_message.from_user
+    
+    stats = await get_player_stats(bot.id, chat_id, user.id)
+    mention = await get_user_mention(bot, user.id)
+    
+    if not stats:
+        await message.answer(
+            f"📈 {mention} ще не грав(ла) в цьому чаті. Почніть гру командою /game",
+            parse_mode="Markdown"
+        )
+        return
+    
+    await message.answer(
+        f"📈 *Статистика* {mention}\n\n"
+        f"🎮 Раундів зіграно: {stats.rounds_played}\n"
+        f"✅ Вгадано: {stats.correct_guesses} з {stats.votes_cast} ({stats.accuracy:.0%})\n"
+        f"🎭 Варіант обдурив когось: {stats.rounds_fooling} з {stats.options_shown} ({stats.fooling_rate:.0%})\n"
+        f"🤡 Обдурено гравців: {stats.players_fooled}",
+        parse_mode="Markdown"
+    )
+
+
+def format_budget_line(title: str, usage: dict, share: float | None, exceeded: bool) -> str:
+    """Рядок витрат для /budget: токени, вартість та частка бюджету."""
+    line = f"{title}: {usage['tokens']} токенів, ${usage['cost']:.4f}"
+    if share is not None:
+        line += f" ({share:.0%} бюджету)"
+    if exceeded:
+        line += " — вичерпано"
+    return line
+
+
+@router.message(Command("budget"), F.chat.type.in_({ChatType.GROUP, ChatType.SUPERGROUP}))
+async def cmd_budget(message: Message) -> None:
+    """Обробник команди /budget - витрати на генерацію питань за сьогодні (лише для адмінів)."""
+    bot = message.bot
+    member = await bot.get_chat_member(message.chat.id, message.from_user.id)
+    if member.status not in {ChatMemberStatus.CREATOR, ChatMemberStatus.ADMINISTRATOR}:
+        await message.answer("Команда доступна лише адміністраторам чату.")
+        return
+    
+    status = budgets.status(chat_key(bot.id, str(message.chat.id)))
+    text = (
+        f"💰 *Генерація питань за {status['day']}*\n\n"
+        f"{format_budget_line('💬 Цей чат', status['chat'], status['chat_share'], status['chat_exceeded'])}\n"
+        f"{format_budget_line('🌐 Усі чати', status['total'], status['total_share'], status['global_exceeded'])}\n\n"
+        f"🤖 Згенеровано питань: {status['chat']['generated']}\n"
+        f"📚 З банку через ліміт: {status['chat']['throttled']}"
+    )
+    if status["chat_exceeded"] or status["global_exceeded"]:
+        text += "\n\nДо кінця доби нові питання беруться з банку, без генерації."
+    await message.answer(text, parse_mode="Markdown")
@@ -1,8 +1,9 @@
-from aiogram import Router, F
+from aiogram import Router, F, Bot
 from aiogram.types import Message
 from aiogram.enums import ChatType
 
 from database import get_participant_by_user, update_participant_answer
+from moderation import moderation
 
 
 router = Router()
@@ -18,7 +19,7 @@ def truncate_answer(text: str) -> str:
 
 
 @router.message(F.chat.type == ChatType.PRIVATE, F.text)
-async def handle_variant(message: Message) -> None:
+async def handle_variant(message: Message, bot: Bot) -> None:
     """Обробник текстових повідомлень - запис варіанту відповіді."""
     user_id = message.from_user.id
     text = message.text
@@ -28,7 +29,7 @@ async def handle_variant(message: Message) -> None:
         return
     
     # Перевіряємо чи користувач в активній грі
-    participant = await get_participant_by_user(user_id)
+    participant = await get_participant_by_user(bot.id, user_id)
     
     if not participant:
         await message.answer(
@@ -43,9 +44,16 @@ async def handle_variant(message: Message) -> None:
         )
         return
     
+    # Відповідь публікується у групі - перевіряємо її до збереження
+    if moderation.check(text):
+        await message.answer(
+            "🚫 Такий варіант не можна показати у групі, напиши інший"
+        )
+        return
+    
     # Обрізаємо та зберігаємо відповідь
     answer = truncate_answer(text)
-    updated = await update_participant_answer(user_id, answer)
+    updated = await update_participant_answer(bot.id, user_id, answer)
     
     if updated:
         await message.answer(
@@ -0,0 +1,145 @@
+import sys
+import time
+import asyncio
+import logging
+import threading
+import traceback
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
+
+
+logger = logging.getLogger(__name__)
+
+LAG_SAMPLE_INTERVAL = 0.1  # секунд між вимірами затримки event loop
+STALL_THRESHOLD = 0.5  # секунд без відгуку loop, після яких логуємо стек
+LATE_TIMER_THRESHOLD = 1.0  # на скільки секунд таймер гри може спізнитись без обліку
+SUMMARY_INTERVAL = 60  # секунд між підсумками в лог
+STACK_LIMIT = 30  # кадрів стеку в лозі
+
+
+@dataclass
+class WatchdogStats:
+    samples: int = 0
+    lag_max: float = 0.0
+    lag_total: float = 0.0
+    stalls: int = 0
+    stall_max: float = 0.0
+    timer_firings: Counter[str] = field(default_factory=Counter)
+    late_timers: Counter[str] = field(default_factory=Counter)
+    timer_lateness_max: float = 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "samples": self.samples,
+            "lag_avg_ms": round(self.lag_total / self.samples * 1000, 1) if self.samples else 0.0,
+            "lag_max_ms": round(self.lag_max * 1000, 1),
+            "stalls": self.stalls,
+            "stall_max_ms": round(self.stall_max * 1000, 1),
+            "timer_firings": dict(self.timer_firings),
+            "late_timers": dict(self.late_timers),
+            "timer_lateness_max_ms": round(self.timer_lateness_max * 1000, 1)
+        }
+
+
+class LoopWatchdog:
+    """Стежить за затримкою event loop.
+
+    Задача в loop вимірює, наскільки пізніше запланованого вона прокидається.
+    Окремий потік перевіряє, чи loop відгукується: якщо ні довше за
+    STALL_THRESHOLD, він логує стек потоку loop - тобто синхронний код,
+    що зараз блокує всі чати.
+    """
+
+    def __init__(
+        self,
+        sample_interval: float = LAG_SAMPLE_INTERVAL,
+        stall_threshold: float = STALL_THRESHOLD,
+        summary_interval: float = SUMMARY_INTERVAL
+    ) -> None:
+        self.sample_interval = sample_interval
+        self.stall_threshold = stall_threshold
+        self.summary_interval = summary_interval
+        self.stats = WatchdogStats()
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._sampler: Optional[asyncio.Task] = None
+        self._reporter: Optional[asyncio.Task] = None
+        self._monitor: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._summary_sources: dict[str, Callable[[], dict[str, Any]]] = {}
+
+    def start(self) -> None:
+        """Запускає виміри; викликати з працюючого event loop."""
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopped.clear()
+        self._sampler = asyncio.create_task(self._sample_lag())
+        self._reporter = asyncio.create_task(self._report())
+        self._monitor = threading.Thread(target=self._watch_stalls, name="loop-watchdog", daemon=True)
+        self._monitor.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        for task in (self._sampler, self._reporter):
+            if task:
+                task.cancel()
+
+    def add_summary_source(self, name: str, source: Callable[[], dict[str, Any]]) -> None:
+        """Додає до періодичного підсумку статистику іншої частини бота (name - підпис у лозі)."""
+        self._summary_sources[name] = source
+
+    def record_timer(self, name: str, lateness: float) -> None:
+        """Облік спрацювання таймера гри: lateness - на скільки він спізнився."""
+        self.stats.timer_firings[name] += 1
+        self.stats.timer_lateness_max = max(self.stats.timer_lateness_max, lateness)
+        if lateness > LATE_TIMER_THRESHOLD:
+            self.stats.late_timers[name] += 1
+            logger.warning("Timer %s fired %.2fs late", name, lateness)
+
+    async def _sample_lag(self) -> None:
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(self.sample_interval)
+            now = time.monotonic()
+            self._heartbeat = now
+            lag = max(0.0, now - started - self.sample_interval)
+            self.stats.samples += 1
+            self.stats.lag_total += lag
+            self.stats.lag_max = max(self.stats.lag_max, lag)
+
+    async def _report(self) -> None:
+        while True:
+            await asyncio.sleep(self.summary_interval)
+            logger.info("Event loop watchdog: %s", self.stats.as_dict())
+            for name, source in self._summary_sources.items():
+                try:
+                    logger.info("%s: %s", name, source())
+                except Exception as e:
+                    logger.warning("%s stats failed: %r", name, e)
+
+    def _watch_stalls(self) -> None:
+        reported_heartbeat = None
+        while not self._stopped.wait(self.stall_threshold / 2):
+            heartbeat = self._heartbeat
+            stalled = time.monotonic() - heartbeat - self.sample_interval
+            if stalled < self.stall_threshold:
+                if reported_heartbeat is not None and heartbeat != reported_heartbeat:
+                    reported_heartbeat = None
+                continue
+
+            # Кожну зупинку логуємо один раз, поки loop не відгукнеться
+            if heartbeat == reported_heartbeat:
+                self.stats.stall_max = max(self.stats.stall_max, stalled)
+                continue
+            reported_heartbeat = heartbeat
+            self.stats.stalls += 1
+            self.stats.stall_max = max(self.stats.stall_max, stalled)
+
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame, limit=STACK_LIMIT)) if frame else "<no frame>"
+            logger.warning("Event loop blocked for %.2fs, loop thread stack:\n%s", stalled, stack)
+
+
+# Спільний watchdog: запускається в bot.py, таймери гри звітують у нього
+watchdog = LoopWatchdog()
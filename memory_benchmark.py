@@ -0,0 +1,130 @@
+"""Пам'ять на активну гру та на рядок рейтингу.
+
+    python memory_benchmark.py --games 20000 --scores 20000
+
+Створює тимчасову базу з --games іграми та рейтингом з --scores гравців,
+завантажує їх через row_factory з database.py і рахує tracemalloc, скільки
+байтів тримає кожен об'єкт (разом з його рядками). Для порівняння ті самі
+рядки завантажуються старим способом - sqlite3.Row і dataclass без slots.
+"""
+import os
+import asyncio
+import sqlite3
+import logging
+import argparse
+import tempfile
+import tracemalloc
+from dataclasses import fields, make_dataclass
+from typing import Any, Callable, Optional
+
+import database
+from chat_state import ChatStateStore
+
+
+logger = logging.getLogger(__name__)
+
+BOT_ID = 1
+CHAT_ID = "-1"
+
+
+def fill_database(db_path: str, games: int, scores: int) -> None:
+    conn = sqlite3.connect(db_path)
+    conn.executemany("""
+        INSERT INTO games (bot_id, chat_id, question, correct_answer, fact, phase, message_id, deadline)
+        VALUES (?, ?, ?, ?, ?, 'collecting', ?, ?)
+    """, [
+        (BOT_ID, str(-1000000 - i), f"Питання номер {i} про щось цікаве?", f"Відповідь {i}",
+         f"Факт {i}: " + "цікавий факт " * 5, i, 1700000000.0 + i)
+        for i in range(games)
+    ])
+    conn.executemany(
+        "INSERT INTO user_scores (bot_id, chat_id, user_id, score) VALUES (?, ?, ?, ?)",
+        [(BOT_ID, CHAT_ID, 100000 + i, i % 500) for i in range(scores)]
+    )
+    conn.commit()
+    conn.close()
+
+
+def dict_backed(cls: type) -> type:
+    """Той самий клас без slots - як до компактних рядків."""
+    return make_dataclass(cls.__name__, [(field.name, field.type) for field in fields(cls)])
+
+
+def measure(
+    db_path: str,
+    query: str,
+    row_factory: Callable,
+    build: Optional[Callable[[Any], Any]] = None
+) -> tuple[int, int]:
+    """Завантажує рядки та повертає (кількість об'єктів, байтів на об'єкт)."""
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = row_factory
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = conn.execute(query).fetchall()
+    if build:
+        objects = [build(row) for row in objects]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    conn.close()
+    return len(objects), (after - before) // max(len(objects), 1)
+
+
+def measure_chat_states(count: int) -> int:
+    """Байтів на стан чату в пам'яті (таймер, кулдаун, турнір)."""
+    store = ChatStateStore(max_chats=count)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for i in range(count):
+        store.get(f"{BOT_ID}:{-1000000 - i}")
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) // max(count, 1)
+
+
+def run(games: int, scores: int) -> dict[str, Any]:
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "memory.db")
+        database.DATABASE_PATH = db_path
+        asyncio.run(database.init_db())
+        fill_database(db_path, games, scores)
+
+        games_query = f"SELECT * FROM games WHERE bot_id = {BOT_ID}"
+        scores_query = f"SELECT * FROM user_scores WHERE bot_id = {BOT_ID} AND chat_id = '{CHAT_ID}'"
+        old_game, old_score = dict_backed(database.Game), dict_backed(database.UserScore)
+
+        _, game_bytes = measure(db_path, games_query, database._GAME_ROWS)
+        _, old_game_bytes = measure(
+            db_path, games_query, sqlite3.Row, lambda row: old_game(**{key: row[key] for key in row.keys()})
+        )
+        _, score_bytes = measure(db_path, scores_query, database._USER_SCORE_ROWS)
+        _, old_score_bytes = measure(
+            db_path, scores_query, sqlite3.Row, lambda row: old_score(**{key: row[key] for key in row.keys()})
+        )
+
+    chat_state_bytes = measure_chat_states(games)
+    return {
+        "games": games,
+        "bytes_per_game": game_bytes,
+        "bytes_per_game_dict_backed": old_game_bytes,
+        "bytes_per_chat_state": chat_state_bytes,
+        "bytes_per_active_game": game_bytes + chat_state_bytes,
+        "leaderboard_rows": scores,
+        "bytes_per_leaderboard_row": score_bytes,
+        "bytes_per_leaderboard_row_dict_backed": old_score_bytes,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Пам'ять на активну гру та рядок рейтингу")
+    parser.add_argument("--games", type=int, default=20000)
+    parser.add_argument("--scores", type=int, default=20000)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    for name, value in run(args.games, args.scores).items():
+        logger.info("%s: %s", name, value)
+
+
+if __name__ == "__main__":
+    main()
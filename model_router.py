@@ -0,0 +1,154 @@
+import random
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+
+LATENCY_SLO = 8.0  # секунд до готовності питання (за LATENCY_PERCENTILE)
+LATENCY_PERCENTILE = 0.9
+MAX_FAILURE_RATE = 0.2  # моделі з більшою часткою помилок не обираються
+ROUTER_WINDOW = 50  # скільки останніх запитів враховуємо для кожної моделі
+ROUTER_MIN_SAMPLES = 5  # поки замало вимірів, модель пробується в першу чергу
+EXPLORE_RATE = 0.05  # частка запитів до випадкової моделі, щоб статистика не застарівала
+DEFAULT_PROMPT_TOKENS = 400  # оцінка розміру запиту, поки немає обліку
+DEFAULT_COMPLETION_TOKENS = 600
+
+
+@dataclass(frozen=True)
+class ModelConfig:
+    name: str
+    input_cost: float  # $ за 1M вхідних токенів
+    output_cost: float  # $ за 1M вихідних токенів
+
+
+# Від дешевшої до дорожчої
+MODELS = [
+    ModelConfig("gpt-5-nano", input_cost=0.05, output_cost=0.40),
+    ModelConfig("gpt-5-mini", input_cost=0.25, output_cost=2.00),
+]
+
+
+@dataclass
+class ModelStats:
+    latencies: deque = field(default_factory=lambda: deque(maxlen=ROUTER_WINDOW))
+    outcomes: deque = field(default_factory=lambda: deque(maxlen=ROUTER_WINDOW))  # True - успіх
+    requests: int = 0
+    failures: int = 0
+    cancelled: int = 0
+    usage_records: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost: float = 0.0
+
+    def latency_percentile(self) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(int(len(ordered) * LATENCY_PERCENTILE), len(ordered) - 1)]
+
+    def failure_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return 1 - sum(self.outcomes) / len(self.outcomes)
+
+
+class ModelRouter:
+    """Обирає модель для генерації за затримкою, помилками та вартістю.
+
+    Серед моделей, що вкладаються в LATENCY_SLO і MAX_FAILURE_RATE,
+    обирається найдешевша за середньою вартістю запиту; якщо таких немає -
+    найшвидша. Також веде облік токенів та витрат по кожній моделі.
+    """
+
+    def __init__(self, models: list[ModelConfig]) -> None:
+        self.models = {model.name: model for model in models}
+        self.stats = {model.name: ModelStats() for model in models}
+
+    def expected_cost(self, name: str) -> float:
+        """Очікувана вартість запиту за середньою кількістю токенів цієї моделі."""
+        stats = self.stats[name]
+        model = self.models[name]
+        if stats.usage_records:
+            prompt_tokens = stats.prompt_tokens / stats.usage_records
+            completion_tokens = stats.completion_tokens / stats.usage_records
+        else:
+            prompt_tokens = DEFAULT_PROMPT_TOKENS
+            completion_tokens = DEFAULT_COMPLETION_TOKENS
+        return (prompt_tokens * model.input_cost + completion_tokens * model.output_cost) / 1_000_000
+
+    def choose(self) -> str:
+        names = list(self.models)
+        if len(names) > 1 and random.random() < EXPLORE_RATE:
+            return random.choice(names)
+
+        # Спершу набираємо статистику по кожній моделі
+        for name in names:
+            if len(self.stats[name].outcomes) < ROUTER_MIN_SAMPLES:
+                return name
+
+        eligible = [
+            name for name in names
+            if self.stats[name].latency_percentile() is not None
+            and self.stats[name].latency_percentile() <= LATENCY_SLO
+            and self.stats[name].failure_rate() <= MAX_FAILURE_RATE
+        ]
+        if eligible:
+            return min(eligible, key=self.expected_cost)
+
+        return min(
+            names,
+            key=lambda name: (self.stats[name].failure_rate() > MAX_FAILURE_RATE,
+                              self.stats[name].latency_percentile() or float("inf"))
+        )
+
+    def record_latency(self, name: str, latency: float, success: bool) -> None:
+        """Записує результат запиту: затримку до готовності питання та успіх."""
+        stats = self.stats[name]
+        stats.requests += 1
+        stats.outcomes.append(success)
+        if success:
+            stats.latencies.append(latency)
+        else:
+            stats.failures += 1
+
+    def record_cancelled(self, name: str, elapsed: float) -> None:
+        """Записує скасований запит (програв дублюючому чи вийшов за GENERATION_BUDGET).
+
+        Відповіді не було щонайменше elapsed секунд - це вимір затримки, а не помилка
+        моделі. Інакше модель, що зависає, не набирала б ROUTER_MIN_SAMPLES і обиралась би далі.
+        """
+        stats = self.stats[name]
+        stats.requests += 1
+        stats.cancelled += 1
+        stats.outcomes.append(True)
+        stats.latencies.append(elapsed)
+
+    def record_usage(self, name: str, prompt_tokens: int, completion_tokens: int) -> float:
+        """Записує використані токени та їх вартість. Повертає вартість запиту."""
+        stats = self.stats[name]
+        model = self.models[name]
+        cost = (prompt_tokens * model.input_cost + completion_tokens * model.output_cost) / 1_000_000
+        stats.usage_records += 1
+        stats.prompt_tokens += prompt_tokens
+        stats.completion_tokens += completion_tokens
+        stats.cost += cost
+        return cost
+
+    def accounting(self) -> dict[str, dict[str, Any]]:
+        """Облік по моделях для моніторингу."""
+        return {
+            name: {
+                "requests": stats.requests,
+                "failures": stats.failures,
+                "cancelled": stats.cancelled,
+                "failure_rate": round(stats.failure_rate(), 3),
+                "latency_percentile": stats.latency_percentile(),
+                "prompt_tokens": stats.prompt_tokens,
+                "completion_tokens": stats.completion_tokens,
+                "cost_usd": round(stats.cost, 6)
+            }
+            for name, stats in self.stats.items()
+        }
+
+
+router = ModelRouter(MODELS)
@@ -0,0 +1,219 @@
+"""Модерація відповідей гравців перед публікацією у Poll.
+
+Слова зі списку (MODERATION_WORDS_PATH, одне на рядок, # - коментар)
+компілюються в автомат Ахо-Корасік, тож відповідь перевіряється за один
+прохід незалежно від розміру списку. Слова - це основи: збіг рахується,
+якщо слово відповіді починається з них. Перед пошуком і відповідь, і список
+нормалізуються однаково: leetspeak та латинські двійники кириличних літер,
+роздільники всередині слова, повтори літер.
+
+Файл перечитується без перезапуску, щойно змінюється його mtime.
+Заміряти швидкість на корпусі відповідей:
+
+    python moderation.py answers.txt
+    python moderation.py --size 200000
+"""
+import os
+import re
+import time
+import random
+import logging
+import argparse
+import unicodedata
+from typing import Iterable, Optional
+
+from config import MODERATION_WORDS_PATH
+
+
+logger = logging.getLogger(__name__)
+
+RELOAD_CHECK_INTERVAL = 5.0  # як часто (секунд) перевіряти mtime списку слів
+
+# Цифри та символи leetspeak і латинські літери, схожі на кириличні
+_FOLD_TABLE = str.maketrans({
+    "0": "о", "1": "і", "3": "з", "4": "ч", "6": "б", "@": "а", "$": "с",
+    "a": "а", "b": "в", "c": "с", "e": "е", "h": "н", "i": "і", "k": "к",
+    "m": "м", "o": "о", "p": "р", "t": "т", "x": "х", "y": "у",
+    "ё": "е", "є": "е", "ї": "і", "ґ": "г",
+})
+_SEPARATORS_RE = re.compile(r"[^\w\s]|_")
+_REPEATS_RE = re.compile(r"(.)\1+")
+_SPACES_RE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Зводить текст до спільного вигляду для пошуку: "С.у.у.к@" -> "сука"."""
+    text = unicodedata.normalize("NFKC", text).lower().translate(_FOLD_TABLE)
+    text = _SEPARATORS_RE.sub("", text)
+    text = _REPEATS_RE.sub(r"\1", text)
+    return _SPACES_RE.sub(" ", text).strip()
+
+
+class WordMatcher:
+    """Автомат Ахо-Корасік над нормалізованими словами."""
+
+    def __init__(self, words: Iterable[str]) -> None:
+        self.words: list[str] = []  # слова як у списку (для логів)
+        self._lengths: list[int] = []  # довжина нормалізованого слова
+        self._goto: list[dict[str, int]] = [{}]
+        self._output: list[tuple[int, ...]] = [()]  # індекси слів, що закінчуються у стані
+
+        seen = set()
+        for word in words:
+            normalized = normalize_text(word)
+            if normalized and normalized not in seen:
+                seen.add(normalized)
+                self._add(normalized, word)
+        self._build_transitions()
+
+    def _add(self, normalized: str, word: str) -> None:
+        state = 0
+        for char in normalized:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._output.append(())
+            state = next_state
+        self._output[state] += (len(self.words),)
+        self.words.append(word)
+        self._lengths.append(len(normalized))
+
+    def _build_transitions(self) -> None:
+        """Доповнює переходи fail-посиланнями, щоб пошук робив один перехід на символ."""
+        fail = [0] * len(self._goto)
+        queue = list(self._goto[0].values())
+        for state in queue:
+            # Переходи стану fail вже повні (він ближче до кореня), успадковуємо відсутні
+            inherited = self._goto[fail[state]]
+            own = dict(self._goto[state])
+            for char, next_state in own.items():
+                queue.append(next_state)
+                fail[next_state] = self._goto[fail[state]].get(char, 0) if state else 0
+                self._output[next_state] += self._output[fail[next_state]]
+            self._goto[state] = {**inherited, **own} if state else own
+
+    def find(self, text: str) -> Optional[str]:
+        """Перше слово зі списку, з якого починається слово нормалізованого тексту."""
+        goto, output, lengths = self._goto, self._output, self._lengths
+        state = 0
+        for i, char in enumerate(text):
+            state = goto[state].get(char, 0)
+            if output[state]:
+                for index in output[state]:
+                    start = i - lengths[index] + 1
+                    if start == 0 or text[start - 1] == " ":
+                        return self.words[index]
+        return None
+
+
+def read_words(path: str) -> list[str]:
+    with open(path, encoding="utf-8") as f:
+        return [
+            line.strip() for line in f
+            if line.strip() and not line.lstrip().startswith("#")
+        ]
+
+
+class ModerationFilter:
+    """Перевірка відповідей за списком слів, що перечитується при зміні файлу."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.matcher = WordMatcher([])
+        self._mtime: Optional[float] = None
+        self._checked_at = float("-inf")
+
+    def reload_if_changed(self) -> None:
+        now = time.monotonic()
+        if now - self._checked_at < RELOAD_CHECK_INTERVAL:
+            return
+        self._checked_at = now
+
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except FileNotFoundError:
+            if self._mtime is not None:
+                logger.warning("Moderation word list %s was removed, filter disabled", self.path)
+                self.matcher = WordMatcher([])
+                self._mtime = None
+            return
+
+        if mtime == self._mtime:
+            return
+        try:
+            self.matcher = WordMatcher(read_words(self.path))
+        except (OSError, UnicodeDecodeError) as e:
+            logger.error("Failed to load moderation word list %s: %s", self.path, e)
+            return
+        self._mtime = mtime
+        logger.info("Loaded %d moderation words from %s", len(self.matcher.words), self.path)
+
+    def check(self, text: str) -> Optional[str]:
+        """Повертає знайдене заборонене слово або None, якщо відповідь можна публікувати."""
+        self.reload_if_changed()
+        if not self.matcher.words:
+            return None
+        return self.matcher.find(normalize_text(text))
+
+
+moderation = ModerationFilter(MODERATION_WORDS_PATH)
+
+
+def synthetic_corpus(words: list[str], size: int) -> list[str]:
+    """Корпус схожих на справжні відповідей, ~1% з прихованими словами зі списку."""
+    vocabulary = [
+        "київ", "львів", "тисяча", "кит", "жираф", "Ньютон", "Австралія", "мед",
+        "восьминіг", "Eiffel", "1889", "сонце", "три серця", "Марія Кюрі", "ніхто",
+    ]
+    disguises = [
+        lambda w: w.upper(),
+        lambda w: ".".join(w),
+        lambda w: w.replace("о", "0").replace("а", "@"),
+        lambda w: w[0] + w[0] + w[1:] + "!!",
+    ]
+    rng = random.Random(0)
+    corpus = []
+    for _ in range(size):
+        answer = " ".join(rng.choice(vocabulary) for _ in range(rng.randint(1, 4)))
+        if words and rng.random() < 0.01:
+            answer += " " + rng.choice(disguises)(rng.choice(words))
+        corpus.append(answer)
+    return corpus
+
+
+def benchmark(answers: list[str], matcher: WordMatcher) -> None:
+    started = time.perf_counter()
+    flagged = sum(1 for answer in answers if matcher.find(normalize_text(answer)))
+    elapsed = time.perf_counter() - started
+    logger.info(
+        "%d answers, %d words, %d flagged: %.1f ms total, %.2f us per answer",
+        len(answers), len(matcher.words), flagged, elapsed * 1000,
+        elapsed / max(len(answers), 1) * 1_000_000
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Швидкість модерації на корпусі відповідей")
+    parser.add_argument("corpus", nargs="?", help="файл відповідей, одна на рядок (інакше - синтетичний)")
+    parser.add_argument("--size", type=int, default=100_000, help="розмір синтетичного корпусу")
+    parser.add_argument("--words", default=MODERATION_WORDS_PATH, help="список слів")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    words = read_words(args.words)
+    started = time.perf_counter()
+    matcher = WordMatcher(words)
+    logger.info("Automaton built in %.2f ms", (time.perf_counter() - started) * 1000)
+
+    if args.corpus:
+        with open(args.corpus, encoding="utf-8") as f:
+            answers = [line.rstrip("\n") for line in f if line.strip()]
+    else:
+        answers = synthetic_corpus(words, args.size)
+    benchmark(answers, matcher)
+
+
+if __name__ == "__main__":
+    main()
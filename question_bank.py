@@ -0,0 +1,247 @@
+"""Банк заздалегідь згенерованих питань.
+
+Наповнення банку з локального файлу фактів:
+
+    python question_bank.py facts.txt --concurrency 8
+
+Файл - один факт на рядок (.txt) або JSON на рядок з полем "text" (.jsonl).
+Вже оброблені факти пропускаються, тому перерваний запуск можна просто повторити.
+Питання, що не пройшли перевірку (validation.py), перегенеровуються з описом
+порушень, а якщо й це не допомогло - факт пропускається.
+"""
+import json
+import random
+import asyncio
+import hashlib
+import logging
+import argparse
+from typing import Iterator, Optional
+
+import aiosqlite
+
+from ai import GeneratedQuestion, generate_question
+from database import get_bank_seen, save_bank_seen
+from validation import validator, describe_problems
+
+
+logger = logging.getLogger(__name__)
+
+BANK_PATH = "questions_bank.db"
+BUILD_CONCURRENCY = 8  # паралельних запитів до OpenAI під час наповнення
+CHECKPOINT_EVERY = 20  # як часто зберігати прогрес (кількість питань)
+REPAIR_ATTEMPTS = 2  # скільки разів перегенеровувати питання, що не пройшло перевірку
+
+
+async def init_bank(bank_path: str = BANK_PATH) -> None:
+    """Створює таблицю банку питань."""
+    async with aiosqlite.connect(bank_path) as db:
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS questions (
+                id INTEGER PRIMARY KEY,
+                fact_hash TEXT UNIQUE NOT NULL,
+                question TEXT NOT NULL,
+                answer TEXT NOT NULL,
+                fact TEXT NOT NULL
+            )
+        """)
+        await db.commit()
+
+
+def fact_hash(fact_text: str) -> str:
+    """Ключ факту для пропуску вже оброблених при повторному запуску."""
+    return hashlib.sha1(fact_text.strip().encode("utf-8")).hexdigest()
+
+
+def read_facts(path: str) -> Iterator[str]:
+    """Читає факти з файлу по одному, не завантажуючи його в пам'ять повністю."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if path.endswith(".jsonl"):
+                line = json.loads(line)["text"].strip()
+            yield line
+
+
+async def generate_valid_question(
+    fact_text: str,
+    budget_key: Optional[str] = None,
+    problems: Optional[list[str]] = None,
+    attempts: int = REPAIR_ATTEMPTS
+) -> Optional[GeneratedQuestion]:
+    """Генерує питання, що проходить перевірку, або None.
+
+    problems - порушення попереднього питання для цього факту: тоді одразу
+    йде повторний запит з їх описом.
+    """
+    if problems is None:
+        question = await generate_question(fact_text, budget_key)
+        problems = validator.check(question, require_fact=True)
+        if not problems:
+            return question
+    for _ in range(attempts):
+        question = await generate_question(fact_text, budget_key, feedback=describe_problems(problems))
+        problems = validator.check(question, require_fact=True)
+        if not problems:
+            return question
+    logger.info("Question for fact %r rejected after %d attempts: %s", fact_text[:50], attempts, problems)
+    return None
+
+
+async def add_question(fact_text: str, question: GeneratedQuestion, bank_path: str = BANK_PATH) -> bool:
+    """Додає питання в банк. False - питання для цього факту вже є."""
+    await init_bank(bank_path)
+    async with aiosqlite.connect(bank_path) as db:
+        cursor = await db.execute(
+            "INSERT OR IGNORE INTO questions (fact_hash, question, answer, fact) VALUES (?, ?, ?, ?)",
+            (fact_hash(fact_text), question.question, question.answer, question.fact)
+        )
+        await db.commit()
+        return cursor.rowcount > 0
+
+
+async def build_bank(facts_path: str, concurrency: int = BUILD_CONCURRENCY, bank_path: str = BANK_PATH) -> int:
+    """Генерує питання для всіх нових фактів з файлу. Повертає кількість доданих."""
+    await init_bank(bank_path)
+    queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+    added = 0
+
+    async with aiosqlite.connect(bank_path) as db:
+        async with db.execute("SELECT fact_hash FROM questions") as cursor:
+            done_hashes = {row[0] for row in await cursor.fetchall()}
+
+        async def worker() -> None:
+            nonlocal added
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                key, fact_text = item
+                try:
+                    question = await generate_valid_question(fact_text)
+                except Exception as e:
+                    logger.warning("Failed to generate question for fact %s: %r", key, e)
+                    continue
+                if question is None:
+                    continue
+                await db.execute(
+                    "INSERT OR IGNORE INTO questions (fact_hash, question, answer, fact) VALUES (?, ?, ?, ?)",
+                    (key, question.question, question.answer, question.fact)
+                )
+                added += 1
+                if added % CHECKPOINT_EVERY == 0:
+                    await db.commit()
+                    logger.info("Checkpoint: %d questions added", added)
+
+        workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+        for fact_text in read_facts(facts_path):
+            key = fact_hash(fact_text)
+            if key in done_hashes:
+                continue
+            done_hashes.add(key)
+            await queue.put((key, fact_text))
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+        await db.commit()
+
+    return added
+
+
+async def get_bank_layout(bank_path: str = BANK_PATH) -> tuple[int, Optional[bytearray]]:
+    """Розмір бітмапи (найбільший id) та маска відсутніх id; None - id йдуть підряд з 1."""
+    try:
+        async with aiosqlite.connect(bank_path) as db:
+            async with db.execute("SELECT COUNT(*), MAX(id) FROM questions") as cursor:
+                count, size = await cursor.fetchone()
+            if not size or count == size:
+                return size or 0, None
+            # Є пропуски (видалені питання) - позначаємо їх, щоб ніколи не вибирати
+            missing = bytearray(b"\xff" * ((size + 7) // 8))
+            async with db.execute("SELECT id FROM questions") as cursor:
+                async for (question_id,) in cursor:
+                    pos = question_id - 1
+                    missing[pos >> 3] &= ~(1 << (pos & 7))
+            return size, missing
+    except aiosqlite.OperationalError:
+        # Банк ще не створено
+        return 0, None
+
+
+def pick_unseen(bitmap: bytearray, size: int) -> Optional[int]:
+    """Вибирає випадковий невикористаний номер (0..size-1) з бітмапи."""
+    nbytes = (size + 7) // 8
+    start = random.randrange(nbytes)
+    for offset in range(nbytes):
+        index = (start + offset) % nbytes
+        byte = bitmap[index]
+        # Заповнені байти пропускаємо цілком
+        if byte == 0xFF:
+            continue
+        free = [
+            index * 8 + bit for bit in range(8)
+            if not byte & (1 << bit) and index * 8 + bit < size
+        ]
+        if free:
+            return random.choice(free)
+    return None
+
+
+def _with_missing(bitmap: bytearray, missing: Optional[bytearray]) -> bytearray:
+    """Бітмапа для вибору: побачені питання разом з відсутніми id."""
+    if missing is None:
+        return bitmap
+    return bytearray(seen | absent for seen, absent in zip(bitmap, missing))
+
+
+async def draw_question(bot_id: int, chat_id: str, bank_path: str = BANK_PATH) -> Optional[GeneratedQuestion]:
+    """Повертає питання з банку, яке цей чат ще не бачив.
+
+    Використані питання позначаються в бітмапі чату (1 біт на питання);
+    коли чат побачив усі - бітмапа скидається.
+    """
+    size, missing = await get_bank_layout(bank_path)
+    if not size:
+        return None
+
+    bitmap = bytearray(await get_bank_seen(bot_id, chat_id))
+    if len(bitmap) < (size + 7) // 8:
+        bitmap.extend(bytes((size + 7) // 8 - len(bitmap)))
+
+    pos = pick_unseen(_with_missing(bitmap, missing), size)
+    if pos is None:
+        bitmap = bytearray((size + 7) // 8)
+        pos = pick_unseen(_with_missing(bitmap, missing), size)
+
+    bitmap[pos >> 3] |= 1 << (pos & 7)
+    await save_bank_seen(bot_id, chat_id, bytes(bitmap))
+
+    async with aiosqlite.connect(bank_path) as db:
+        async with db.execute(
+            "SELECT question, answer, fact FROM questions WHERE id = ?",
+            (pos + 1,)
+        ) as cursor:
+            row = await cursor.fetchone()
+    if row is None:
+        # Питання видалили між вибором і читанням - гра візьме резервне
+        logger.warning("Question %d is missing from the bank", pos + 1)
+        return None
+    return GeneratedQuestion(question=row[0], answer=row[1], fact=row[2])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Наповнення банку питань з файлу фактів")
+    parser.add_argument("facts", help="файл фактів (.txt або .jsonl)")
+    parser.add_argument("--concurrency", type=int, default=BUILD_CONCURRENCY)
+    parser.add_argument("--bank", default=BANK_PATH)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    added = asyncio.run(build_bank(args.facts, args.concurrency, args.bank))
+    logger.info("Done: %d questions added", added)
+    logger.info("Question validation: %s", json.dumps(validator.report(), ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
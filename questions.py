@@ -0,0 +1,229 @@
+import json
+import time
+import random
+import asyncio
+import logging
+from collections import deque
+from typing import Optional
+
+from ai import GeneratedQuestion, stream_question, get_client
+from budget import budgets
+from executor import chat_key
+from question_bank import draw_question, generate_valid_question, add_question
+from validation import validator
+
+
+logger = logging.getLogger(__name__)
+
+FACTS_API_URL = "https://uselessfacts.jsph.pl/api/v2/facts/random"
+FACT_TIMEOUT = 5  # секунд на отримання факту
+GENERATION_BUDGET = 25  # максимум секунд на отримання факту та генерацію питання
+HEDGE_PERCENTILE = 0.9  # після якого перцентиля затримки відправляємо дублюючий запит
+HEDGE_DEFAULT_DELAY = 10  # затримка дублюючого запиту, поки статистики замало
+HEDGE_MIN_SAMPLES = 10  # скільки вимірів потрібно для розрахунку перцентиля
+LATENCY_WINDOW = 100  # скільки останніх вимірів зберігаємо
+BREAKER_FAILURE_THRESHOLD = 3  # помилок поспіль, після яких генерація вимикається
+BREAKER_COOLDOWN = 120  # секунд до наступної спроби після вимкнення
+PREFER_QUESTION_BANK = False  # True - брати питання з банку без звернення до OpenAI
+FALLBACK_QUESTIONS_PATH = "fallback_questions.json"
+MAX_PENDING_REPAIRS = 4  # одночасних фонових перегенерацій відхилених питань
+
+
+class InvalidQuestion(Exception):
+    """Згенероване питання не пройшло перевірку (validation.py)."""
+
+
+class CircuitBreaker:
+    """Вимикає генерацію після кількох помилок поспіль на BREAKER_COOLDOWN секунд."""
+
+    def __init__(self, failure_threshold: int, cooldown: float) -> None:
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+
+    def allow(self) -> bool:
+        """Чи можна зараз звертатися до генерації."""
+        if self.opened_at is None:
+            return True
+        # Після cooldown пропускаємо пробний запит
+        return time.monotonic() - self.opened_at >= self.cooldown
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+
+_breaker = CircuitBreaker(BREAKER_FAILURE_THRESHOLD, BREAKER_COOLDOWN)
+_latencies: deque[float] = deque(maxlen=LATENCY_WINDOW)
+_fallback_questions: Optional[list[GeneratedQuestion]] = None
+_repairs: set[asyncio.Task] = set()
+
+
+async def get_random_fact() -> str:
+    """Отримує випадковий факт з API."""
+    import httpx
+
+    async with httpx.AsyncClient(timeout=FACT_TIMEOUT) as client:
+        response = await client.get(FACTS_API_URL)
+        response.raise_for_status()
+        data = response.json()
+        return data["text"]
+
+
+def get_hedge_delay() -> float:
+    """Затримка перед дублюючим запитом - HEDGE_PERCENTILE останніх затримок."""
+    if len(_latencies) < HEDGE_MIN_SAMPLES:
+        return HEDGE_DEFAULT_DELAY
+    ordered = sorted(_latencies)
+    index = min(int(len(ordered) * HEDGE_PERCENTILE), len(ordered) - 1)
+    return ordered[index]
+
+
+async def _timed_generate(fact_text: str, budget_key: Optional[str]) -> GeneratedQuestion:
+    """Генерує питання потоком та запам'ятовує затримку до готовності питання."""
+    started = time.monotonic()
+    question = await stream_question(fact_text, budget_key)
+    _latencies.append(time.monotonic() - started)
+    return question
+
+
+async def generate_question_hedged(fact_text: str, budget_key: Optional[str] = None) -> GeneratedQuestion:
+    """Генерує питання з дублюючим запитом, якщо перший відповідає надто довго.
+
+    Повертає результат першого успішного запиту, інший скасовується.
+    """
+    pending = {asyncio.create_task(_timed_generate(fact_text, budget_key))}
+    hedged = False
+    error: Optional[BaseException] = None
+
+    try:
+        while pending:
+            timeout = None if hedged else get_hedge_delay()
+            done, pending = await asyncio.wait(
+                pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+            )
+            results = [task.result() for task in done if task.exception() is None]
+            for task in done:
+                if task.exception() is not None:
+                    error = task.exception()
+            if results:
+                # Обидва запити могли завершитись одночасно - зайвий факт не дочитуємо
+                for extra in results[1:]:
+                    if extra.fact_task:
+                        extra.fact_task.cancel()
+                return results[0]
+
+            # Перший запит завис або впав - відправляємо дублюючий (лише один раз)
+            if not hedged:
+                hedged = True
+                pending.add(asyncio.create_task(_timed_generate(fact_text, budget_key)))
+    finally:
+        for task in pending:
+            task.cancel()
+
+    raise error
+
+
+def load_fallback_questions() -> list[GeneratedQuestion]:
+    """Завантажує локальний банк заздалегідь згенерованих питань."""
+    global _fallback_questions
+    if _fallback_questions is None:
+        with open(FALLBACK_QUESTIONS_PATH, encoding="utf-8") as f:
+            _fallback_questions = [GeneratedQuestion(**item) for item in json.load(f)]
+    return _fallback_questions
+
+
+def get_fallback_question() -> GeneratedQuestion:
+    """Повертає випадкове питання з локального банку."""
+    return random.choice(load_fallback_questions())
+
+
+async def warm_up() -> None:
+    """Прогріває клієнт OpenAI та резервний банк у фоні, не блокуючи event loop."""
+    try:
+        await asyncio.to_thread(get_client)
+        await asyncio.to_thread(load_fallback_questions)
+    except Exception as e:
+        logger.warning("Warm-up failed: %r", e)
+
+
+async def get_question(bot_id: int, chat_id: str) -> GeneratedQuestion:
+    """Повертає питання для гри за обмежений час.
+
+    Генерація обмежена GENERATION_BUDGET секундами; якщо вона не встигла,
+    впала або вимкнена після серії помилок - береться питання з банку
+    (без повторів для чату), а якщо банк порожній - з резервного файлу.
+    Чат, що вичерпав денний бюджет токенів (або коли вичерпано загальний),
+    одразу отримує питання з банку чи резервного файлу.
+    """
+    key = chat_key(bot_id, chat_id)
+    if not budgets.allow(key):
+        budgets.record_throttled(key)
+        logger.info("Generation budget exhausted for chat %s, serving from question bank", key)
+        return await draw_question(bot_id, chat_id) or get_fallback_question()
+
+    if PREFER_QUESTION_BANK:
+        question = await draw_question(bot_id, chat_id)
+        if question:
+            return question
+
+    if _breaker.allow():
+        try:
+            question = await asyncio.wait_for(_fetch_and_generate(key), GENERATION_BUDGET)
+        except InvalidQuestion as e:
+            # Модель відповіла, просто не за правилами - це не збій генерації
+            _breaker.record_success()
+            logger.info("Generated question rejected (%s), using fallback bank", e)
+        except Exception as e:
+            _breaker.record_failure()
+            logger.warning("Question generation failed, using fallback bank: %r", e)
+        else:
+            _breaker.record_success()
+            return question
+
+    return await draw_question(bot_id, chat_id) or get_fallback_question()
+
+
+async def _fetch_and_generate(budget_key: str) -> GeneratedQuestion:
+    fact_text = await get_random_fact()
+    question = await generate_question_hedged(fact_text, budget_key)
+    problems = validator.check(question)
+    if problems:
+        if question.fact_task:
+            question.fact_task.cancel()
+        schedule_repair(fact_text, question.model, problems, budget_key)
+        raise InvalidQuestion(", ".join(problems))
+    return question
+
+
+def schedule_repair(fact_text: str, model: str, problems: list[str], budget_key: str) -> None:
+    """Запускає перегенерацію відхиленого питання у фоні, не затримуючи гру."""
+    if len(_repairs) >= MAX_PENDING_REPAIRS:
+        logger.info("Too many pending question repairs, dropping fact %r", fact_text[:50])
+        return
+    task = asyncio.create_task(repair_question(fact_text, model, problems, budget_key))
+    _repairs.add(task)
+    task.add_done_callback(_repairs.discard)
+
+
+async def repair_question(fact_text: str, model: str, problems: list[str], budget_key: str) -> None:
+    """Перегенеровує питання з описом порушень і додає вдале в банк питань.
+
+    Токени йдуть у бюджет того ж чату; якщо бюджет вичерпано - факт пропускається.
+    """
+    if not budgets.allow(budget_key):
+        return
+    try:
+        question = await generate_valid_question(fact_text, budget_key, problems)
+        if question:
+            await add_question(fact_text, question)
+    except Exception as e:
+        logger.warning("Question repair failed: %r", e)
+        question = None
+    validator.record_repair(model, question is not None)
@@ -0,0 +1,92 @@
+import re
+import json
+import base64
+from typing import Any, Awaitable, Callable, TextIO
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import TelegramMethod
+from aiogram.types import TelegramObject, Update
+
+from clock import get_clock
+
+
+# URL файлу Bot API: .../file/bot<токен>/<шлях> - токен у запис не потрапляє
+_FILE_URL_RE = re.compile(r"/file/bot[^/]+/(.+)$")
+
+
+def download_path(url: str) -> str:
+    """Шлях файлу з URL завантаження, без токена бота."""
+    match = _FILE_URL_RE.search(url)
+    return match.group(1) if match else url
+
+
+def to_jsonable(value: Any) -> Any:
+    """Перетворює результат Bot API (моделі aiogram, списки, bool) у JSON-сумісний вигляд."""
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json", exclude_none=True)
+    if isinstance(value, list):
+        return [to_jsonable(item) for item in value]
+    return value
+
+
+class SessionRecorder(BaseRequestMiddleware):
+    """Записує вхідні оновлення та вихідні запити до Bot API у JSONL-файл.
+
+    Кожен рядок - подія з часом від початку запису:
+    {"t": 1.25, "kind": "update", "bot": 123, "update": {...}}
+    {"t": 1.31, "kind": "call", "bot": 123, "method": "sendMessage", "params": {...}, "result": {...}}
+    {"t": 1.40, "kind": "download", "path": "photos/file_1.jpg", "content": "<base64>"}
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._file: TextIO = open(path, "a", encoding="utf-8")
+        self._started = get_clock().monotonic()
+
+    def _write(self, event: dict[str, Any]) -> None:
+        event["t"] = round(get_clock().monotonic() - self._started, 3)
+        self._file.write(json.dumps(event, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    async def update_middleware(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any]
+    ) -> Any:
+        """Outer middleware для dp.update - записує вхідне оновлення."""
+        if isinstance(event, Update):
+            self._write({"kind": "update", "bot": data["bot"].id, "update": to_jsonable(event)})
+        return await handler(event, data)
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType,
+        bot: Bot,
+        method: TelegramMethod
+    ) -> Any:
+        """Request middleware для bot.session - записує вихідний запит та його результат."""
+        result = await make_request(bot, method)
+        # Оновлення вже записуються окремо як update
+        if method.__api_method__ == "getUpdates":
+            return result
+        self._write({
+            "kind": "call",
+            "bot": bot.id,
+            "method": method.__api_method__,
+            "params": method.model_dump(mode="json", exclude_none=True),
+            "result": to_jsonable(result)
+        })
+        return result
+
+    def record_download(self, url: str, content: bytes) -> None:
+        """Записує завантажений файл (TunedAiohttpSession.on_download)."""
+        self._write({
+            "kind": "download",
+            "path": download_path(url),
+            "content": base64.b64encode(content).decode("ascii")
+        })
+
+    def close(self) -> None:
+        self._file.close()
@@ -0,0 +1,160 @@
+"""Відтворення записаної сесії (RECORD_PATH) на віртуальному часі.
+
+    python replay.py session.jsonl --db replay.db
+
+Оновлення подаються в диспетчер у записаному порядку, таймери гри
+спрацьовують за віртуальним годинником, а запити до Bot API отримують
+записані відповіді. Питання беруться з резервного банку без звернення до OpenAI.
+"""
+import os
+import json
+import time
+import base64
+import random
+import asyncio
+import logging
+import argparse
+from collections import Counter, defaultdict, deque
+from typing import Any, AsyncGenerator, Optional
+
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.exceptions import TelegramNetworkError
+from aiogram.methods import TelegramMethod
+
+import database
+import handlers.game
+from ai import GeneratedQuestion
+from bot import create_dispatcher
+from clock import VirtualClock, set_clock
+from executor import executor
+from recorder import download_path
+from questions import get_fallback_question
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BOT_ID = 42  # для записів без поля "bot" (до підтримки кількох ботів)
+
+
+class ReplaySession(BaseSession):
+    """Сесія Bot API, що відповідає записаними результатами замість мережі."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._results: dict[tuple[int, str], deque] = defaultdict(deque)
+        self._downloads: dict[str, deque] = defaultdict(deque)
+        self.calls: Counter[str] = Counter()
+        self.missing: Counter[str] = Counter()
+
+    def add_result(self, bot_id: int, method: str, result: Any) -> None:
+        self._results[(bot_id, method)].append(result)
+
+    def add_download(self, path: str, content: bytes) -> None:
+        self._downloads[path].append(content)
+
+    async def make_request(self, bot: Bot, method: TelegramMethod, timeout: Optional[int] = None) -> Any:
+        name = method.__api_method__
+        self.calls[name] += 1
+        results = self._results.get((bot.id, name))
+        if not results:
+            self.missing[name] += 1
+            raise TelegramNetworkError(method=method, message="No recorded result to replay")
+        content = json.dumps({"ok": True, "result": results.popleft()})
+        response = self.check_response(bot=bot, method=method, status_code=200, content=content)
+        return response.result
+
+    async def close(self) -> None:
+        pass
+
+    async def stream_content(
+        self,
+        url: str,
+        headers: Optional[dict[str, Any]] = None,
+        timeout: int = 30,
+        chunk_size: int = 65536,
+        raise_for_status: bool = True
+    ) -> AsyncGenerator[bytes, None]:
+        """Віддає записаний вміст файлу частинами по chunk_size."""
+        self.calls["download"] += 1
+        contents = self._downloads.get(download_path(url))
+        if not contents:
+            self.missing["download"] += 1
+            raise TelegramNetworkError(method=None, message="No recorded download to replay")
+        content = contents.popleft()
+        for start in range(0, len(content), chunk_size):
+            yield content[start:start + chunk_size]
+
+
+async def replay_question(bot_id: int, chat_id: str) -> GeneratedQuestion:
+    """Питання для відтворення - з резервного файлу, без мережі."""
+    return get_fallback_question()
+
+
+async def replay(path: str, db_path: str) -> dict[str, Any]:
+    """Відтворює сесію та повертає звіт."""
+    random.seed(0)
+    clock = VirtualClock()
+    # Воркери черг чатів чекають на оновлення - це простій, а не незавершена робота
+    clock.add_idle_source(executor.idle_tasks)
+    set_clock(clock)
+
+    # Окрема чиста база, щоб не зачепити робочу
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    database.DATABASE_PATH = db_path
+    await database.init_db()
+
+    handlers.game.get_question = replay_question
+
+    session = ReplaySession()
+    updates: list[tuple[float, int, dict]] = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            event = json.loads(line)
+            bot_id = event.get("bot", DEFAULT_BOT_ID)
+            if event["kind"] == "update":
+                updates.append((event["t"], bot_id, event["update"]))
+            elif event["kind"] == "call":
+                session.add_result(bot_id, event["method"], event["result"])
+            elif event["kind"] == "download":
+                session.add_download(event["path"], base64.b64decode(event["content"]))
+
+    # Бот з тим самим id для кожного записаного - дані в базі розділені по ботах
+    bots: dict[int, Bot] = {}
+    dp = create_dispatcher()
+
+    started = time.perf_counter()
+    for t, bot_id, update in updates:
+        if bot_id not in bots:
+            bots[bot_id] = Bot(token=f"{bot_id}:replay", session=session)
+        await clock.advance_to(t)
+        await dp.feed_raw_update(bots[bot_id], update)
+
+    # Доганяємо таймери, що лишились після останнього оновлення
+    while (deadline := clock.next_deadline()) is not None:
+        await clock.advance_to(deadline)
+
+    return {
+        "updates": len(updates),
+        "bots": len(bots),
+        "virtual_seconds": round(clock.now, 3),
+        "wall_ms": round((time.perf_counter() - started) * 1000, 1),
+        "calls": dict(session.calls),
+        "missing_results": dict(session.missing)
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Відтворення записаної сесії бота")
+    parser.add_argument("recording", help="файл запису (RECORD_PATH)")
+    parser.add_argument("--db", default="replay.db", help="тимчасова база для відтворення")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    report = asyncio.run(replay(args.recording, args.db))
+    logger.info("Replay finished: %s", json.dumps(report, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
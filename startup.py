@@ -0,0 +1,59 @@
+import time
+import logging
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Iterator, Optional
+
+
+logger = logging.getLogger(__name__)
+
+STARTUP_BUDGET = 3.0  # секунд від запуску процесу до початку polling
+
+
+class StartupReport:
+    """Збирає час імпорту модулів та етапів запуску бота."""
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.imports: dict[str, float] = {}
+        self.stages: dict[str, float] = {}
+        self.first_update: Optional[float] = None
+
+    @contextmanager
+    def measure_import(self, name: str) -> Iterator[None]:
+        """Вимірює час імпорту модуля (або групи імпортів)."""
+        started = time.perf_counter()
+        yield
+        self.imports[name] = time.perf_counter() - started
+
+    def mark(self, stage: str) -> None:
+        """Запам'ятовує час від старту процесу до етапу."""
+        self.stages[stage] = time.perf_counter() - self.started
+
+    def log_startup(self) -> None:
+        """Логує звіт про запуск та попереджає, якщо бюджет перевищено."""
+        imports = ", ".join(f"{name}={seconds * 1000:.0f}ms" for name, seconds in self.imports.items())
+        stages = ", ".join(f"{stage}={seconds * 1000:.0f}ms" for stage, seconds in self.stages.items())
+        logger.info("Startup imports: %s", imports)
+        logger.info("Startup stages: %s", stages)
+
+        polling = self.stages.get("polling")
+        if polling is not None and polling > STARTUP_BUDGET:
+            logger.warning("Startup took %.2fs, budget is %.2fs", polling, STARTUP_BUDGET)
+
+    async def first_update_middleware(
+        self,
+        handler: Callable[[Any, dict[str, Any]], Awaitable[Any]],
+        event: Any,
+        data: dict[str, Any]
+    ) -> Any:
+        """Middleware, що фіксує час до першого отриманого оновлення.
+
+        Модуль не імпортує aiogram, щоб вимірювати і його імпорт.
+        """
+        if self.first_update is None:
+            self.first_update = time.perf_counter() - self.started
+            logger.info("Time to first update: %.0fms", self.first_update * 1000)
+        return await handler(event, data)
+
+
+startup_report = StartupReport()
@@ -0,0 +1,92 @@
+import asyncio
+from types import SimpleNamespace
+
+import ai
+from budget import BudgetTracker, Limits
+from model_router import ModelRouter, MODELS
+
+
+class _FakeStream:
+    """Потік чанків моделі; після останнього чанка зависає, якщо stall."""
+
+    def __init__(self, parts: list[str], usage=None, stall: bool = False) -> None:
+        self.chunks = [
+            SimpleNamespace(usage=None, choices=[SimpleNamespace(delta=SimpleNamespace(content=part))])
+            for part in parts
+        ]
+        if usage is not None:
+            self.chunks.append(SimpleNamespace(usage=usage, choices=[]))
+        self.stall = stall
+        self.closed = False
+
+    async def __anext__(self):
+        if self.chunks:
+            await asyncio.sleep(0)
+            return self.chunks.pop(0)
+        if self.stall:
+            await asyncio.sleep(3600)
+        raise StopAsyncIteration
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+def _setup(monkeypatch, stream: _FakeStream) -> BudgetTracker:
+    budgets = BudgetTracker(Limits(cost=0, tokens=0), Limits(cost=0, tokens=0))
+    monkeypatch.setattr(ai, "budgets", budgets)
+    monkeypatch.setattr(ai, "router", ModelRouter(MODELS))
+
+    async def create(**kwargs):
+        return stream
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    monkeypatch.setattr(ai, "get_client", lambda: client)
+    return budgets
+
+
+QUESTION_PARTS = ['{"question": "Що?", ', '"answer": "кит", ', '"fact": "Кит - ссавець."}']
+
+
+def test_stream_cancelled_before_question_is_charged(monkeypatch):
+    """Скасований дублюючий запит теж витратив токени - вони оцінюються і йдуть у бюджет чату."""
+    stream = _FakeStream(QUESTION_PARTS[:1], stall=True)
+    budgets = _setup(monkeypatch, stream)
+
+    async def scenario() -> None:
+        task = asyncio.create_task(ai.stream_question("факт", "1:-1"))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(scenario())
+    usage = budgets.usage("1:-1")
+    assert usage.generated == 1
+    assert usage.tokens > len(ai.SYSTEM_PROMPT) // ai.CHARS_PER_TOKEN
+    assert usage.cost > 0
+    assert stream.closed
+
+
+def test_cancelled_fact_task_is_charged(monkeypatch):
+    """Відхилене питання: fact_task скасовується одразу, а токени все одно записуються."""
+    budgets = _setup(monkeypatch, _FakeStream(QUESTION_PARTS[:2], stall=True))
+
+    async def scenario() -> None:
+        question = await ai.stream_question("факт", "1:-1")
+        question.fact_task.cancel()
+        await asyncio.gather(question.fact_task, return_exceptions=True)
+
+    asyncio.run(scenario())
+    assert budgets.usage("1:-1").generated == 1
+
+
+def test_finished_stream_is_charged_by_reported_usage(monkeypatch):
+    usage = SimpleNamespace(prompt_tokens=500, completion_tokens=40)
+    budgets = _setup(monkeypatch, _FakeStream(QUESTION_PARTS, usage=usage))
+
+    async def scenario() -> str:
+        question = await ai.stream_question("факт", "1:-1")
+        return await question.fact_task
+
+    assert asyncio.run(scenario()) == "Кит - ссавець."
+    chat_usage = budgets.usage("1:-1")
+    assert (chat_usage.generated, chat_usage.tokens) == (1, 540)
@@ -0,0 +1,88 @@
+import asyncio
+import sqlite3
+
+import database
+
+
+def test_init_db_is_idempotent(tmp_path, monkeypatch):
+    """Повторний запуск не перебудовує нові таблиці без bot_id (round_answers, round_votes)."""
+    db_path = str(tmp_path / "variants.db")
+    monkeypatch.setattr(database, "DATABASE_PATH", db_path)
+
+    for _ in range(3):
+        asyncio.run(database.init_db())
+
+    conn = sqlite3.connect(db_path)
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    conn.close()
+    assert set(database.TABLES) <= tables
+    assert not [table for table in tables if table.endswith("_legacy")]
+
+
+def test_init_db_recovers_interrupted_rebuild(tmp_path, monkeypatch):
+    """Залишок {table}_legacy від перерваної перебудови не ламає запуск, дані зберігаються."""
+    db_path = str(tmp_path / "variants.db")
+    monkeypatch.setattr(database, "DATABASE_PATH", db_path)
+
+    # Стара схема без bot_id, перейменована, а нову таблицю створено, але не заповнено
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE user_scores_legacy (id INTEGER PRIMARY KEY, chat_id TEXT, user_id INTEGER, score INTEGER)")
+    conn.execute("INSERT INTO user_scores_legacy (chat_id, user_id, score) VALUES ('-1', 7, 5)")
+    conn.execute(database.TABLES["user_scores"])
+    conn.commit()
+    conn.close()
+
+    asyncio.run(database.init_db(legacy_bot_id=42))
+    asyncio.run(database.init_db(legacy_bot_id=42))
+
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute("SELECT bot_id, chat_id, user_id, score FROM user_scores").fetchall()
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    conn.close()
+    assert rows == [(42, "-1", 7, 5)]
+    assert "user_scores_legacy" not in tables
+
+
+def test_score_reads_include_pending_events_without_writing(tmp_path, monkeypatch):
+    """Читання рейтингу не бере блокування запису і не доганяє знімки само."""
+    db_path = str(tmp_path / "variants.db")
+    monkeypatch.setattr(database, "DATABASE_PATH", db_path)
+    asyncio.run(database.init_db())
+    asyncio.run(database.add_score_events(1, "-1", [
+        database.ScoreEvent(7, "correct", 1, 2), database.ScoreEvent(8, "fooled", 2, 2)
+    ]))
+    asyncio.run(database.snapshot_scores())
+    asyncio.run(database.add_score_events(1, "-1", [database.ScoreEvent(8, "correct", 1, 2)]))
+
+    # Інший процес тримає блокування запису (гра записує раунд)
+    writer = sqlite3.connect(db_path)
+    writer.execute("BEGIN IMMEDIATE")
+    try:
+        leaderboard = asyncio.run(database.get_leaderboard(1, "-1"))
+        daily = asyncio.run(database.get_daily_top_players(1, "-1"))
+        score = asyncio.run(database.get_user_score(1, "-1", 8))
+    finally:
+        writer.rollback()
+        writer.close()
+
+    assert [(row.user_id, row.score) for row in leaderboard] == [(8, 4), (7, 2)]
+    assert [(row.user_id, row.score) for row in daily] == [(8, 4), (7, 2)]
+    assert score == 4
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT score FROM user_scores WHERE user_id = 8").fetchone() == (2,)
+    conn.close()
+
+
+def test_rebuild_scores_applies_new_weights(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "variants.db")
+    monkeypatch.setattr(database, "DATABASE_PATH", db_path)
+    asyncio.run(database.init_db())
+    asyncio.run(database.add_score_events(1, "-1", [
+        database.ScoreEvent(7, "correct", 1, 2), database.ScoreEvent(8, "fooled", 2, 2)
+    ]))
+    asyncio.run(database.add_score_events(1, "-2", [database.ScoreEvent(7, "correct", 1, 2)]))
+    asyncio.run(database.snapshot_scores())
+
+    assert asyncio.run(database.rebuild_scores({"correct": 3})) == 3
+    assert [(row.user_id, row.score) for row in asyncio.run(database.get_leaderboard(1, "-1"))] == [(7, 3), (8, 2)]
+    assert asyncio.run(database.get_user_score(1, "-2", 7)) == 3
@@ -0,0 +1,40 @@
+from dedup import cluster_answers
+
+
+def _grouped(answers: list[str], correct_answer: str) -> tuple[list[list[str]], list[str]]:
+    result = cluster_answers(answers, correct_answer)
+    return [[answers[i] for i in cluster] for cluster in result.clusters], [answers[i] for i in result.correct]
+
+
+def test_inflected_answers_merge():
+    """Відмінкові форми однієї відповіді - один варіант, різні слова лишаються окремо."""
+    clusters, correct = _grouped(["Париж", "Парижа", "Лондон", "Рим", "ром"], "Ньютон")
+    assert clusters == [["Париж", "Парижа"], ["Лондон"], ["Рим"], ["ром"]]
+    assert correct == []
+
+
+def test_inflected_correct_answer_is_detected():
+    clusters, correct = _grouped(["Ньютона", "Ейнштейн"], "Ньютон")
+    assert clusters == [["Ейнштейн"]]
+    assert correct == ["Ньютона"]
+
+
+def test_empty_normalized_answers_stay_separate():
+    """Відповіді з самих емодзі чи пунктуації не зливаються в один варіант і не вважаються правильними."""
+    clusters, correct = _grouped(["🙂", "!!!", "🐱", "кіт"], "🙂")
+    assert clusters == [["🙂"], ["!!!"], ["🐱"], ["кіт"]]
+    assert correct == []
+
+
+def test_decoys_containing_the_correct_word_stay_in_poll():
+    """Обманка з правильним словом та ще одним - не копія правильної відповіді."""
+    for decoy, correct_answer in (("золота рибка", "золото"), ("Новий Лондон", "Лондон"), ("Лондон і Париж", "Лондон")):
+        clusters, correct = _grouped([decoy, correct_answer.upper()], correct_answer)
+        assert clusters == [[decoy]]
+        assert correct == [correct_answer.upper()]
+
+
+def test_correct_answer_matches_regardless_of_word_order():
+    clusters, correct = _grouped(["Франклін Бенджамін", "Бенджаміном Франкліном"], "Бенджамін Франклін")
+    assert clusters == []
+    assert correct == ["Франклін Бенджамін", "Бенджаміном Франкліном"]
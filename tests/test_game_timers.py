@@ -0,0 +1,29 @@
+import asyncio
+
+from executor import KeyedExecutor
+from handlers import game
+
+
+def test_timer_job_retries_when_chat_queue_is_full(monkeypatch):
+    """Перехід фази з таймера не губиться, якщо черга чату переповнена."""
+    monkeypatch.setattr(game, "executor", KeyedExecutor(max_queue_depth=1))
+    monkeypatch.setattr(game, "QUEUE_RETRY_DELAY", 0.01)
+    done = []
+
+    async def scenario() -> None:
+        release = asyncio.Event()
+        # Воркер зайнятий, а єдине місце в черзі вже займає інша задача
+        blocking = []
+        for _ in range(2):
+            blocking.append(asyncio.create_task(game.executor.run("1:-1", release.wait)))
+            await asyncio.sleep(0.01)
+        timer = asyncio.create_task(game.run_chat_job("1:-1", "voting timer", lambda: asyncio.sleep(0, done.append(True))))
+        await asyncio.sleep(0.05)
+        assert not done and not timer.done()
+
+        release.set()
+        await asyncio.wait_for(timer, 1)
+        await asyncio.gather(*blocking)
+
+    asyncio.run(scenario())
+    assert done == [True]
@@ -0,0 +1,20 @@
+import asyncio
+import logging
+
+from chat_state import ChatStateStore
+from loop_watchdog import LoopWatchdog
+
+
+def test_summary_includes_registered_sources(caplog):
+    """Періодичний підсумок watchdog логує й облік стану чатів."""
+    watchdog = LoopWatchdog(summary_interval=0.01)
+    watchdog.add_summary_source("Chat state", ChatStateStore().stats)
+
+    async def scenario() -> None:
+        watchdog.start()
+        await asyncio.sleep(0.05)
+        watchdog.stop()
+
+    with caplog.at_level(logging.INFO, logger="loop_watchdog"):
+        asyncio.run(scenario())
+    assert any(message.startswith("Chat state: {'chats': 0") for message in caplog.messages)
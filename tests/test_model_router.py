@@ -0,0 +1,46 @@
+import asyncio
+import random
+from types import SimpleNamespace
+
+import ai
+from model_router import ModelRouter, MODELS, ROUTER_MIN_SAMPLES
+
+
+class _StallingCompletions:
+    async def create(self, **kwargs):
+        await asyncio.sleep(3600)
+
+
+def test_cancelled_requests_count_as_samples(monkeypatch):
+    """Модель, чиї запити скасовуються (дублюючий виграв, GENERATION_BUDGET), перестає обиратись."""
+    router = ModelRouter(MODELS)
+    monkeypatch.setattr(ai, "router", router)
+    monkeypatch.setattr(random, "random", lambda: 1.0)
+    stalling = SimpleNamespace(chat=SimpleNamespace(completions=_StallingCompletions()))
+    monkeypatch.setattr(ai, "get_client", lambda: stalling)
+    # Затримка скасованого запиту - щонайменше час до скасування
+    clock = iter(range(0, 1000, 10))
+    monkeypatch.setattr(ai, "time", SimpleNamespace(monotonic=lambda: next(clock)))
+
+    async def cancel_stream() -> None:
+        task = asyncio.create_task(ai.stream_question("факт"))
+        await asyncio.sleep(0)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    stalled = MODELS[0].name
+    for _ in range(ROUTER_MIN_SAMPLES):
+        assert router.choose() == stalled
+        asyncio.run(cancel_stream())
+
+    stats = router.accounting()[stalled]
+    assert stats["cancelled"] == ROUTER_MIN_SAMPLES
+    assert stats["failures"] == 0
+    assert stats["latency_percentile"] == 10
+
+    for _ in range(ROUTER_MIN_SAMPLES):
+        router.record_latency(MODELS[1].name, 2.0, success=True)
+    assert router.choose() == MODELS[1].name
@@ -0,0 +1,15 @@
+import os
+
+from moderation import WordMatcher, normalize_text, read_words
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_banned_words_do_not_flag_ordinary_words():
+    """Основи зі списку не чіпають звичайних слів з тим самим початком."""
+    matcher = WordMatcher(read_words(os.path.join(ROOT, "banned_words.txt")))
+    for answer in ("бляшанка", "бляха-муха", "Бляшаний дах", "сукня", "сукупність"):
+        assert matcher.find(normalize_text(answer)) is None, answer
+    for answer in ("блять", "Б.л.я.д.ь", "блядство", "сукааа"):
+        assert matcher.find(normalize_text(answer)) is not None, answer
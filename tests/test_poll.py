@@ -0,0 +1,37 @@
+import asyncio
+from types import SimpleNamespace
+
+from executor import KeyedExecutor
+from handlers import game, poll
+
+
+def test_vote_is_saved_before_poll_is_settled(monkeypatch):
+    """Останній голос, що прийшов разом із закриттям Poll, потрапляє в підсумок."""
+    state = SimpleNamespace(phase="voting", votes=[], counted=None)
+    keyed_executor = KeyedExecutor()
+    monkeypatch.setattr(game, "executor", keyed_executor)
+    monkeypatch.setattr(poll, "executor", keyed_executor)
+
+    async def get_game_by_poll_id(bot_id: int, poll_id: str):
+        return SimpleNamespace(chat_id="-1", phase=state.phase)
+
+    async def save_poll_vote(bot_id: int, chat_id: str, user_id: int, option_index: int) -> None:
+        await asyncio.sleep(0.01)  # запис у базу
+        state.votes.append(user_id)
+
+    async def finish_voting_phase(bot, chat_id: str) -> None:
+        state.phase = "finished"
+        state.counted = list(state.votes)
+
+    monkeypatch.setattr(poll, "get_game_by_poll_id", get_game_by_poll_id)
+    monkeypatch.setattr(poll, "save_poll_vote", save_poll_vote)
+    monkeypatch.setattr(poll, "finish_voting_phase", finish_voting_phase)
+
+    bot = SimpleNamespace(id=1)
+    answer = SimpleNamespace(poll_id="p1", user=SimpleNamespace(id=7), option_ids=[0])
+
+    async def scenario() -> None:
+        await asyncio.gather(poll.on_poll_answer(answer, bot), poll.on_poll_closed(SimpleNamespace(id="p1"), bot))
+
+    asyncio.run(scenario())
+    assert state.counted == [7]
@@ -0,0 +1,36 @@
+import asyncio
+import sqlite3
+
+import question_bank
+
+
+def test_draw_question_skips_id_gaps(tmp_path, monkeypatch):
+    """Видалені питання (пропуски в id) не ламають вибір, кожне наявне видається раз за цикл."""
+    bank_path = str(tmp_path / "bank.db")
+    asyncio.run(question_bank.init_bank(bank_path))
+    conn = sqlite3.connect(bank_path)
+    conn.executemany(
+        "INSERT INTO questions (id, fact_hash, question, answer, fact) VALUES (?, ?, ?, ?, ?)",
+        [(question_id, str(question_id), f"питання {question_id}", "відповідь", "факт") for question_id in (1, 2, 5, 11)]
+    )
+    conn.commit()
+    conn.close()
+
+    seen: dict[tuple[int, str], bytes] = {}
+
+    async def get_bank_seen(bot_id: int, chat_id: str) -> bytes:
+        return seen.get((bot_id, chat_id), b"")
+
+    async def save_bank_seen(bot_id: int, chat_id: str, bitmap: bytes) -> None:
+        seen[(bot_id, chat_id)] = bitmap
+
+    monkeypatch.setattr(question_bank, "get_bank_seen", get_bank_seen)
+    monkeypatch.setattr(question_bank, "save_bank_seen", save_bank_seen)
+
+    async def draw_all(count: int) -> list[str]:
+        return [(await question_bank.draw_question(1, "-1", bank_path)).question for _ in range(count)]
+
+    drawn = asyncio.run(draw_all(8))
+    expected = {"питання 1", "питання 2", "питання 5", "питання 11"}
+    assert set(drawn[:4]) == expected
+    assert set(drawn[4:]) == expected
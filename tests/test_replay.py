@@ -0,0 +1,81 @@
+import os
+import sys
+import json
+import sqlite3
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+GROUP_ID = -100
+BOT_ID = 42
+PLAYERS = [11, 12, 13, 14]
+
+
+def _message(chat_id: int, user_id: int, text: str) -> dict:
+    chat = {"id": chat_id, "type": "group", "title": "g"} if chat_id < 0 else {"id": chat_id, "type": "private", "first_name": "U"}
+    message = {
+        "message_id": 1, "date": 0, "chat": chat, "text": text,
+        "from": {"id": user_id, "is_bot": False, "first_name": f"U{user_id}"}
+    }
+    if text.startswith("/"):
+        message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+    return {"message": message}
+
+
+def _poll(closed: bool) -> dict:
+    return {
+        "id": "p1", "question": "q", "options": [{"text": "a", "voter_count": 0, "persistent_id": "0"}],
+        "total_voter_count": len(PLAYERS) if closed else 0, "is_closed": closed, "is_anonymous": False,
+        "type": "regular", "allows_multiple_answers": False, "allows_revoting": False, "members_only": False
+    }
+
+
+def write_recording(path) -> None:
+    """Раунд з чотирма гравцями: відповіді, голоси одразу після початку голосування, закриття Poll."""
+    group_message = {"message_id": 500, "date": 0, "chat": {"id": GROUP_ID, "type": "group", "title": "g"}, "text": "x"}
+    events = []
+    for method, result, count in [
+        ("sendMessage", group_message, 30), ("deleteMessage", True, 5), ("editMessageText", group_message, 10),
+        ("sendPoll", {**group_message, "message_id": 600, "poll": _poll(False)}, 1)
+    ]:
+        events += [{"t": 0, "kind": "call", "bot": BOT_ID, "method": method, "result": result}] * count
+
+    updates = [(1, _message(GROUP_ID, 1, "/game"))]
+    for i, user_id in enumerate(PLAYERS):
+        updates.append((5 + i, _message(user_id, user_id, f"/start {GROUP_ID}")))
+        updates.append((10 + i, _message(user_id, user_id, ["Лондон", "Берлін", "Рим", "Мадрид"][i])))
+    for i, user_id in enumerate(PLAYERS):
+        updates.append((71 + i, {"poll_answer": {
+            "poll_id": "p1", "user": {"id": user_id, "is_bot": False, "first_name": "U"}, "option_ids": [i % 3],
+            "option_persistent_ids": [str(i % 3)]
+        }}))
+    updates.append((101, {"poll": _poll(True)}))
+    for update_id, (t, update) in enumerate(updates, 1):
+        events.append({"t": t, "kind": "update", "bot": BOT_ID, "update": {"update_id": update_id, **update}})
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.writelines(json.dumps(event, ensure_ascii=False) + "\n" for event in events)
+
+
+def test_replay_is_deterministic(tmp_path):
+    """Голоси, що приходять одразу після переходу до голосування, враховуються в кожному прогоні."""
+    recording = tmp_path / "session.jsonl"
+    write_recording(recording)
+
+    # Кожен прогін - окремий процес: роутери та стан чатів - глобальні для модуля
+    outcomes = []
+    for run in range(3):
+        db_path = str(tmp_path / f"replay{run}.db")
+        result = subprocess.run(
+            [sys.executable, "replay.py", str(recording), "--db", db_path],
+            cwd=ROOT, capture_output=True, text=True, timeout=120
+        )
+        assert result.returncode == 0, result.stderr
+        report = json.loads(result.stderr.rsplit("Replay finished: ", 1)[1].splitlines()[0])
+        conn = sqlite3.connect(db_path)
+        rounds = conn.execute("SELECT players, voters FROM rounds").fetchall()
+        conn.close()
+        outcomes.append((report["calls"], report["virtual_seconds"], rounds))
+
+    assert outcomes[0][2] == [(len(PLAYERS), len(PLAYERS))]
+    assert outcomes.count(outcomes[0]) == len(outcomes)
@@ -0,0 +1,35 @@
+import os
+import sys
+import time
+import subprocess
+
+from startup import STARTUP_BUDGET
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUNS = 3  # беремо найкращий з кількох прогонів - менше шуму від навантаження машини
+
+
+def _import_seconds(module: str) -> float:
+    """Час імпорту модуля в окремому процесі (разом із запуском інтерпретатора)."""
+    env = {**os.environ, "TELEGRAM_BOT_TOKEN": "1:test", "OPENAI_API_KEY": "test"}
+    best = float("inf")
+    for _ in range(RUNS):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", f"import {module}"], cwd=ROOT, env=env, check=True)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def test_import_bot_within_startup_budget():
+    """Власний внесок бота в запуск (понад імпорт aiogram) вкладається в STARTUP_BUDGET.
+
+    Сам aiogram на повільній машині може імпортуватись довше за бюджет, тож
+    порівнюємо з ним як з базою, а не з абсолютним часом.
+    """
+    baseline = _import_seconds("aiogram")
+    elapsed = _import_seconds("bot")
+    assert elapsed - baseline < STARTUP_BUDGET, (
+        f"import bot took {elapsed:.2f}s, {elapsed - baseline:.2f}s over aiogram ({baseline:.2f}s); "
+        f"budget is {STARTUP_BUDGET}s"
+    )
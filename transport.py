@@ -0,0 +1,157 @@
+from collections import deque
+from dataclasses import dataclass, asdict
+from types import SimpleNamespace
+from typing import Any, AsyncGenerator, Callable, Optional
+
+from aiohttp import (
+    ClientSession,
+    TraceConfig,
+    TraceConnectionCreateEndParams,
+    TraceConnectionReuseconnParams,
+    TraceRequestEndParams
+)
+from aiogram import Bot, __version__ as aiogram_version
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import TelegramMethod
+
+from clock import get_clock
+
+
+POOL_SIZE = 100  # максимум одночасних з'єднань з Bot API
+POOL_SIZE_PER_HOST = 100  # усі запити йдуть на api.telegram.org
+KEEPALIVE_TIMEOUT = 60  # секунд тримати простоюче з'єднання відкритим
+REQUEST_TIMEOUT = 15  # таймаут звичайного запиту (getUpdates додає polling timeout)
+PRESSURE_WINDOW = 5  # секунд, за які рахується частота вихідних запитів
+HIGH_PRESSURE_RATE = 20.0  # запитів/сек до Bot API, з яких другорядні запити відкладаються
+
+
+@dataclass
+class TransportStats:
+    requests: int = 0
+    connections_created: int = 0
+    connections_reused: int = 0
+
+    def as_dict(self) -> dict[str, Any]:
+        stats = asdict(self)
+        total = self.connections_created + self.connections_reused
+        stats["reuse_rate"] = round(self.connections_reused / total, 3) if total else 0.0
+        return stats
+
+
+class TunedAiohttpSession(AiohttpSession):
+    """Сесія Bot API з налаштованим пулом з'єднань, keep-alive та статистикою повторного використання."""
+
+    def __init__(
+        self,
+        pool_size: int = POOL_SIZE,
+        pool_size_per_host: int = POOL_SIZE_PER_HOST,
+        keepalive_timeout: float = KEEPALIVE_TIMEOUT,
+        timeout: float = REQUEST_TIMEOUT,
+        **kwargs: Any
+    ) -> None:
+        super().__init__(limit=pool_size, timeout=timeout, **kwargs)
+        self._connector_init["limit_per_host"] = pool_size_per_host
+        self._connector_init["keepalive_timeout"] = keepalive_timeout
+        self.stats = TransportStats()
+        self.on_download: Optional[Callable[[str, bytes], None]] = None  # запис завантажених файлів
+
+    def _build_trace_config(self) -> TraceConfig:
+        trace_config = TraceConfig()
+
+        async def on_request_end(session: ClientSession, context: SimpleNamespace, params: TraceRequestEndParams) -> None:
+            self.stats.requests += 1
+
+        async def on_connection_create_end(
+            session: ClientSession, context: SimpleNamespace, params: TraceConnectionCreateEndParams
+        ) -> None:
+            self.stats.connections_created += 1
+
+        async def on_connection_reuseconn(
+            session: ClientSession, context: SimpleNamespace, params: TraceConnectionReuseconnParams
+        ) -> None:
+            self.stats.connections_reused += 1
+
+        trace_config.on_request_end.append(on_request_end)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        return trace_config
+
+    async def stream_content(self, url: str, *args: Any, **kwargs: Any) -> AsyncGenerator[bytes, None]:
+        chunks = []
+        async for chunk in super().stream_content(url, *args, **kwargs):
+            if self.on_download:
+                chunks.append(chunk)
+            yield chunk
+        if self.on_download:
+            self.on_download(url, b"".join(chunks))
+
+    async def create_session(self) -> ClientSession:
+        # Як у AiohttpSession, але з trace_configs для статистики з'єднань
+        if self._should_reset_connector:
+            await self.close()
+
+        if self._session is None or self._session.closed:
+            self._session = ClientSession(
+                connector=self._connector_type(**self._connector_init),
+                headers={"User-Agent": f"aiogram/{aiogram_version}"},
+                trace_configs=[self._build_trace_config()]
+            )
+            self._should_reset_connector = False
+
+        return self._session
+
+
+class OutboundPressure(BaseRequestMiddleware):
+    """Request middleware, що рахує частоту вихідних запитів до Bot API.
+
+    Навантаження високе, якщо за останні PRESSURE_WINDOW секунд запитів
+    більше за HIGH_PRESSURE_RATE на секунду, або Telegram нещодавно
+    відповів 429 (Too Many Requests).
+    """
+
+    def __init__(self, window: int = PRESSURE_WINDOW, high_rate: float = HIGH_PRESSURE_RATE) -> None:
+        self.window = window
+        self.high_rate = high_rate
+        self._buckets: deque[list[int]] = deque()  # [секунда, кількість запитів]
+        self._retry_until = 0.0
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType,
+        bot: Bot,
+        method: TelegramMethod
+    ) -> Any:
+        # getUpdates - це довге очікування, а не навантаження
+        if method.__api_method__ != "getUpdates":
+            self._record()
+        try:
+            return await make_request(bot, method)
+        except TelegramRetryAfter as e:
+            self._retry_until = max(self._retry_until, get_clock().monotonic() + e.retry_after)
+            raise
+
+    def _record(self) -> None:
+        second = int(get_clock().monotonic())
+        if self._buckets and self._buckets[-1][0] == second:
+            self._buckets[-1][1] += 1
+        else:
+            self._buckets.append([second, 1])
+        self._trim(second)
+
+    def _trim(self, second: int) -> None:
+        while self._buckets and self._buckets[0][0] <= second - self.window:
+            self._buckets.popleft()
+
+    def rate(self) -> float:
+        """Запитів на секунду за останні PRESSURE_WINDOW секунд."""
+        self._trim(int(get_clock().monotonic()))
+        return sum(count for _, count in self._buckets) / self.window
+
+    def is_high(self) -> bool:
+        return get_clock().monotonic() < self._retry_until or self.rate() >= self.high_rate
+
+
+# Спільний лічильник навантаження для всіх ботів процесу
+outbound_pressure = OutboundPressure()
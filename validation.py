@@ -0,0 +1,185 @@
+"""Локальна перевірка згенерованих питань за правилами SYSTEM_PROMPT.
+
+Питання, що порушує правила (довга відповідь, числа, дати, так/ні, порожні
+поля) або не влізе в Poll, у гру не потрапляє. Статистика прийнятих та
+відхилених питань ведеться по моделі та версії промпту (PROMPT_VERSION).
+Перевірити файл питань або банк:
+
+    python validation.py fallback_questions.json
+    python validation.py questions_bank.db
+"""
+import re
+import json
+import sqlite3
+import logging
+import argparse
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from ai import GeneratedQuestion, PROMPT_VERSION
+from dedup import normalize_answer
+
+
+logger = logging.getLogger(__name__)
+
+MAX_ANSWER_WORDS = 5
+MAX_QUESTION_LENGTH = 290  # питання Poll - до 300 символів разом з префіксом
+MAX_OPTION_LENGTH = 100  # варіант Poll - до 100 символів
+
+_DIGITS_RE = re.compile(r"\d")
+# Римські числа (століття) - лише великими літерами, як їх пишуть у відповідях
+_ROMAN_RE = re.compile(r"\b(?:[IVXLC]{2,}|[IVX])\b")
+# Числівники та слова дати - у нормалізованій відповіді (normalize_answer прибирає апострофи)
+_NUMBER_WORDS_RE = re.compile(
+    r"\b(?:нуль|один|одна|одне|одного|одну|два|дві|двох|три|трьох|чотири|чотирьох|пять|пяти"
+    r"|шість|шести|сім|семи|вісім|восьми|девять|девяти|сто|сорок|девяносто|двісті|триста"
+    r"|чотириста|пятсот|шістсот|сімсот|вісімсот|девятсот|півтора|півтори"
+    r"|\w*дцят\w*|\w*десят\w*|тисяч\w*|мільйон\w*|мільярд\w*)\b"
+)
+_DATE_WORDS_RE = re.compile(
+    r"\b(?:(?:січ|берез|квіт|трав|черв|лип|серп|верес|жовт|груд)(?:ень|ня|ні)|лют(?:ого|ому)"
+    r"|листопад[аі]?|рік|року|році|роках|років|століт\w*|сторіч\w*|тисячоліт\w*)\b"
+)
+_YES_NO = {"так", "ні", "є", "немає", "нема", "yes", "no"}
+
+# Опис порушень для повторного запиту до моделі
+PROBLEM_DESCRIPTIONS = {
+    "empty_question": "немає питання",
+    "question_too_long": f"питання довше за {MAX_QUESTION_LENGTH} символів",
+    "empty_fact": "немає факту",
+    "empty_answer": "немає відповіді",
+    "answer_too_long": f"відповідь довша за {MAX_OPTION_LENGTH} символів",
+    "too_many_words": f"відповідь довша за {MAX_ANSWER_WORDS} слів",
+    "number": "відповідь містить число",
+    "date": "відповідь містить дату",
+    "yes_no": "відповідь так/ні",
+}
+
+
+@dataclass(slots=True)
+class ValidationStats:
+    accepted: int = 0
+    rejected: int = 0
+    reasons: Counter = field(default_factory=Counter)
+    repaired: int = 0  # відхилених, що вдалося перегенерувати у фоні
+    repair_failed: int = 0
+
+    def acceptance_rate(self) -> Optional[float]:
+        total = self.accepted + self.rejected
+        return round(self.accepted / total, 3) if total else None
+
+
+def validate_question(question: GeneratedQuestion, require_fact: bool = False) -> list[str]:
+    """Повертає список порушених правил (порожній - питання можна грати).
+
+    Факт при потоковій генерації ще дописується, тому за замовчуванням не перевіряється.
+    """
+    problems = []
+    if not question.question.strip():
+        problems.append("empty_question")
+    elif len(question.question) > MAX_QUESTION_LENGTH:
+        problems.append("question_too_long")
+    if require_fact and not question.fact.strip():
+        problems.append("empty_fact")
+
+    answer = question.answer.strip()
+    if not answer:
+        problems.append("empty_answer")
+        return problems
+    if len(answer) > MAX_OPTION_LENGTH:
+        problems.append("answer_too_long")
+
+    normalized = normalize_answer(answer)
+    words = normalized.split()
+    if len(words) > MAX_ANSWER_WORDS:
+        problems.append("too_many_words")
+    if _DIGITS_RE.search(answer) or _ROMAN_RE.search(answer) or _NUMBER_WORDS_RE.search(normalized):
+        problems.append("number")
+    if _DATE_WORDS_RE.search(normalized):
+        problems.append("date")
+    if words and all(word in _YES_NO for word in words):
+        problems.append("yes_no")
+    return problems
+
+
+def describe_problems(problems: list[str]) -> str:
+    return "; ".join(PROBLEM_DESCRIPTIONS.get(problem, problem) for problem in problems)
+
+
+class QuestionValidator:
+    """Перевіряє питання та веде облік по (модель, версія промпту)."""
+
+    def __init__(self) -> None:
+        self.stats: dict[tuple[str, int], ValidationStats] = {}
+
+    def _stats(self, model: str) -> ValidationStats:
+        key = (model or "bank", PROMPT_VERSION)
+        stats = self.stats.get(key)
+        if stats is None:
+            stats = self.stats[key] = ValidationStats()
+        return stats
+
+    def check(self, question: GeneratedQuestion, require_fact: bool = False) -> list[str]:
+        problems = validate_question(question, require_fact)
+        stats = self._stats(question.model)
+        if problems:
+            stats.rejected += 1
+            stats.reasons.update(problems)
+        else:
+            stats.accepted += 1
+        return problems
+
+    def record_repair(self, model: str, success: bool) -> None:
+        stats = self._stats(model)
+        if success:
+            stats.repaired += 1
+        else:
+            stats.repair_failed += 1
+
+    def report(self) -> dict[str, dict[str, Any]]:
+        """Облік для моніторингу: ключ "модель@vN"."""
+        return {
+            f"{model}@v{version}": {
+                "accepted": stats.accepted,
+                "rejected": stats.rejected,
+                "acceptance_rate": stats.acceptance_rate(),
+                "reasons": dict(stats.reasons),
+                "repaired": stats.repaired,
+                "repair_failed": stats.repair_failed
+            }
+            for (model, version), stats in self.stats.items()
+        }
+
+
+validator = QuestionValidator()
+
+
+def load_questions(path: str) -> list[GeneratedQuestion]:
+    if path.endswith(".db"):
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            rows = conn.execute("SELECT question, answer, fact FROM questions ORDER BY id").fetchall()
+        finally:
+            conn.close()
+        return [GeneratedQuestion(question=row[0], answer=row[1], fact=row[2]) for row in rows]
+    with open(path, encoding="utf-8") as f:
+        return [GeneratedQuestion(**item) for item in json.load(f)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Перевірка питань за правилами промпту")
+    parser.add_argument("path", help="JSON-файл питань (як fallback_questions.json) або банк .db")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    questions = load_questions(args.path)
+    for question in questions:
+        problems = validator.check(question, require_fact=True)
+        if problems:
+            logger.info("Rejected %r / %r: %s", question.question, question.answer, ", ".join(problems))
+    logger.info("%d questions checked: %s", len(questions), json.dumps(validator.report(), ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()